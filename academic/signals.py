@@ -0,0 +1,4 @@
+from productivity.blobs import track_blob_field
+from .models import Note
+
+track_blob_field(Note, 'file')
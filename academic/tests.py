@@ -114,6 +114,15 @@ class AcademicViewsTest(TestCase):
         response = self.client.get(reverse('academic_dashboard'))
         self.assertEqual(response.status_code, 200)
 
+    def test_study_session_export_follows_course_relation(self):
+        self.client.force_login(self.user)
+        StudySession.objects.create(course=self.course, date=date(2026, 3, 9), duration_minutes=45, topics_covered='Graphs')
+
+        response = self.client.get(reverse('export_study_sessions_csv'))
+
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.splitlines()[1], '2026-03-09,Test Course,CS101,45,Graphs')
+
     def test_course_list_requires_login(self):
         response = self.client.get(reverse('course_list'))
         self.assertEqual(response.status_code, 302)
@@ -19,6 +19,7 @@ urlpatterns = [
     path('course/<int:course_id>/sessions/create/', views.study_session_create, name='study_session_create'),
     path('session/<int:session_id>/update/', views.study_session_update, name='study_session_update'),
     path('session/<int:session_id>/delete/', views.study_session_delete, name='study_session_delete'),
+    path('sessions/export/csv/', views.export_study_sessions_csv, name='export_study_sessions_csv'),
     path('gpa-calculator/', views.gpa_calculator, name='gpa_calculator'),
     path('course/<int:course_id>/ai-questions/', views.ai_question_generator, name='ai_question_generator'),
     path('study-planner/', views.study_planner, name='study_planner'),
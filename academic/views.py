@@ -7,6 +7,7 @@ from datetime import timedelta
 from .models import Course, Note, Flashcard, StudySession
 from .forms import CourseForm, NoteForm, FlashcardForm, StudySessionForm
 from ai_assistant.services import generate_questions
+from kouekam_hub.exports import stream_csv
 
 
 def _recommended_session_minutes(course, session_count):
@@ -478,3 +479,16 @@ def study_planner(request):
         'recent_sessions': recent_sessions,
     }
     return render(request, 'academic/study_planner.html', context)
+
+
+@login_required
+def export_study_sessions_csv(request):
+    """Export study sessions across all courses as CSV"""
+    sessions = StudySession.objects.filter(course__user=request.user).order_by('-date', '-created_at')
+    return stream_csv(sessions, [
+        ('Date', 'date'),
+        ('Course', 'course__name'),
+        ('Code', 'course__code'),
+        ('Duration (minutes)', 'duration_minutes'),
+        ('Topics Covered', 'topics_covered'),
+    ], 'study_sessions_export')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Conversation, Message, PromptTemplate, PDFAnalysis
+from .models import Conversation, Message, PromptTemplate, PDFAnalysis, CachedResponse, IndexedPassage
 
 
 class MessageInline(admin.TabularInline):
@@ -59,21 +59,41 @@ class PromptTemplateAdmin(admin.ModelAdmin):
 
 @admin.register(PDFAnalysis)
 class PDFAnalysisAdmin(admin.ModelAdmin):
-    list_display = ['original_filename', 'user', 'date_analyzed']
-    list_filter = ['date_analyzed']
+    list_display = ['original_filename', 'user', 'status', 'progress', 'summary_source', 'date_analyzed']
+    list_filter = ['status', 'summary_source', 'date_analyzed']
     search_fields = ['original_filename', 'summary', 'user__email']
-    readonly_fields = ['date_analyzed', 'summary', 'key_points']
+    readonly_fields = [
+        'date_analyzed', 'summary', 'key_points', 'summary_source', 'started_at', 'heartbeat_at', 'attempts', 'completed_at',
+    ]
     date_hierarchy = 'date_analyzed'
     
     fieldsets = (
         ('File Information', {
             'fields': ('user', 'file', 'original_filename')
         }),
+        ('Processing', {
+            'fields': ('status', 'progress', 'error_message', 'started_at', 'heartbeat_at', 'attempts', 'completed_at')
+        }),
         ('Analysis Results', {
-            'fields': ('summary', 'key_points')
+            'fields': ('summary', 'key_points', 'summary_source')
         }),
         ('Timestamps', {
             'fields': ('date_analyzed',),
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(CachedResponse)
+class CachedResponseAdmin(admin.ModelAdmin):
+    list_display = ['helper', 'key', 'hits', 'created_at', 'expires_at']
+    list_filter = ['helper', 'created_at']
+    search_fields = ['key', 'response']
+    readonly_fields = ['key', 'helper', 'response', 'hits', 'created_at', 'expires_at']
+
+@admin.register(IndexedPassage)
+class IndexedPassageAdmin(admin.ModelAdmin):
+    list_display = ['title', 'source_type', 'source_id', 'position', 'length', 'user']
+    list_filter = ['source_type']
+    search_fields = ['title', 'text', 'user__email']
+    readonly_fields = ['user', 'source_type', 'source_id', 'position', 'title', 'text', 'length']
@@ -0,0 +1,216 @@
+"""
+Async versions of the AI assistant views.
+
+These are routed instead of the sync views in ``views.py`` when
+``AI_ASYNC_VIEWS`` is enabled and the project is served through ASGI
+(see DEPLOYMENT.md). The OpenAI call awaits on the event loop, so one process
+can hold many in-flight AI requests instead of one per worker thread.
+Template rendering still happens in a thread because context processors use
+the sync ORM.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render
+from django.views.decorators.http import require_POST
+
+from .forms import MessageForm
+from .models import Conversation, Message
+from .services import (
+    aget_chat_completion, aget_code_assistance, aget_course_recommendations,
+    aget_study_help, aget_writing_assistance
+)
+from .retrieval import search_passages
+from .views import _message_page, _record_user_message, _sse_event
+
+arender = sync_to_async(render)
+
+
+@login_required
+async def conversation_detail(request, conversation_id):
+    user = await request.auser()
+    conversation = await aget_object_or_404(Conversation, id=conversation_id, user=user)
+    
+    if request.method == 'POST':
+        form = MessageForm(request.POST)
+        if form.is_valid():
+            user_message = form.cleaned_data.get('message', '')
+            if user_message:
+                messages_for_api = await sync_to_async(_record_user_message)(conversation, user_message)
+                
+                try:
+                    response_text = await aget_chat_completion(messages_for_api, route=conversation.assistant_type)
+                    
+                    # Save assistant response
+                    await Message.objects.acreate(
+                        conversation=conversation,
+                        role='assistant',
+                        content=response_text
+                    )
+                    
+                    return JsonResponse({
+                        'success': True,
+                        'response': response_text
+                    })
+                except Exception as e:
+                    return JsonResponse({
+                        'success': False,
+                        'error': str(e)
+                    }, status=500)
+            else:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Invalid form data'
+                }, status=400)
+    
+    messages_list, earlier_cursor = await sync_to_async(_message_page)(conversation)
+    return await arender(request, 'ai_assistant/conversation_detail.html', {
+        'conversation': conversation,
+        'messages': messages_list,
+        'earlier_cursor': earlier_cursor,
+        'form': MessageForm()
+    })
+
+@login_required
+@require_POST
+async def conversation_stream(request, conversation_id):
+    """
+    Stream the assistant reply token by token as Server-Sent Events.
+
+    Async counterpart of views.conversation_stream: tokens are relayed from
+    the upstream stream on the event loop, so an open stream does not hold a
+    worker thread.
+    """
+    user = await request.auser()
+    conversation = await aget_object_or_404(Conversation, id=conversation_id, user=user)
+    form = MessageForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid form data'
+        }, status=400)
+
+    messages_for_api = await sync_to_async(_record_user_message)(conversation, form.cleaned_data['message'])
+
+    async def event_stream():
+        chunks = []
+        try:
+            stream = await aget_chat_completion(messages_for_api, stream=True, route=conversation.assistant_type)
+            async for token in stream:
+                chunks.append(token)
+                yield _sse_event({'token': token})
+        except Exception as e:
+            yield _sse_event({'error': str(e)}, event='error')
+        finally:
+            # Also runs when the server closes the generator because the client went away
+            response_text = ''.join(chunks)
+            message = None
+            if response_text:
+                message = await Message.objects.acreate(
+                    conversation=conversation,
+                    role='assistant',
+                    content=response_text
+                )
+        yield _sse_event({'message_id': message.id if message else None}, event='done')
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+async def study_helper(request):
+    from academic.models import Course
+    user = await request.auser()
+    courses = Course.objects.filter(user=user)
+    
+    if request.method == 'POST':
+        course_id = request.POST.get('course_id')
+        topic = request.POST.get('topic', '')
+        question = request.POST.get('question', '')
+        
+        if course_id:
+            course = await aget_object_or_404(Course, id=course_id, user=user)
+            try:
+                sources = []
+                if question:
+                    sources = await sync_to_async(search_passages)(user, f"{topic} {question}")
+                    response = await aget_study_help(course.name, topic, question, sources)
+                else:
+                    response = "Please provide a question or topic to get study help."
+                
+                return await arender(request, 'ai_assistant/study_helper.html', {
+                    'courses': courses,
+                    'selected_course': course,
+                    'topic': topic,
+                    'question': question,
+                    'response': response,
+                    'sources': sources
+                })
+            except Exception as e:
+                messages.error(request, f'Error: {str(e)}')
+    
+    return await arender(request, 'ai_assistant/study_helper.html', {'courses': courses})
+
+@login_required
+async def code_assistant(request):
+    if request.method == 'POST':
+        code = request.POST.get('code', '')
+        language = request.POST.get('language', 'python')
+        question = request.POST.get('question', '')
+        
+        if code:
+            try:
+                response = await aget_code_assistance(code, language, question)
+                return await arender(request, 'ai_assistant/code_assistant.html', {
+                    'code': code,
+                    'language': language,
+                    'question': question,
+                    'response': response
+                })
+            except Exception as e:
+                messages.error(request, f'Error: {str(e)}')
+    
+    return await arender(request, 'ai_assistant/code_assistant.html')
+
+@login_required
+async def writing_assistant(request):
+    if request.method == 'POST':
+        text = request.POST.get('text', '')
+        request_type = request.POST.get('request_type', 'review')
+        
+        if text:
+            try:
+                response = await aget_writing_assistance(text, request_type)
+                return await arender(request, 'ai_assistant/writing_assistant.html', {
+                    'text': text,
+                    'request_type': request_type,
+                    'response': response
+                })
+            except Exception as e:
+                messages.error(request, f'Error: {str(e)}')
+    
+    return await arender(request, 'ai_assistant/writing_assistant.html')
+
+@login_required
+async def course_recommendation(request):
+    if request.method == 'POST':
+        interests = request.POST.get('interests', '')
+        current_courses = request.POST.get('current_courses', '')
+        
+        if interests:
+            try:
+                interests_list = [i.strip() for i in interests.split(',')]
+                current_list = [c.strip() for c in current_courses.split(',')] if current_courses else None
+                
+                response = await aget_course_recommendations(interests_list, current_list)
+                return await arender(request, 'ai_assistant/course_recommendation.html', {
+                    'interests': interests,
+                    'current_courses': current_courses,
+                    'response': response
+                })
+            except Exception as e:
+                messages.error(request, f'Error: {str(e)}')
+    
+    return await arender(request, 'ai_assistant/course_recommendation.html')
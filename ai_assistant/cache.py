@@ -0,0 +1,157 @@
+"""
+Two-tier cache for deterministic AI helper responses.
+
+Responses are looked up in a small in-process LRU first and then in the
+shared ``CachedResponse`` table, so every worker benefits from a completion
+made by any other worker. The table is pruned on a random sample of writes
+(``PRUNE_RATE``), not on every one.
+"""
+import hashlib
+import json
+import random
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+DEFAULT_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'LOCAL_MAX_ENTRIES': 256,
+    'MAX_ENTRIES': 5000,
+    # Fraction of writes that also prune the table
+    'PRUNE_RATE': 0.05,
+    # Helpers opt in by name, mapped to their TTL in seconds
+    'HELPERS': {},
+}
+
+
+def get_cache_settings():
+    config = dict(DEFAULT_CACHE_SETTINGS)
+    config.update(getattr(settings, 'AI_RESPONSE_CACHE', {}))
+    return config
+
+
+def make_cache_key(model, messages, **params):
+    """
+    Build a stable cache key for a chat completion request.
+    
+    Args:
+        model: Model name
+        messages: List of message dicts
+        **params: Sampling parameters (temperature, max_tokens, ...)
+    
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {'model': model, 'messages': messages, 'params': params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """In-process LRU in front of the shared database table."""
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def ttl_for(self, helper):
+        """Return the TTL for a helper, or None if it has not opted in."""
+        config = get_cache_settings()
+        if not config['ENABLED'] or not helper:
+            return None
+        return config['HELPERS'].get(helper)
+
+    def _count(self, helper, outcome):
+        with self._lock:
+            counters = self._stats.setdefault(helper, {'local_hits': 0, 'shared_hits': 0, 'misses': 0})
+            counters[outcome] += 1
+
+    def _remember(self, key, value, expires_at):
+        max_entries = get_cache_settings()['LOCAL_MAX_ENTRIES']
+        with self._lock:
+            self._local[key] = (value, expires_at)
+            self._local.move_to_end(key)
+            while len(self._local) > max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, helper, key):
+        """
+        Look up a cached response.
+        
+        Returns:
+            Cached response text, or None on a miss
+        """
+        from .models import CachedResponse
+
+        now = timezone.now()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._local.move_to_end(key)
+                else:
+                    del self._local[key]
+                    entry = None
+        if entry is not None:
+            self._count(helper, 'local_hits')
+            return entry[0]
+
+        row = CachedResponse.objects.filter(key=key, expires_at__gt=now).values_list('response', 'expires_at').first()
+        if row is None:
+            self._count(helper, 'misses')
+            return None
+
+        CachedResponse.objects.filter(key=key).update(hits=F('hits') + 1)
+        self._remember(key, row[0], row[1])
+        self._count(helper, 'shared_hits')
+        return row[0]
+
+    def set(self, helper, key, value, ttl):
+        """Store a response in both tiers; a PRUNE_RATE share of writes also prunes the table."""
+        from .models import CachedResponse
+
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        self._remember(key, value, expires_at)
+        try:
+            CachedResponse.objects.update_or_create(
+                key=key,
+                defaults={'helper': helper, 'response': value, 'expires_at': expires_at},
+            )
+        except IntegrityError:
+            # Another worker stored the same response concurrently
+            return
+        if random.random() < get_cache_settings()['PRUNE_RATE']:
+            self.prune()
+
+    def prune(self):
+        """Drop expired rows, then the oldest rows beyond MAX_ENTRIES."""
+        from .models import CachedResponse
+
+        CachedResponse.objects.filter(expires_at__lte=timezone.now()).delete()
+        max_entries = get_cache_settings()['MAX_ENTRIES']
+        stale_ids = list(
+            CachedResponse.objects.order_by('-created_at').values_list('id', flat=True)[max_entries:]
+        )
+        if stale_ids:
+            CachedResponse.objects.filter(id__in=stale_ids).delete()
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        """Return a copy of the per-helper hit/miss counters for this process."""
+        with self._lock:
+            return {helper: dict(counters) for helper, counters in self._stats.items()}
+
+
+response_cache = ResponseCache()
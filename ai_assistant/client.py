@@ -0,0 +1,354 @@
+"""
+Resilient wrapper around the OpenAI client.
+
+One client (and therefore one HTTP connection pool) is shared per process;
+async callers get an ``AsyncOpenAI`` per event loop that shares the same
+breaker and metrics.
+Every call gets explicit connect/read timeouts, retries with exponential
+backoff and jitter on rate limits, 5xx responses and network errors, and a
+circuit breaker that fails fast while the upstream is unhealthy so a slow
+OpenAI cannot tie up every web worker. All attempts of one call, backoff
+included, share a total ``DEADLINE`` that stays below the Gunicorn worker
+timeout (120 s), so a request fails with an error instead of its worker
+being killed.
+"""
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import deque
+
+import openai
+from django.conf import settings
+
+
+class AIServiceError(Exception):
+    """Raised when the AI upstream cannot produce a response."""
+
+
+class CircuitOpenError(AIServiceError):
+    """Raised without calling the upstream while the circuit breaker is open."""
+
+
+class AITimeoutError(AIServiceError):
+    """Raised when the upstream did not answer within the request timeout."""
+
+
+DEFAULT_CLIENT_SETTINGS = {
+    'CONNECT_TIMEOUT': 5.0,
+    'READ_TIMEOUT': 60.0,
+    # Total seconds for all attempts of one call; keep below the worker timeout
+    'DEADLINE': 90.0,
+    'MAX_RETRIES': 2,
+    'BACKOFF_BASE': 0.5,
+    'BACKOFF_MAX': 8.0,
+    'BREAKER_FAILURE_THRESHOLD': 5,
+    'BREAKER_RESET_TIMEOUT': 30.0,
+}
+
+
+def get_client_settings():
+    config = dict(DEFAULT_CLIENT_SETTINGS)
+    config.update(getattr(settings, 'AI_CLIENT', {}))
+    return config
+
+
+def is_retryable(error):
+    """Rate limits, server errors, timeouts and connection errors are worth retrying."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open circuit breaker.
+    
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``reset_timeout`` seconds, then lets a single trial call
+    through. A successful trial closes it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = 'half_open'
+                return True
+            if self.state == 'half_open':
+                # Only one trial call at a time
+                return False
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def record_aborted(self):
+        """A call ended without an upstream outcome; a pending trial counts as failed."""
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class ClientMetrics:
+    """
+    Thread-safe per-model request counters and recent latencies.
+    
+    Also keeps an exponentially weighted moving average of the latency of
+    completed (or timed out) calls per model, which the router uses to
+    estimate how long the next call will take. Streamed calls return when the
+    stream opens, so their latency is time to first byte and is kept apart.
+    """
+
+    def __init__(self, window=100, ewma_alpha=0.2):
+        self.window = window
+        self.ewma_alpha = ewma_alpha
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, model):
+        return self._models.setdefault(model, {
+            'requests': 0,
+            'errors': 0,
+            'retries': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'latencies': deque(maxlen=self.window),
+            'first_byte_latencies': deque(maxlen=self.window),
+            'ewma_latency': None,
+        })
+
+    def record(self, model, latency=None, error=False, retry=False, rejected=False, timed_out=False, streamed=False):
+        with self._lock:
+            entry = self._entry(model)
+            if timed_out:
+                entry['timeouts'] += 1
+            if streamed and latency is not None and not error:
+                entry['first_byte_latencies'].append(latency)
+                latency = None
+            # Fast failures (rate limits, bad requests) say nothing about generation speed
+            if latency is not None and (not error or timed_out):
+                previous = entry['ewma_latency']
+                entry['ewma_latency'] = latency if previous is None else (
+                    self.ewma_alpha * latency + (1 - self.ewma_alpha) * previous
+                )
+            entry['requests'] += 1
+            if error:
+                entry['errors'] += 1
+            if retry:
+                entry['retries'] += 1
+            if rejected:
+                entry['rejected'] += 1
+            if latency is not None:
+                entry['latencies'].append(latency)
+
+    def estimated_latency(self, model):
+        """Smoothed latency of the model in seconds, or None before any sample."""
+        with self._lock:
+            entry = self._models.get(model)
+            return entry['ewma_latency'] if entry else None
+
+    def snapshot(self):
+        """
+        Return metrics per model.
+        
+        Returns:
+            Dict of model -> counters plus average and p95 latency in seconds
+        """
+        with self._lock:
+            result = {}
+            for model, entry in self._models.items():
+                latencies = sorted(entry['latencies'])
+                first_bytes = sorted(entry['first_byte_latencies'])
+                result[model] = {
+                    'requests': entry['requests'],
+                    'errors': entry['errors'],
+                    'retries': entry['retries'],
+                    'rejected': entry['rejected'],
+                    'timeouts': entry['timeouts'],
+                    'ewma_latency': entry['ewma_latency'],
+                    'avg_latency': sum(latencies) / len(latencies) if latencies else None,
+                    'p95_latency': latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+                    'p95_first_byte': first_bytes[int(0.95 * (len(first_bytes) - 1))] if first_bytes else None,
+                }
+            return result
+
+
+class ResilientOpenAIClient:
+    """OpenAI chat completions with timeouts, retries and a circuit breaker."""
+
+    def __init__(self, api_key, base_url=None, config=None, sleep=time.sleep):
+        self.config = config or get_client_settings()
+        self.breaker = CircuitBreaker(
+            failure_threshold=self.config['BREAKER_FAILURE_THRESHOLD'],
+            reset_timeout=self.config['BREAKER_RESET_TIMEOUT'],
+        )
+        self.metrics = ClientMetrics()
+        self._sleep = sleep
+        self._client_options = {
+            'api_key': api_key,
+            'base_url': base_url or None,
+            'timeout': openai.Timeout(self.config['READ_TIMEOUT'], connect=self.config['CONNECT_TIMEOUT']),
+            # Retries are handled here so they go through the breaker and metrics
+            'max_retries': 0,
+        }
+        self._client = openai.OpenAI(**self._client_options)
+        # Async HTTP pools are bound to the event loop that created them
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def backoff(self, attempt):
+        """Exponential backoff with full jitter."""
+        ceiling = min(self.config['BACKOFF_MAX'], self.config['BACKOFF_BASE'] * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _check_breaker(self, model):
+        if not self.breaker.allow_request():
+            self.metrics.record(model, rejected=True)
+            raise CircuitOpenError("AI service is temporarily unavailable. Please try again shortly.")
+
+    def _attempt_timeout(self, timeout, deadline):
+        """Timeout for one attempt: the caller's (or READ_TIMEOUT), cut short by the deadline."""
+        remaining = max(deadline - time.monotonic(), 0.1)
+        read = min(timeout or self.config['READ_TIMEOUT'], remaining)
+        return openai.Timeout(read, connect=min(self.config['CONNECT_TIMEOUT'], read))
+
+    def _on_error(self, model, started, error, attempt, max_retries, retry_timeouts=False, deadline=None):
+        """Record a failed attempt and return the backoff delay, or raise if giving up."""
+        timed_out = isinstance(error, openai.APITimeoutError)
+        retry = is_retryable(error) and attempt < max_retries and (retry_timeouts or not timed_out)
+        delay = self.backoff(attempt) if retry else 0
+        if retry and deadline is not None and time.monotonic() + delay >= deadline:
+            # No time left for another attempt
+            retry = False
+        self.metrics.record(model, latency=time.monotonic() - started, error=True, retry=retry, timed_out=timed_out)
+        if retry:
+            return delay
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # Client errors (bad request, auth) say nothing about upstream health
+            self.breaker.record_success()
+        if timed_out:
+            raise AITimeoutError(str(error)) from error
+        raise AIServiceError(str(error)) from error
+
+    def _on_success(self, model, started, streamed=False):
+        self.metrics.record(model, latency=time.monotonic() - started, streamed=streamed)
+        self.breaker.record_success()
+
+    def create_chat_completion(self, **kwargs):
+        """
+        Call ``chat.completions.create`` with the resilience policy applied.
+        
+        Args:
+            **kwargs: Arguments for chat.completions.create; ``timeout`` limits
+                each attempt, ``deadline`` (a ``time.monotonic()`` value,
+                default AI_CLIENT['DEADLINE'] from now) limits all attempts
+                together, ``max_retries`` overrides AI_CLIENT['MAX_RETRIES'] and
+                ``retry_timeouts=True`` also retries attempts that timed out
+                (by default the first timeout is final, so the caller can fall
+                back to another model)
+        
+        Returns:
+            The OpenAI response (or stream)
+        
+        Raises:
+            CircuitOpenError: If the breaker is open
+            AITimeoutError: If the last attempt timed out
+            AIServiceError: If the call fails after all retries
+        """
+        model = kwargs.get('model')
+        max_retries = kwargs.pop('max_retries', self.config['MAX_RETRIES'])
+        retry_timeouts = kwargs.pop('retry_timeouts', False)
+        timeout = kwargs.pop('timeout', None)
+        deadline = kwargs.pop('deadline', None) or time.monotonic() + self.config['DEADLINE']
+        self._check_breaker(model)
+        attempt = 0
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    response = self._client.chat.completions.create(
+                        timeout=self._attempt_timeout(timeout, deadline), **kwargs
+                    )
+                except openai.OpenAIError as e:
+                    self._sleep(self._on_error(model, started, e, attempt, max_retries, retry_timeouts, deadline))
+                    attempt += 1
+                    continue
+                self._on_success(model, started, streamed=bool(kwargs.get('stream')))
+                return response
+        except AIServiceError:
+            raise
+        except BaseException:
+            # Anything else (bad arguments, unwrapped transport errors) must not leave a trial pending
+            self.breaker.record_aborted()
+            raise
+
+    def get_async_client(self):
+        loop = asyncio.get_running_loop()
+        async_client = self._async_clients.get(loop)
+        if async_client is None:
+            async_client = openai.AsyncOpenAI(**self._client_options)
+            self._async_clients[loop] = async_client
+        return async_client
+
+    async def acreate_chat_completion(self, **kwargs):
+        """Async counterpart of create_chat_completion."""
+        model = kwargs.get('model')
+        max_retries = kwargs.pop('max_retries', self.config['MAX_RETRIES'])
+        retry_timeouts = kwargs.pop('retry_timeouts', False)
+        timeout = kwargs.pop('timeout', None)
+        deadline = kwargs.pop('deadline', None) or time.monotonic() + self.config['DEADLINE']
+        self._check_breaker(model)
+        attempt = 0
+        try:
+            async_client = self.get_async_client()
+            while True:
+                started = time.monotonic()
+                try:
+                    response = await async_client.chat.completions.create(
+                        timeout=self._attempt_timeout(timeout, deadline), **kwargs
+                    )
+                except openai.OpenAIError as e:
+                    await asyncio.sleep(self._on_error(model, started, e, attempt, max_retries, retry_timeouts, deadline))
+                    attempt += 1
+                    continue
+                self._on_success(model, started, streamed=bool(kwargs.get('stream')))
+                return response
+        except AIServiceError:
+            raise
+        except BaseException:
+            # Includes CancelledError when the request is abandoned mid-call
+            self.breaker.record_aborted()
+            raise
+
+
+def build_client():
+    """Create the process-wide client, or None when no API key is configured."""
+    api_key = getattr(settings, 'OPENAI_API_KEY', '')
+    if not api_key:
+        return None
+    return ResilientOpenAIClient(api_key, base_url=getattr(settings, 'OPENAI_BASE_URL', ''))
@@ -0,0 +1,129 @@
+"""
+Local extractive summarizer for PDF analyses.
+
+Sentences are weighted with TF-IDF, linked by cosine similarity and ranked
+with TextRank (power iteration on NumPy arrays). The best-ranked sentences
+become the summary and key points. It needs no network access and runs in
+well under a second for typical documents, so it serves both as the quick
+first pass shown while the LLM works and as the fallback when the upstream
+is unavailable.
+"""
+import re
+from collections import Counter
+
+from .retrieval import tokenize
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=["\'(\[]?[A-Z0-9])')
+MIN_SENTENCE_WORDS = 5
+MAX_SENTENCE_WORDS = 80
+# Bounds the similarity matrix (sentences^2) and the term matrix (sentences x terms)
+MAX_SENTENCES = 1500
+MAX_TERMS = 4000
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+
+
+def split_sentences(text):
+    """Split text into sentences, dropping fragments and run-ons (tables, headers)."""
+    # PDF text has hard line breaks inside sentences
+    text = re.sub(r'\s+', ' ', text).strip()
+    return [
+        sentence.strip()
+        for sentence in SENTENCE_RE.split(text)
+        if MIN_SENTENCE_WORDS <= len(sentence.split()) <= MAX_SENTENCE_WORDS
+    ]
+
+
+def textrank_scores(token_lists):
+    """
+    TextRank over TF-IDF sentence vectors.
+
+    Args:
+        token_lists: List of token lists, one per sentence
+
+    Returns:
+        NumPy array of scores (summing to 1), one per sentence
+    """
+    count = len(token_lists)
+    document_frequency = Counter(term for tokens in token_lists for term in set(tokens))
+    # Terms found in a single sentence add nothing to sentence similarity
+    vocabulary = [term for term, df in document_frequency.most_common(MAX_TERMS) if df > 1]
+    if count < 2 or not vocabulary:
+        return np.full(count, 1 / max(count, 1))
+    index = {term: column for column, term in enumerate(vocabulary)}
+
+    rows, columns = [], []
+    for row, tokens in enumerate(token_lists):
+        for term in tokens:
+            column = index.get(term)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+    matrix = np.zeros((count, len(vocabulary)), dtype=np.float32)
+    np.add.at(matrix, (rows, columns), 1)
+
+    df = np.array([document_frequency[term] for term in vocabulary], dtype=np.float32)
+    matrix *= np.log((1 + count) / (1 + df)) + 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    matrix /= norms
+
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    # Sentences sharing no terms with any other jump uniformly
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1 / count), where=row_sums > 0)
+
+    scores = np.full(count, 1 / count, dtype=np.float32)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / count + DAMPING * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def summarize_extractive(text, summary_sentences=5, key_points=7, max_point_words=40):
+    """
+    Summarize text by extracting its most central sentences.
+
+    Args:
+        text: Document text
+        summary_sentences: Sentences in the summary
+        key_points: Number of key points
+        max_point_words: Longest sentence used as a key point
+
+    Returns:
+        Dict with 'summary' and 'key_points' (same shape as analyze_pdf)
+    """
+    if not NUMPY_AVAILABLE:
+        raise Exception("NumPy is not installed. Please install it with: pip install numpy")
+
+    # Repeated sentences (running headers, footers) would crowd out the rest
+    sentences = list(dict.fromkeys(split_sentences(text)))
+    if not sentences:
+        return {'summary': text.strip()[:1000], 'key_points': []}
+    if len(sentences) > MAX_SENTENCES:
+        # Sample evenly so every part of a long document is represented
+        picks = np.linspace(0, len(sentences) - 1, MAX_SENTENCES).astype(int)
+        sentences = [sentences[i] for i in picks]
+
+    scores = textrank_scores([tokenize(sentence) for sentence in sentences])
+    ranked = [int(i) for i in np.argsort(-scores, kind='stable')]
+
+    summary = sorted(ranked[:summary_sentences])
+    points = sorted(
+        [i for i in ranked[summary_sentences:] if len(sentences[i].split()) <= max_point_words][:key_points]
+    )
+    return {
+        'summary': ' '.join(sentences[i] for i in summary),
+        'key_points': [sentences[i] for i in points],
+    }
@@ -0,0 +1,171 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Speaks enough of the ``/v1/chat/completions`` protocol (plain and streaming)
+for the ``openai`` client, with configurable latency, token rate and error
+rate. Point ``OPENAI_BASE_URL`` at it to benchmark the AI paths without
+touching the real API::
+
+    python manage.py run_fake_openai --port 8001 --latency 0.8 --tokens-per-second 40
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake python manage.py runserver
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER_WORDS = (
+    "the", "model", "explains", "each", "concept", "with", "a", "short", "example",
+    "and", "highlights", "what", "matters", "most", "for", "the", "student",
+)
+
+
+def build_reply(messages, reply_tokens):
+    """Deterministic reply text; analysis prompts get the SUMMARY/KEY POINTS format."""
+    prompt = messages[-1].get('content', '') if messages else ''
+    words = [FILLER_WORDS[index % len(FILLER_WORDS)] for index in range(reply_tokens)]
+    body = ' '.join(words)
+    if 'KEY POINTS:' in prompt:
+        return f"SUMMARY:\n{body}\n\nKEY POINTS:\n1. First point\n2. Second point\n3. Third point"
+    return body
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Set on the subclass built by make_server
+    options = {}
+
+    def log_message(self, format, *args):
+        if self.options.get('verbose'):
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'invalid_request_error'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        options = self.options
+
+        if random.random() < options.get('error_rate', 0):
+            status = random.choice([429, 500, 503])
+            self._send_json(status, {'error': {'message': 'Injected failure', 'type': 'server_error'}})
+            return
+
+        time.sleep(options.get('latency', 0))
+        model = request.get('model', 'gpt-4o-mini')
+        reply_tokens = min(request.get('max_tokens') or options.get('reply_tokens', 60), options.get('reply_tokens', 60))
+        reply = build_reply(request.get('messages', []), reply_tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if request.get('stream'):
+            self._stream(completion_id, created, model, reply)
+            return
+
+        tokens_per_second = options.get('tokens_per_second', 0)
+        if tokens_per_second:
+            time.sleep(reply_tokens / tokens_per_second)
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': len(json.dumps(request.get('messages', []))) // 4,
+                'completion_tokens': reply_tokens,
+                'total_tokens': len(json.dumps(request.get('messages', []))) // 4 + reply_tokens,
+            },
+        })
+
+    def _stream(self, completion_id, created, model, reply):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        tokens_per_second = self.options.get('tokens_per_second', 0)
+        delay = 1 / tokens_per_second if tokens_per_second else 0
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        send({'role': 'assistant', 'content': ''})
+        for index, word in enumerate(reply.split(' ')):
+            send({'content': word if index == 0 else ' ' + word})
+            if delay:
+                time.sleep(delay)
+        send({}, finish_reason='stop')
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def make_server(host='127.0.0.1', port=8001, latency=0.0, tokens_per_second=0.0,
+                reply_tokens=60, error_rate=0.0, verbose=False):
+    """
+    Build a threaded fake OpenAI server.
+    
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        latency: Seconds to wait before answering (time to first token)
+        tokens_per_second: Token generation rate (0 = instant)
+        reply_tokens: Maximum tokens per reply
+        error_rate: Fraction of requests answered with 429/5xx
+        verbose: Log each request
+    
+    Returns:
+        ThreadingHTTPServer instance (call serve_forever to run it)
+    """
+    handler = type('ConfiguredFakeOpenAIHandler', (FakeOpenAIHandler,), {
+        'options': {
+            'latency': latency,
+            'tokens_per_second': tokens_per_second,
+            'reply_tokens': reply_tokens,
+            'error_rate': error_rate,
+            'verbose': verbose,
+        },
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_background_server(**options):
+    """
+    Start a fake server on a daemon thread (used by tests and the load test).
+    
+    Returns:
+        Tuple of (server, base_url); call server.shutdown() when done
+    """
+    server = make_server(**{'port': 0, **options})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/v1"
@@ -0,0 +1,175 @@
+"""
+Background processing for queued PDF analyses and conversation summaries.
+
+Uploads only store the file and create a ``PDFAnalysis`` in the ``queued``
+state. The ``process_pdf_analyses`` management command runs this module in a
+separate worker process so web workers never wait on PDF parsing or the LLM.
+Conversations flagged ``summary_pending`` while building a chat payload have
+their older turns folded into the rolling summary here as well.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Conversation, PDFAnalysis
+from .services import analyze_pdf, fold_conversation_summary
+
+logger = logging.getLogger(__name__)
+
+
+def claim_next_analysis():
+    """
+    Atomically move the oldest queued analysis to ``running``.
+    
+    The conditional UPDATE acts as the lock, so several workers can poll the
+    same table without processing an analysis twice.
+    
+    Returns:
+        The claimed PDFAnalysis, or None if the queue is empty
+    """
+    candidates = PDFAnalysis.objects.filter(status='queued').order_by('date_analyzed').values_list('id', flat=True)[:10]
+    for analysis_id in candidates:
+        now = timezone.now()
+        claimed = PDFAnalysis.objects.filter(id=analysis_id, status='queued').update(
+            status='running',
+            progress=5,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return PDFAnalysis.objects.get(id=analysis_id)
+    return None
+
+
+def requeue_stale_analyses():
+    """
+    Put back analyses whose worker died while running them.
+    
+    A running analysis is stale once its worker has not reported progress
+    (its heartbeat) for AI_PDF_JOB_TIMEOUT seconds. Analyses that have
+    already been claimed AI_PDF_JOB_MAX_ATTEMPTS times are marked failed
+    instead, so a PDF that kills its worker is not retried forever.
+    
+    Returns:
+        Number of analyses requeued
+    """
+    timeout = getattr(settings, 'AI_PDF_JOB_TIMEOUT', 600)
+    max_attempts = getattr(settings, 'AI_PDF_JOB_MAX_ATTEMPTS', 3)
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=timeout)
+    stale = PDFAnalysis.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status='failed',
+        progress=100,
+        error_message=f'Analysis stopped responding {max_attempts} times and was abandoned.',
+        completed_at=now,
+    )
+    if failed:
+        logger.warning(f"Gave up on {failed} PDF analyses after {max_attempts} attempts")
+    return stale.update(
+        status='queued',
+        progress=0,
+        started_at=None,
+        heartbeat_at=None,
+    )
+
+
+def run_analysis(analysis):
+    """
+    Run analyze_pdf for a claimed analysis and store the outcome.
+    
+    Args:
+        analysis: PDFAnalysis in the ``running`` state
+    
+    Returns:
+        The updated PDFAnalysis
+    """
+    def report_progress(percent):
+        # Doubles as the heartbeat that keeps requeue_stale_analyses away
+        PDFAnalysis.objects.filter(id=analysis.id).update(progress=percent, heartbeat_at=timezone.now())
+
+    def save_draft(result):
+        # Shown on the analysis page until the AI summary replaces it
+        PDFAnalysis.objects.filter(id=analysis.id).update(
+            summary=result['summary'],
+            key_points=result['key_points'],
+            summary_source=result['source'],
+            heartbeat_at=timezone.now(),
+        )
+
+    quick_summary = getattr(settings, 'AI_PDF_QUICK_SUMMARY', True)
+    try:
+        with analysis.file.open('rb') as pdf_file:
+            result = analyze_pdf(
+                pdf_file,
+                analysis.original_filename,
+                progress=report_progress,
+                draft=save_draft if quick_summary else None,
+            )
+        analysis.summary = result['summary']
+        analysis.key_points = result['key_points']
+        analysis.summary_source = result.get('source', '')
+        analysis.status = 'done'
+        analysis.error_message = ''
+    except Exception as e:
+        logger.warning(f"PDF analysis {analysis.id} failed: {e}")
+        analysis.status = 'failed'
+        analysis.error_message = str(e)
+
+    analysis.progress = 100
+    analysis.completed_at = timezone.now()
+    analysis.save(update_fields=[
+        'summary', 'key_points', 'summary_source', 'status', 'error_message', 'progress', 'completed_at',
+    ])
+    return analysis
+
+
+def process_queued_analyses(limit=None):
+    """
+    Process queued analyses until the queue is empty or ``limit`` is reached.
+    
+    Returns:
+        Number of analyses processed
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        analysis = claim_next_analysis()
+        if analysis is None:
+            break
+        run_analysis(analysis)
+        processed += 1
+    return processed
+
+
+def fold_pending_summaries(limit=None):
+    """
+    Fold older turns of conversations flagged ``summary_pending``.
+    
+    Each conversation is claimed by clearing its flag with a conditional
+    UPDATE, so several workers never fold the same one. A failed fold is left
+    for the next turn of the conversation to flag again.
+    
+    Returns:
+        Number of conversations folded
+    """
+    folded = 0
+    candidates = Conversation.objects.filter(summary_pending=True).values_list('id', flat=True)
+    if limit is not None:
+        candidates = candidates[:limit]
+    for conversation_id in list(candidates):
+        if not Conversation.objects.filter(id=conversation_id, summary_pending=True).update(summary_pending=False):
+            continue
+        conversation = Conversation.objects.get(id=conversation_id)
+        try:
+            fold_conversation_summary(conversation)
+        except Exception as e:
+            logger.warning(f"Could not summarize conversation {conversation_id}: {e}")
+            continue
+        folded += 1
+    return folded
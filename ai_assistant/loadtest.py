@@ -0,0 +1,284 @@
+"""
+Load-test harness for the AI assistant endpoints.
+
+Drives the real HTTP views with concurrent logged-in sessions and reports
+latency percentiles and throughput per scenario. Pair it with
+``run_fake_openai`` so results measure the app rather than OpenAI.
+"""
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import requests
+
+CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+COURSE_OPTION_RE = re.compile(r'<option value="(\d+)"')
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile.
+    
+    Args:
+        values: Iterable of numbers
+        pct: Percentile between 0 and 100
+    
+    Returns:
+        The percentile value, or None for an empty input
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_results(name, latencies, errors, elapsed, first_byte=None):
+    """Build the report row for one scenario."""
+    total = len(latencies) + errors
+    return {
+        'scenario': name,
+        'requests': total,
+        'errors': errors,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'ttfb_p50': percentile(first_byte or [], 50),
+        'throughput': total / elapsed if elapsed else 0.0,
+    }
+
+
+def build_sample_pdf(pages=2):
+    """Small text PDF used by the upload scenario."""
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for page in range(pages):
+        pdf.drawString(72, 720, f"Load test page {page + 1}: photosynthesis converts light into energy.")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+class LoadTestSession:
+    """
+    One simulated user: a logged-in requests session that handles CSRF.
+
+    The CSRF token is fetched once per session and reused, so timed requests
+    are a single POST.
+    """
+
+    def __init__(self, base_url, email=None, password=None, session_cookie=None, timeout=120):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.http = requests.Session()
+        self._csrf_token = None
+        if session_cookie:
+            host = requests.utils.urlparse(self.base_url).hostname
+            self.http.cookies.set('sessionid', session_cookie, domain=host)
+        elif email:
+            self.login(email, password)
+
+    def url(self, path):
+        return self.base_url + path
+
+    def csrf_token(self, path='/ai/'):
+        """CSRF token of the session, read from a page's form or cookie on first use."""
+        if self._csrf_token is None:
+            response = self.http.get(self.url(path), timeout=self.timeout)
+            response.raise_for_status()
+            match = CSRF_INPUT_RE.search(response.text)
+            self._csrf_token = match.group(1) if match else self.http.cookies.get('csrftoken', '')
+        return self._csrf_token
+
+    def post(self, path, data=None, files=None, stream=False, referer_path=None):
+        token = self.csrf_token(referer_path or path)
+        return self.http.post(
+            self.url(path),
+            data={**(data or {}), 'csrfmiddlewaretoken': token},
+            files=files,
+            headers={'X-CSRFToken': token, 'Referer': self.url(referer_path or path)},
+            timeout=self.timeout,
+            stream=stream,
+            allow_redirects=False,
+        )
+
+    def login(self, email, password):
+        response = self.post('/accounts/login/', {'login': email, 'password': password})
+        if response.status_code not in (302, 303):
+            raise RuntimeError(f"Login failed for {email} (HTTP {response.status_code})")
+        # Logging in rotates the CSRF token
+        self._csrf_token = None
+
+    def create_conversation(self, assistant_type='general'):
+        response = self.post('/ai/conversations/create/', {
+            'title': 'Load test', 'assistant_type': assistant_type,
+        })
+        match = re.search(r'/conversations/(\d+)/', response.headers.get('Location', ''))
+        if not match:
+            raise RuntimeError(f"Could not create conversation (HTTP {response.status_code})")
+        return int(match.group(1))
+
+    def find_or_create_course(self):
+        """Id of a course offered by the study helper, creating one if the user has none."""
+        response = self.http.get(self.url('/ai/study-helper/'), timeout=self.timeout)
+        response.raise_for_status()
+        match = COURSE_OPTION_RE.search(response.text)
+        if match:
+            return int(match.group(1))
+        response = self.post('/academic/course/create/', {
+            'name': 'Load test biology', 'code': 'LT101', 'learning_type': 'course',
+            'status': 'ongoing', 'credits': '3', 'effort_hours': '0',
+        })
+        match = re.search(r'/course/(\d+)/', response.headers.get('Location', ''))
+        if not match:
+            raise RuntimeError(f"Could not create course (HTTP {response.status_code})")
+        return int(match.group(1))
+
+
+def vary(text, state):
+    """
+    Make a prompt unique to the simulated user and request.
+
+    Identical prompts would be answered from the response cache or shared
+    through single-flight after the first request, so every timed request
+    carries its user and request index.
+    """
+    return f"{text} (user {state['user']}, request {state['request']})"
+
+
+def setup_conversation(session, state):
+    state['conversation_id'] = session.create_conversation()
+
+
+def setup_study_helper(session, state):
+    state['course_id'] = session.find_or_create_course()
+
+
+def scenario_conversation(session, state):
+    path = f'/ai/conversations/{state["conversation_id"]}/'
+    response = session.post(path, {'message': vary('Explain photosynthesis briefly.', state)})
+    return response.status_code == 200 and response.json().get('success'), None
+
+
+def scenario_stream(session, state):
+    conversation_id = state['conversation_id']
+    started = time.perf_counter()
+    response = session.post(
+        f'/ai/conversations/{conversation_id}/stream/',
+        {'message': vary('Explain photosynthesis briefly.', state)},
+        stream=True,
+        referer_path=f'/ai/conversations/{conversation_id}/',
+    )
+    first_byte = None
+    for _ in response.iter_content(chunk_size=None):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+    ok = response.status_code == 200
+    response.close()
+    return ok, first_byte
+
+
+def scenario_pdf_upload(session, state):
+    pdf_bytes = state.setdefault('pdf_bytes', build_sample_pdf())
+    response = session.post(
+        '/ai/pdf/upload/',
+        files={'file': ('loadtest.pdf', pdf_bytes, 'application/pdf')},
+    )
+    return response.status_code in (302, 303), None
+
+
+def scenario_study_helper(session, state):
+    response = session.post('/ai/study-helper/', {
+        'course_id': state['course_id'],
+        'topic': 'Photosynthesis',
+        'question': vary('What are the light reactions?', state),
+    })
+    return response.status_code == 200, None
+
+
+def _helper_scenario(path, data, varied_field):
+    def run(session, state):
+        response = session.post(path, {**data, varied_field: vary(data[varied_field], state)})
+        return response.status_code == 200, None
+    return run
+
+
+SCENARIOS = {
+    'conversation': scenario_conversation,
+    'stream': scenario_stream,
+    'pdf_upload': scenario_pdf_upload,
+    'study_helper': scenario_study_helper,
+    'code_assistant': _helper_scenario('/ai/code-assistant/', {
+        'code': 'def add(a, b):\n    return a + b', 'language': 'python', 'question': 'Any bugs?',
+    }, 'question'),
+    'writing_assistant': _helper_scenario('/ai/writing-assistant/', {
+        'text': 'Their going to the libary tomorow.', 'request_type': 'grammar',
+    }, 'text'),
+    'course_recommendation': _helper_scenario('/ai/course-recommendation/', {
+        'interests': 'machine learning, statistics', 'current_courses': 'Calculus I',
+    }, 'interests'),
+}
+
+# Per-user preparation run before the timed requests
+SCENARIO_SETUP = {
+    'conversation': setup_conversation,
+    'stream': setup_conversation,
+    'study_helper': setup_study_helper,
+}
+
+
+def run_scenario(name, session_factory, users=5, requests_per_user=10):
+    """
+    Run one scenario with concurrent users.
+    
+    Args:
+        name: Key in SCENARIOS
+        session_factory: Callable returning a logged-in LoadTestSession
+        users: Number of concurrent users
+        requests_per_user: Requests each user sends
+    
+    Returns:
+        Report dict from summarize_results
+    """
+    scenario = SCENARIOS[name]
+    latencies, first_bytes = [], []
+    errors = 0
+    lock = threading.Lock()
+    sessions = [session_factory() for _ in range(users)]
+
+    def worker(user, session):
+        nonlocal errors
+        state = {'user': user, 'request': 0}
+        try:
+            session.csrf_token()
+            if name in SCENARIO_SETUP:
+                SCENARIO_SETUP[name](session, state)
+        except (requests.RequestException, RuntimeError, ValueError):
+            with lock:
+                errors += requests_per_user
+            return
+        for request in range(requests_per_user):
+            state['request'] = request
+            started = time.perf_counter()
+            try:
+                ok, first_byte = scenario(session, state)
+            except (requests.RequestException, RuntimeError, ValueError):
+                ok, first_byte = False, None
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                    if first_byte is not None:
+                        first_bytes.append(first_byte)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        list(executor.map(worker, range(users), sessions))
+    return summarize_results(name, latencies, errors, time.perf_counter() - started, first_bytes)
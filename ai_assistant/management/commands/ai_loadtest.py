@@ -0,0 +1,46 @@
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+from ai_assistant.loadtest import SCENARIOS, LoadTestSession, run_scenario
+
+
+class Command(BaseCommand):
+    help = 'Load test the AI assistant endpoints and report latency percentiles and throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--email', help='Account used by every simulated user')
+        parser.add_argument('--password')
+        parser.add_argument('--session-cookie', help='Existing sessionid instead of logging in')
+        parser.add_argument('--users', type=int, default=5, help='Concurrent users')
+        parser.add_argument('--requests', type=int, default=10, help='Requests per user')
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(SCENARIOS),
+            help='Scenario to run (repeatable, default: all)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['session_cookie'] and not (options['email'] and options['password']):
+            raise CommandError('Provide --email and --password, or --session-cookie')
+
+        session_factory = partial(
+            LoadTestSession,
+            options['base_url'],
+            email=options['email'],
+            password=options['password'],
+            session_cookie=options['session_cookie'],
+        )
+
+        def fmt(seconds):
+            return f'{seconds * 1000:9.0f}' if seconds is not None else f"{'-':>9}"
+
+        self.stdout.write(
+            f"{'scenario':<22}{'reqs':>6}{'errs':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ttfb ms':>9}{'req/s':>8}"
+        )
+        for name in options['scenario'] or sorted(SCENARIOS):
+            report = run_scenario(name, session_factory, options['users'], options['requests'])
+            self.stdout.write(
+                f"{report['scenario']:<22}{report['requests']:>6}{report['errors']:>6}"
+                f"{fmt(report['p50'])}{fmt(report['p95'])}{fmt(report['p99'])}{fmt(report['ttfb_p50'])}"
+                f"{report['throughput']:>8.1f}"
+            )
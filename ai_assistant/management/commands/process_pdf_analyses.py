@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from ai_assistant.jobs import fold_pending_summaries, process_queued_analyses, requeue_stale_analyses
+
+
+class Command(BaseCommand):
+    help = 'Run the worker that processes queued PDF analyses and conversation summaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Processing queued PDF analyses...')
+        while True:
+            close_old_connections()
+            requeued = requeue_stale_analyses()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale analyses')
+
+            processed = process_queued_analyses()
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f'Processed {processed} analyses'))
+
+            folded = fold_pending_summaries()
+            if folded:
+                self.stdout.write(self.style.SUCCESS(f'Summarized {folded} conversations'))
+
+            if options['once']:
+                break
+            if not processed and not folded:
+                time.sleep(options['poll_interval'])
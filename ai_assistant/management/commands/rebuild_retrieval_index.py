@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from ai_assistant.retrieval import rebuild_index
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the BM25 retrieval index over notes and PDF analyses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='Only rebuild the index of this user')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user_id']:
+            try:
+                user = User.objects.get(id=options['user_id'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user_id']} does not exist")
+
+        count = rebuild_index(user)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} passages'))
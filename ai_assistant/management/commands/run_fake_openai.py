@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from ai_assistant.fake_openai import make_server
+
+
+class Command(BaseCommand):
+    help = 'Run a local OpenAI-compatible chat completions server for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--latency', type=float, default=0.5, help='Seconds before the first token')
+        parser.add_argument('--tokens-per-second', type=float, default=50, help='Generation rate (0 = instant)')
+        parser.add_argument('--reply-tokens', type=int, default=60, help='Maximum tokens per reply')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing with 429/5xx')
+        parser.add_argument('--verbose', action='store_true', help='Log every request')
+
+    def handle(self, *args, **options):
+        server = make_server(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            tokens_per_second=options['tokens_per_second'],
+            reply_tokens=options['reply_tokens'],
+            error_rate=options['error_rate'],
+            verbose=options['verbose'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake OpenAI server on http://{options['host']}:{options['port']}/v1 "
+            f"(set OPENAI_BASE_URL to this URL)"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping fake OpenAI server')
+        finally:
+            server.server_close()
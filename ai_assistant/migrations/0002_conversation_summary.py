@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='summarized_through',
+            field=models.BigIntegerField(blank=True, help_text='ID of the last message folded into the summary', null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='summary',
+            field=models.TextField(blank=True, help_text='Rolling summary of turns no longer sent verbatim'),
+        ),
+    ]
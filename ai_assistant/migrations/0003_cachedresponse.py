@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0002_conversation_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('helper', models.CharField(db_index=True, max_length=50)),
+                ('response', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_analyses_done(apps, schema_editor):
+    # Analyses created before the job pipeline were processed inline
+    PDFAnalysis = apps.get_model('ai_assistant', 'PDFAnalysis')
+    PDFAnalysis.objects.update(status='done', progress=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0003_cachedresponse'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfanalysis',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfanalysis',
+            name='error_message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='pdfanalysis',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Progress in %'),
+        ),
+        migrations.AddField(
+            model_name='pdfanalysis',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfanalysis',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+        migrations.RunPython(mark_existing_analyses_done, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='pdfanalysis',
+            index=models.Index(fields=['status', 'date_analyzed'], name='ai_assistan_status_1fcb68_idx'),
+        ),
+    ]
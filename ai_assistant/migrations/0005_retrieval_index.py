@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0004_pdfanalysis_job_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexedPassage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('note', 'Note'), ('pdf', 'PDF Analysis')], max_length=10)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('text', models.TextField()),
+                ('length', models.PositiveIntegerField(help_text='Number of indexed terms')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indexed_passages', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['source_type', 'source_id', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PassageTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField()),
+                ('passage', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='ai_assistant.indexedpassage')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='indexedpassage',
+            index=models.Index(fields=['source_type', 'source_id'], name='ai_assistan_source__e3b073_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passageterm',
+            index=models.Index(fields=['user', 'term'], name='ai_assistan_user_id_7fc8fd_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:56
+
+from django.db import migrations, models
+
+
+def mark_existing_summaries_ai(apps, schema_editor):
+    # Every summary written so far came from the LLM
+    PDFAnalysis = apps.get_model('ai_assistant', 'PDFAnalysis')
+    PDFAnalysis.objects.filter(status='done').exclude(summary='').update(summary_source='ai')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0005_retrieval_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfanalysis',
+            name='summary_source',
+            field=models.CharField(blank=True, choices=[('ai', 'AI'), ('extractive', 'Quick extractive')], max_length=20),
+        ),
+        migrations.RunPython(mark_existing_summaries_ai, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0006_pdfanalysis_summary_source'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'timestamp', 'id'], name='ai_assistan_convers_db6cad_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0007_message_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prompttemplate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
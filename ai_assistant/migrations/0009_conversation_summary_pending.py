@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0008_prompttemplate_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='summary_pending',
+            field=models.BooleanField(db_index=True, default=False, help_text='Older turns are waiting to be folded into the summary by the worker'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0009_conversation_summary_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfanalysis',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Times a worker has claimed this analysis'),
+        ),
+        migrations.AddField(
+            model_name='pdfanalysis',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last progress report from the worker running it', null=True),
+        ),
+    ]
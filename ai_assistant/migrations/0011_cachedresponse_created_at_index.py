@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0010_pdfanalysis_heartbeat_attempts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cachedresponse',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
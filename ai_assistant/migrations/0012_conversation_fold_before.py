@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0011_cachedresponse_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='fold_before',
+            field=models.BigIntegerField(blank=True, help_text='ID of the oldest message still sent verbatim; the worker folds the turns before it', null=True),
+        ),
+    ]
@@ -14,6 +14,10 @@ class Conversation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversations')
     title = models.CharField(max_length=255, blank=True)
     assistant_type = models.CharField(max_length=20, choices=ASSISTANT_TYPE_CHOICES, default='general')
+    summary = models.TextField(blank=True, help_text="Rolling summary of turns no longer sent verbatim")
+    summarized_through = models.BigIntegerField(null=True, blank=True, help_text="ID of the last message folded into the summary")
+    summary_pending = models.BooleanField(default=False, db_index=True, help_text="Older turns are waiting to be folded into the summary by the worker")
+    fold_before = models.BigIntegerField(null=True, blank=True, help_text="ID of the oldest message still sent verbatim; the worker folds the turns before it")
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
 
@@ -37,6 +41,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Keyset pagination of transcripts; id breaks timestamp ties
+            models.Index(fields=['conversation', 'timestamp', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.role}: {self.content[:50]}"
@@ -56,24 +64,117 @@ class PromptTemplate(models.Model):
     template_text = models.TextField(help_text="Template with {variables} for dynamic content")
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['category', 'name']
 
+    def compiled(self):
+        """Compiled form of template_text (cached, see prompts.py)."""
+        from .prompts import template_cache
+        return template_cache.get(self)
+
+    @property
+    def variables(self):
+        return self.compiled().variables
+
+    def render(self, values):
+        return self.compiled().render(values)
+
     def __str__(self):
         return self.name
 
 class PDFAnalysis(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    SUMMARY_SOURCE_CHOICES = [
+        ('ai', 'AI'),
+        ('extractive', 'Quick extractive'),
+    ]
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pdf_analyses')
     file = models.FileField(upload_to='ai_assistant/pdfs/')
     summary = models.TextField(blank=True)
     key_points = models.JSONField(default=list, help_text="List of key points extracted")
+    summary_source = models.CharField(max_length=20, choices=SUMMARY_SOURCE_CHOICES, blank=True)
     date_analyzed = models.DateTimeField(auto_now_add=True)
     original_filename = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Progress in %")
+    error_message = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last progress report from the worker running it")
+    attempts = models.PositiveSmallIntegerField(default=0, help_text="Times a worker has claimed this analysis")
+    completed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-date_analyzed']
         verbose_name_plural = "PDF Analyses"
+        indexes = [
+            models.Index(fields=['status', 'date_analyzed']),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
 
     def __str__(self):
         return f"Analysis: {self.original_filename or self.file.name}"
+
+class CachedResponse(models.Model):
+    """Shared tier of the AI response cache, keyed by a hash of the request."""
+    key = models.CharField(max_length=64, unique=True)
+    helper = models.CharField(max_length=50, db_index=True)
+    response = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.helper}: {self.key[:12]}"
+
+class IndexedPassage(models.Model):
+    """A passage of a user's note or PDF summary in the retrieval index."""
+    SOURCE_CHOICES = [
+        ('note', 'Note'),
+        ('pdf', 'PDF Analysis'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='indexed_passages')
+    source_type = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    source_id = models.PositiveBigIntegerField()
+    position = models.PositiveIntegerField(default=0)
+    title = models.CharField(max_length=255, blank=True)
+    text = models.TextField()
+    length = models.PositiveIntegerField(help_text="Number of indexed terms")
+
+    class Meta:
+        ordering = ['source_type', 'source_id', 'position']
+        indexes = [
+            models.Index(fields=['source_type', 'source_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_type_display()} {self.source_id} #{self.position}"
+
+class PassageTerm(models.Model):
+    """Posting in the per-user inverted index: term frequency in one passage."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    passage = models.ForeignKey(IndexedPassage, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=64)
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'term']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} x{self.frequency}"
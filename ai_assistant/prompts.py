@@ -0,0 +1,108 @@
+"""
+Server-side rendering of PromptTemplate text.
+
+``{name}`` placeholders are variables; ``{{`` and ``}}`` produce literal
+braces, and any other brace (e.g. a JSON example inside the prompt) is kept
+as-is. A template is compiled once into a tuple of literal and variable
+segments, cached per process by id and ``updated_at``, and dropped from the
+cache when the template is saved or deleted.
+"""
+import re
+import threading
+
+TOKEN_RE = re.compile(r'\{\{|\}\}|\{([A-Za-z_][A-Za-z0-9_]*)\}')
+
+
+class TemplateVariableError(ValueError):
+    """Raised when a template is rendered without all of its variables."""
+
+    def __init__(self, missing):
+        self.missing = missing
+        super().__init__(f"Missing template variables: {', '.join(missing)}")
+
+
+class CompiledTemplate:
+    """A template parsed into ('text', literal) and ('var', name) segments."""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.variables = tuple(dict.fromkeys(value for kind, value in segments if kind == 'var'))
+
+    def render(self, values):
+        """
+        Fill in the template.
+
+        Args:
+            values: Mapping of variable name to value
+
+        Returns:
+            Rendered prompt text
+
+        Raises:
+            TemplateVariableError: If any variable has no value
+        """
+        missing = [name for name in self.variables if name not in values]
+        if missing:
+            raise TemplateVariableError(missing)
+        return ''.join(value if kind == 'text' else str(values[value]) for kind, value in self.segments)
+
+
+def compile_template(text):
+    """
+    Parse template text into a CompiledTemplate.
+
+    Args:
+        text: Template text with {variables}
+
+    Returns:
+        CompiledTemplate
+    """
+    segments = []
+    literal = []
+    position = 0
+    for match in TOKEN_RE.finditer(text):
+        literal.append(text[position:match.start()])
+        position = match.end()
+        if match.group(1) is None:
+            literal.append(match.group(0)[0])
+            continue
+        if any(literal):
+            segments.append(('text', ''.join(literal)))
+        literal = []
+        segments.append(('var', match.group(1)))
+    literal.append(text[position:])
+    if any(literal):
+        segments.append(('text', ''.join(literal)))
+    return CompiledTemplate(tuple(segments))
+
+
+class TemplateCache:
+    """Per-process cache of compiled templates, keyed by id and updated_at."""
+
+    def __init__(self):
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def get(self, template):
+        if template.pk is None:
+            return compile_template(template.template_text)
+        version = template.updated_at
+        with self._lock:
+            entry = self._compiled.get(template.pk)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        compiled = compile_template(template.template_text)
+        with self._lock:
+            self._compiled[template.pk] = (version, compiled)
+        return compiled
+
+    def invalidate(self, template_id):
+        with self._lock:
+            self._compiled.pop(template_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+
+
+template_cache = TemplateCache()
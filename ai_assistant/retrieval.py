@@ -0,0 +1,233 @@
+"""
+Per-user BM25 retrieval over notes and PDF analysis summaries.
+
+Documents are split into passages and stored as an inverted index
+(``IndexedPassage`` + ``PassageTerm``) that signals keep up to date on
+every save and delete. A query reads only the postings for its own terms,
+so ranking costs a couple of indexed queries rather than a scan of the
+user's notebooks.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import IndexedPassage, PassageTerm
+
+DEFAULT_RETRIEVAL_SETTINGS = {
+    'ENABLED': True,
+    'TOP_K': 4,
+    'PASSAGE_WORDS': 120,
+    'K1': 1.2,
+    'B': 0.75,
+}
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 32
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has
+have having he her here hers him his how i if in into is it its itself just me more most my no
+nor not now of off on once only or other our ours out over own same she should so some such than
+that the their theirs them then there these they this those through to too under until up very
+was we were what when where which while who whom why will with would you your yours
+""".split())
+
+
+def get_retrieval_settings():
+    config = dict(DEFAULT_RETRIEVAL_SETTINGS)
+    config.update(getattr(settings, 'AI_RETRIEVAL', {}))
+    return config
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords and single characters removed."""
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def split_passages(text, passage_words=None):
+    """
+    Split text into passages of roughly ``passage_words`` words.
+    
+    Paragraphs are kept together where they fit; longer paragraphs are cut
+    into fixed-size windows.
+    
+    Args:
+        text: Document text
+        passage_words: Target passage length in words
+    
+    Returns:
+        List of passage strings
+    """
+    passage_words = passage_words or get_retrieval_settings()['PASSAGE_WORDS']
+    passages = []
+    current = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        words = paragraph.split()
+        if not words:
+            continue
+        if current and len(current) + len(words) > passage_words:
+            passages.append(' '.join(current))
+            current = []
+        while len(words) > passage_words:
+            passages.append(' '.join(words[:passage_words]))
+            words = words[passage_words:]
+        current.extend(words)
+    if current:
+        passages.append(' '.join(current))
+    return passages
+
+
+def remove_document(source_type, source_id):
+    """Drop every passage of a document from the index."""
+    IndexedPassage.objects.filter(source_type=source_type, source_id=source_id).delete()
+
+
+@transaction.atomic
+def index_document(user_id, source_type, source_id, title, text):
+    """
+    (Re)index one document for a user.
+    
+    Args:
+        user_id: Owner of the document
+        source_type: 'note' or 'pdf'
+        source_id: Primary key of the source object
+        title: Label shown with retrieved passages (its terms count in every passage)
+        text: Document text
+    
+    Returns:
+        Number of passages indexed
+    """
+    remove_document(source_type, source_id)
+    postings = []
+    count = 0
+    title_terms = Counter(tokenize(title))
+    for position, passage_text in enumerate(split_passages(text)):
+        frequencies = Counter(tokenize(passage_text))
+        if not frequencies:
+            continue
+        frequencies.update(title_terms)
+        passage = IndexedPassage.objects.create(
+            user_id=user_id,
+            source_type=source_type,
+            source_id=source_id,
+            position=position,
+            title=title[:255],
+            text=passage_text,
+            length=sum(frequencies.values()),
+        )
+        postings.extend(
+            PassageTerm(user_id=user_id, passage=passage, term=term, frequency=frequency)
+            for term, frequency in frequencies.items()
+        )
+        count += 1
+    PassageTerm.objects.bulk_create(postings, batch_size=500)
+    return count
+
+
+def index_note(note):
+    """Index an academic note (title and content)."""
+    return index_document(note.course.user_id, 'note', note.id, note.title, note.content)
+
+
+def index_analysis(analysis):
+    """Index a finished PDF analysis (summary and key points); drop it otherwise."""
+    if analysis.status != 'done' or not analysis.summary:
+        remove_document('pdf', analysis.id)
+        return 0
+    key_points = '\n'.join(str(point) for point in analysis.key_points or [])
+    text = f"{analysis.summary}\n\n{key_points}"
+    title = analysis.original_filename or analysis.file.name
+    return index_document(analysis.user_id, 'pdf', analysis.id, title, text)
+
+
+def search_passages(user, query, k=None):
+    """
+    Return the user's top-k passages for a query, ranked by BM25.
+    
+    Args:
+        user: User whose index is searched
+        query: Free-text query
+        k: Number of passages (defaults to AI_RETRIEVAL['TOP_K'])
+    
+    Returns:
+        List of dicts with source_type, source_id, title, text and score
+    """
+    config = get_retrieval_settings()
+    k = k or config['TOP_K']
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not config['ENABLED'] or not terms:
+        return []
+
+    postings = list(
+        PassageTerm.objects.filter(user=user, term__in=terms)
+        .values_list('passage_id', 'term', 'frequency', 'passage__length')
+    )
+    if not postings:
+        return []
+
+    stats = IndexedPassage.objects.filter(user=user).aggregate(passages=Count('id'), terms=Sum('length'))
+    total = stats['passages']
+    average_length = (stats['terms'] or 0) / total if total else 1
+
+    document_frequency = Counter(term for _, term, _, _ in postings)
+    k1, b = config['K1'], config['B']
+    scores = Counter()
+    for passage_id, term, frequency, length in postings:
+        df = document_frequency[term]
+        idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * length / average_length)
+        scores[passage_id] += idf * frequency * (k1 + 1) / (frequency + norm)
+
+    top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+    passages = IndexedPassage.objects.in_bulk([passage_id for passage_id, _ in top])
+    return [
+        {
+            'source_type': passages[passage_id].source_type,
+            'source_id': passages[passage_id].source_id,
+            'title': passages[passage_id].title,
+            'text': passages[passage_id].text,
+            'score': score,
+        }
+        for passage_id, score in top
+    ]
+
+
+def rebuild_index(user=None):
+    """
+    Rebuild the retrieval index from scratch.
+    
+    Args:
+        user: Limit the rebuild to one user (all users when None)
+    
+    Returns:
+        Number of passages indexed
+    """
+    from academic.models import Note
+    from .models import PDFAnalysis
+
+    notes = Note.objects.select_related('course')
+    analyses = PDFAnalysis.objects.filter(status='done')
+    passages = IndexedPassage.objects.all()
+    if user is not None:
+        notes = notes.filter(course__user=user)
+        analyses = analyses.filter(user=user)
+        passages = passages.filter(user=user)
+
+    passages.delete()
+    count = 0
+    for note in notes.iterator():
+        count += index_note(note)
+    for analysis in analyses.iterator():
+        count += index_analysis(analysis)
+    return count
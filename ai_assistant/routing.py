@@ -0,0 +1,74 @@
+"""
+Latency-aware model routing for chat completions.
+
+Each call names a route (an assistant type or helper such as ``writing`` or
+``pdf_analysis``). The route chooses the model, the ``max_tokens`` budget
+and a per-call timeout from its latency SLO. Observed per-model latencies
+(see ``ClientMetrics.estimated_latency``) let the router move a route to its
+fallback model while the primary is running slower than the SLO. A call that
+times out on the primary model is retried once on the fallback.
+"""
+from django.conf import settings
+
+DEFAULT_ROUTE = {
+    'MODEL': 'gpt-4o-mini',
+    # Secondary model used on timeout, or when the primary misses the SLO
+    'FALLBACK_MODEL': '',
+    'MAX_TOKENS': 1000,
+    # Seconds a caller of this route is willing to wait
+    'LATENCY_SLO': 30.0,
+    # Prompts above LONG_PROMPT_TOKENS go to LONG_PROMPT_MODEL (when set)
+    'LONG_PROMPT_TOKENS': 8000,
+    'LONG_PROMPT_MODEL': '',
+    'CONTEXT_WINDOW': 128000,
+}
+
+# Minimum completion budget left when a prompt nearly fills the context window
+MIN_COMPLETION_TOKENS = 256
+
+
+def get_route_settings(name):
+    """
+    Settings for a route: DEFAULT_ROUTE, then AI_ROUTES['default'], then AI_ROUTES[name].
+    """
+    routes = getattr(settings, 'AI_ROUTES', {})
+    config = dict(DEFAULT_ROUTE)
+    config.update(routes.get('default', {}))
+    if name:
+        config.update(routes.get(name, {}))
+    return config
+
+
+def choose_route(name, prompt_tokens, metrics=None):
+    """
+    Pick the model, token budget and timeout for a call.
+
+    Args:
+        name: Route name (e.g. 'writing', 'pdf_analysis'); None uses the default route
+        prompt_tokens: Estimated tokens in the prompt
+        metrics: ClientMetrics with observed latencies (optional)
+
+    Returns:
+        Dict with model, fallback_model, max_tokens and timeout
+    """
+    config = get_route_settings(name)
+    model = config['MODEL']
+    if config['LONG_PROMPT_MODEL'] and prompt_tokens > config['LONG_PROMPT_TOKENS']:
+        model = config['LONG_PROMPT_MODEL']
+    fallback_model = config['FALLBACK_MODEL'] if config['FALLBACK_MODEL'] != model else ''
+
+    if metrics is not None and fallback_model:
+        primary_latency = metrics.estimated_latency(model)
+        fallback_latency = metrics.estimated_latency(fallback_model)
+        if (primary_latency is not None and primary_latency > config['LATENCY_SLO']
+                and (fallback_latency is None or fallback_latency < primary_latency)):
+            model, fallback_model = fallback_model, model
+
+    available = config['CONTEXT_WINDOW'] - prompt_tokens
+    return {
+        'name': name or 'default',
+        'model': model,
+        'fallback_model': fallback_model,
+        'max_tokens': max(MIN_COMPLETION_TOKENS, min(config['MAX_TOKENS'], available)),
+        'timeout': config['LATENCY_SLO'],
+    }
@@ -1,7 +1,21 @@
 import os
+import logging
+import time
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from openai import OpenAI
+from django.core.cache import caches
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .cache import make_cache_key, response_cache
+from .client import AIServiceError, AITimeoutError, CircuitOpenError, build_client
+from .extractive import summarize_extractive
+from .models import Conversation
+from .prompts import TemplateVariableError
+from .routing import choose_route
+from .singleflight import single_flight
+from productivity.blobs import blob_digest, file_sha256
+
+logger = logging.getLogger(__name__)
 
 try:
     import PyPDF2
@@ -9,31 +23,106 @@ try:
 except ImportError:
     PDF2_AVAILABLE = False
 
-# Initialize OpenAI client
-client = None
-if hasattr(settings, 'OPENAI_API_KEY') and settings.OPENAI_API_KEY:
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Characters of document text sent to the model in a single analyze_pdf call
+PDF_ANALYSIS_MAX_CHARS = 10000
+
+# Initialize OpenAI client (shared per process, see client.py)
+client = build_client()
 
-def get_chat_completion(messages, model="gpt-4o-mini", temperature=0.7, max_tokens=1000, stream=False):
+def plan_chat_completion(messages, route=None, model=None, max_tokens=None):
+    """
+    Resolve the model, token budget and timeout for a call (see routing.py).
+    
+    Args:
+        messages: List of message dicts
+        route: Route name from AI_ROUTES (assistant type or helper)
+        model: Explicit model, overriding the route
+        max_tokens: Explicit completion budget, overriding the route
+    
+    Returns:
+        Route dict with model, fallback_model, max_tokens and timeout
+    """
+    plan = choose_route(route, count_message_tokens(messages), client.metrics if client else None)
+    if model:
+        plan['model'] = model
+        if plan['fallback_model'] == model:
+            plan['fallback_model'] = ''
+    if max_tokens:
+        plan['max_tokens'] = max_tokens
+    return plan
+
+
+def get_chat_completion(messages, model=None, temperature=0.7, max_tokens=None, stream=False, cache_as=None, route=None):
     """
     Get chat completion from OpenAI API.
     
     Args:
         messages: List of message dicts with 'role' and 'content'
-        model: Model to use (default: gpt-4o-mini)
+        model: Model to use (default: chosen by the route)
         temperature: Sampling temperature
-        max_tokens: Maximum tokens to generate
+        max_tokens: Maximum tokens to generate (default: the route's budget)
         stream: Whether to stream the response
+        cache_as: Helper name used for the response cache; only helpers listed
+            in AI_RESPONSE_CACHE['HELPERS'] are cached, and never when streaming.
+            Concurrent identical calls of helpers listed in
+            AI_SINGLE_FLIGHT['HELPERS'] are coalesced into one upstream call
+        route: Route name in AI_ROUTES (model, budget, latency SLO, fallback)
     
     Returns:
         Response text from the assistant (or generator if streaming)
     """
+    plan = plan_chat_completion(messages, route, model, max_tokens)
+    if not stream and single_flight.enabled_for(cache_as):
+        # Identical concurrent requests share one upstream call
+        key = make_cache_key(plan['model'], messages, temperature=temperature, max_tokens=plan['max_tokens'])
+        return single_flight.do(key, _request_chat_completion, messages, plan, temperature, stream, cache_as)
+    return _request_chat_completion(messages, plan, temperature, stream, cache_as)
+
+
+def _create_with_fallback(plan, **params):
+    """Call the routed model; on timeout, try the route's fallback model once within the same deadline."""
+    fallback_model = plan['fallback_model']
+    deadline = time.monotonic() + client.config['DEADLINE']
+    try:
+        return client.create_chat_completion(
+            model=plan['model'], timeout=plan['timeout'], deadline=deadline, **params
+        )
+    except AITimeoutError:
+        if not fallback_model:
+            raise
+        logger.warning(f"{plan['model']} timed out on route {plan['name']}, falling back to {fallback_model}")
+        return client.create_chat_completion(model=fallback_model, deadline=deadline, **params)
+
+
+async def _acreate_with_fallback(plan, **params):
+    fallback_model = plan['fallback_model']
+    deadline = time.monotonic() + client.config['DEADLINE']
+    try:
+        return await client.acreate_chat_completion(
+            model=plan['model'], timeout=plan['timeout'], deadline=deadline, **params
+        )
+    except AITimeoutError:
+        if not fallback_model:
+            raise
+        logger.warning(f"{plan['model']} timed out on route {plan['name']}, falling back to {fallback_model}")
+        return await client.acreate_chat_completion(model=fallback_model, deadline=deadline, **params)
+
+
+def _request_chat_completion(messages, plan, temperature, stream, cache_as):
+    max_tokens = plan['max_tokens']
+    ttl = None if stream else response_cache.ttl_for(cache_as)
+    if ttl:
+        cache_key = make_cache_key(plan['model'], messages, temperature=temperature, max_tokens=max_tokens)
+        cached = response_cache.get(cache_as, cache_key)
+        if cached is not None:
+            return cached
+    
     if not client:
-        raise Exception("OpenAI API key not configured. Please set OPENAI_API_KEY in your environment variables.")
+        raise AIServiceError("OpenAI API key not configured. Please set OPENAI_API_KEY in your environment variables.")
     
     try:
-        response = client.chat.completions.create(
-            model=model,
+        response = _create_with_fallback(
+            plan,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
@@ -47,9 +136,69 @@ def get_chat_completion(messages, model="gpt-4o-mini", temperature=0.7, max_toke
                         yield chunk.choices[0].delta.content
             return stream_generator()
         else:
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            if ttl and content:
+                response_cache.set(cache_as, cache_key, content, ttl)
+            return content
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        raise AIServiceError(f"Error calling OpenAI API: {str(e)}") from e
+
+
+async def aget_chat_completion(messages, model=None, temperature=0.7, max_tokens=None, stream=False, cache_as=None, route=None):
+    """
+    Async counterpart of get_chat_completion for ASGI views.
+    
+    Uses the same client policy, routing, breaker, metrics and response cache;
+    the upstream call runs on the event loop instead of blocking a thread.
+    
+    Returns:
+        Response text from the assistant (or async generator if streaming)
+    """
+    plan = plan_chat_completion(messages, route, model, max_tokens)
+    if not stream and single_flight.enabled_for(cache_as):
+        key = make_cache_key(plan['model'], messages, temperature=temperature, max_tokens=plan['max_tokens'])
+        return await single_flight.ado(key, _arequest_chat_completion, messages, plan, temperature, stream, cache_as)
+    return await _arequest_chat_completion(messages, plan, temperature, stream, cache_as)
+
+
+async def _arequest_chat_completion(messages, plan, temperature, stream, cache_as):
+    max_tokens = plan['max_tokens']
+    ttl = None if stream else response_cache.ttl_for(cache_as)
+    if ttl:
+        cache_key = make_cache_key(plan['model'], messages, temperature=temperature, max_tokens=max_tokens)
+        cached = await sync_to_async(response_cache.get)(cache_as, cache_key)
+        if cached is not None:
+            return cached
+    
+    if not client:
+        raise AIServiceError("OpenAI API key not configured. Please set OPENAI_API_KEY in your environment variables.")
+    
+    try:
+        response = await _acreate_with_fallback(
+            plan,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=stream,
+        )
+        
+        if stream:
+            async def stream_generator():
+                async for chunk in response:
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            return stream_generator()
+        else:
+            content = response.choices[0].message.content
+            if ttl and content:
+                await sync_to_async(response_cache.set)(cache_as, cache_key, content, ttl)
+            return content
+    except CircuitOpenError:
+        raise
     except Exception as e:
-        raise Exception(f"Error calling OpenAI API: {str(e)}")
+        raise AIServiceError(f"Error calling OpenAI API: {str(e)}") from e
 
 
 def estimate_tokens(text):
@@ -80,55 +229,387 @@ def count_message_tokens(messages):
         total += estimate_tokens(str(msg.get('role', '')) + str(msg.get('content', '')))
     return total
 
-def extract_text_from_pdf(pdf_file):
+def summarize_conversation(previous_summary, messages):
     """
-    Extract text from a PDF file.
+    Fold older conversation turns into a rolling summary.
     
     Args:
-        pdf_file: Django UploadedFile object
+        previous_summary: Existing summary text (may be empty)
+        messages: List of message dicts to fold into the summary
     
     Returns:
-        Extracted text as string
+        Updated summary text
+    """
+    transcript = "\n".join(
+        f"{msg['role']}: {msg['content'][:1000]}" for msg in messages
+    )
+    prompt = f"""Update the running summary of a conversation with the new turns below.
+Keep facts, decisions, open questions and user preferences. Stay under 200 words.
+
+Current summary:
+{previous_summary or "(none)"}
+
+New turns:
+{transcript}
+"""
+    
+    summary_messages = [
+        {"role": "system", "content": "You maintain concise summaries of conversations."},
+        {"role": "user", "content": prompt}
+    ]
+    
+    return get_chat_completion(summary_messages, temperature=0.3, route='conversation_summary').strip()
+
+
+def build_conversation_context(conversation, system_prompt, recent_messages=None, token_budget=None):
+    """
+    Build the message payload for a conversation within a token budget.
+    
+    The most recent messages are sent verbatim, preceded by
+    ``conversation.summary`` as a single system message. No LLM call is made
+    here: once at least AI_CONTEXT_FOLD_THRESHOLD turns older than the
+    verbatim tail (including turns trimmed to fit the budget) are waiting to
+    be summarized, the conversation is flagged with the tail's first message
+    as ``fold_before`` and the worker folds them (see
+    fold_conversation_summary).
+    
+    Args:
+        conversation: Conversation instance
+        system_prompt: System prompt for the assistant type
+        recent_messages: Maximum number of verbatim messages (default from settings)
+        token_budget: Approximate token budget for the payload (default from settings)
+    
+    Returns:
+        List of message dicts ready for get_chat_completion
+    """
+    recent_messages = recent_messages or getattr(settings, 'AI_CONTEXT_RECENT_MESSAGES', 12)
+    token_budget = token_budget or getattr(settings, 'AI_CONTEXT_TOKEN_BUDGET', 3000)
+    threshold = getattr(settings, 'AI_CONTEXT_FOLD_THRESHOLD', 8)
+    
+    # Only load the tail of the conversation, newest first
+    tail = list(
+        conversation.messages.order_by('-id').values('id', 'role', 'content')[:recent_messages]
+    )
+    tail.reverse()
+    
+    # Drop the oldest verbatim turns until the payload fits, always keeping the latest one
+    fixed_tokens = count_message_tokens([{"role": "system", "content": system_prompt}])
+    fixed_tokens += estimate_tokens(conversation.summary)
+    while len(tail) > 1 and fixed_tokens + count_message_tokens(tail) > token_budget:
+        tail.pop(0)
+    
+    # Queue a fold once enough turns have fallen out of the verbatim tail
+    first_verbatim = tail[0]['id'] if tail else None
+    if first_verbatim and (not conversation.summary_pending or conversation.fold_before != first_verbatim):
+        pending = conversation.messages.filter(id__lt=first_verbatim)
+        if conversation.summarized_through:
+            pending = pending.filter(id__gt=conversation.summarized_through)
+        if pending[threshold - 1:threshold].exists():
+            Conversation.objects.filter(id=conversation.id).update(summary_pending=True, fold_before=first_verbatim)
+            conversation.summary_pending, conversation.fold_before = True, first_verbatim
+    
+    payload = [{"role": "system", "content": system_prompt}]
+    if conversation.summary:
+        payload.append({
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n{conversation.summary}"
+        })
+    payload.extend({'role': msg['role'], 'content': msg['content']} for msg in tail)
+    return payload
+
+
+def fold_conversation_summary(conversation, batch_size=None):
+    """
+    Fold the turns before ``conversation.fold_before`` into the rolling summary.
+    
+    ``fold_before`` is the first message build_conversation_context still
+    sends verbatim, so every turn it left out (aged out of the window or
+    trimmed for the token budget) is folded. Turns are summarized in batches
+    of AI_CONTEXT_FOLD_BATCH, oldest first, and the summary is saved after
+    each batch so a failure only loses the batch in progress.
+    
+    Args:
+        conversation: Conversation instance
+        batch_size: Messages per summarization call (default from settings)
+    
+    Returns:
+        Number of messages folded
+    """
+    batch_size = batch_size or getattr(settings, 'AI_CONTEXT_FOLD_BATCH', 20)
+    if not conversation.fold_before:
+        return 0
+    pending = conversation.messages.filter(id__lt=conversation.fold_before)
+    if conversation.summarized_through:
+        pending = pending.filter(id__gt=conversation.summarized_through)
+    pending = list(pending.order_by('id').values('id', 'role', 'content'))
+    
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        conversation.summary = summarize_conversation(conversation.summary, batch)
+        conversation.summarized_through = batch[-1]['id']
+        conversation.save(update_fields=['summary', 'summarized_through'])
+    return len(pending)
+
+def iter_pdf_pages(pdf_file):
+    """
+    Yield the text of each PDF page, parsing pages only as they are consumed.
+    
+    Args:
+        pdf_file: Django UploadedFile object
+    
+    Yields:
+        Page text strings
     """
     if not PDF2_AVAILABLE:
         raise Exception("PyPDF2 is not installed. Please install it with: pip install PyPDF2")
     
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    for page in pdf_reader.pages:
+        yield page.extract_text() or ""
+
+
+def extract_text_from_pdf(pdf_file, max_chars=None):
+    """
+    Extract text from a PDF file.
+    
+    Pages are read one at a time and reading stops once ``max_chars`` is
+    reached. Results are cached by the file's SHA-256, so re-uploading the
+    same PDF skips parsing entirely.
+    
+    Args:
+        pdf_file: Django UploadedFile object
+        max_chars: Stop reading pages after this many characters (default: all)
+    
+    Returns:
+        Extracted text as string
+    """
     try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        text_cache = caches[getattr(settings, 'AI_PDF_TEXT_CACHE', 'default')]
+        # Content-addressed uploads carry their digest in the name, so only other files are hashed
+        digest = blob_digest(getattr(pdf_file, 'name', None)) or file_sha256(pdf_file)
+        cache_key = f"pdf_text:{digest}"
+        cached = text_cache.get(cache_key)
+        if cached and (cached['complete'] or (max_chars and len(cached['text']) >= max_chars)):
+            return cached['text'][:max_chars] if max_chars else cached['text']
+        
+        pages = []
+        length = 0
+        complete = True
+        for page_text in iter_pdf_pages(pdf_file):
+            pages.append(page_text)
+            pages.append("\n")
+            length += len(page_text) + 1
+            if max_chars and length >= max_chars:
+                complete = False
+                break
+        text = "".join(pages)
+        
+        text_cache.set(cache_key, {'text': text, 'complete': complete}, getattr(settings, 'AI_PDF_TEXT_CACHE_TIMEOUT', 60 * 60 * 24))
+        return text[:max_chars] if max_chars else text
     except Exception as e:
         raise Exception(f"Error extracting text from PDF: {str(e)}")
 
-def analyze_pdf(pdf_file, filename=""):
+ANALYSIS_SYSTEM_PROMPT = "You are a helpful assistant that analyzes documents and extracts key information."
+
+ANALYSIS_FORMAT = """Format your response as:
+SUMMARY:
+[your summary here]
+
+KEY POINTS:
+1. [point 1]
+2. [point 2]
+...
+"""
+
+
+def parse_analysis_response(response):
+    """
+    Split a SUMMARY/KEY POINTS formatted response into its parts.
+    
+    Args:
+        response: Model response text
+    
+    Returns:
+        Dict with 'summary' and 'key_points'
+    """
+    summary = ""
+    key_points = []
+    
+    if "SUMMARY:" in response:
+        parts = response.split("KEY POINTS:")
+        summary = parts[0].replace("SUMMARY:", "").strip()
+        if len(parts) > 1:
+            points_text = parts[1].strip()
+            key_points = [p.strip() for p in points_text.split('\n') if p.strip() and (p.strip().startswith(('1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '10.', '-')))]
+    else:
+        summary = response
+        key_points = []
+    
+    return {
+        'summary': summary,
+        'key_points': key_points
+    }
+
+
+def chunk_text(text, max_tokens):
+    """
+    Split text into chunks of at most ``max_tokens`` estimated tokens.
+    
+    Chunks break on paragraph boundaries where possible; paragraphs that are
+    too long on their own are split at the character limit.
+    
+    Args:
+        text: Text to split
+        max_tokens: Token bound per chunk
+    
+    Returns:
+        List of chunk strings
+    """
+    max_chars = max_tokens * 4
+    chunks = []
+    current = []
+    current_length = 0
+    for paragraph in text.split('\n\n'):
+        while len(paragraph) > max_chars:
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and current_length + len(paragraph) + 2 > max_chars:
+            chunks.append('\n\n'.join(current))
+            current = []
+            current_length = 0
+        current.append(paragraph)
+        current_length += len(paragraph) + 2
+    if current:
+        chunks.append('\n\n'.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def summarize_chunk(chunk, index, total):
+    """
+    Summarize one section of a long document (the map step).
+    
+    Returns:
+        Partial summary text
+    """
+    prompt = f"""This is part {index + 1} of {total} of a longer document.
+Summarize this part in one paragraph and list its most important points.
+
+Text:
+{chunk}
+"""
+    
+    messages = [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    
+    return get_chat_completion(messages, temperature=0.3, route='pdf_chunk')
+
+
+def summarize_document_chunked(text, progress=None):
+    """
+    Summarize a long document with map-reduce.
+    
+    Chunks are summarized concurrently on a bounded thread pool, then the
+    partial summaries are reduced into one summary and key point list.
+    
+    Args:
+        text: Full document text
+        progress: Optional callable receiving a completion percentage
+    
+    Returns:
+        Dict with 'summary' and 'key_points'
+    """
+    chunks = chunk_text(text, getattr(settings, 'AI_SUMMARY_CHUNK_TOKENS', 3000))
+    max_workers = getattr(settings, 'AI_SUMMARY_MAX_WORKERS', 4)
+    
+    partials = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(summarize_chunk, chunk, index, len(chunks)): index
+            for index, chunk in enumerate(chunks)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            partials[futures[future]] = future.result()
+            if progress:
+                progress(40 + int(50 * done / len(chunks)))
+    
+    sections = "\n\n".join(
+        f"Part {index + 1}:\n{partial}" for index, partial in enumerate(partials)
+    )
+    prompt = f"""The following are summaries of consecutive parts of one document.
+Combine them and provide:
+1. A concise summary of the whole document (2-3 paragraphs)
+2. A list of 5-10 key points
+
+{sections}
+
+{ANALYSIS_FORMAT}"""
+    
+    messages = [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    
+    return parse_analysis_response(get_chat_completion(messages, route='pdf_analysis'))
+
+
+def analyze_pdf(pdf_file, filename="", progress=None, draft=None):
     """
     Analyze a PDF and generate summary and key points.
     
+    Documents longer than PDF_ANALYSIS_MAX_CHARS are summarized in chunks
+    (see summarize_document_chunked) when AI_PDF_CHUNKED_SUMMARIES is on;
+    otherwise they are truncated. When the AI service is unavailable and
+    AI_PDF_EXTRACTIVE_FALLBACK is on, the local extractive summary (see
+    extractive.py) is returned instead.
+    
     Args:
         pdf_file: Django UploadedFile object
         filename: Original filename
+        progress: Optional callable receiving a completion percentage
+        draft: Optional callable receiving the quick extractive result before
+            the LLM is called, so it can be shown while the analysis runs
     
     Returns:
-        Dict with 'summary' and 'key_points'
+        Dict with 'summary', 'key_points' and 'source' ('ai' or 'extractive')
     """
-    if not client:
-        raise Exception("OpenAI API key not configured.")
+    fallback = getattr(settings, 'AI_PDF_EXTRACTIVE_FALLBACK', True)
+    if not client and not fallback:
+        raise AIServiceError("OpenAI API key not configured.")
     
     try:
-        # Extract text from PDF
-        text = extract_text_from_pdf(pdf_file)
+        chunked = getattr(settings, 'AI_PDF_CHUNKED_SUMMARIES', True)
+        max_chars = getattr(settings, 'AI_PDF_MAX_CHARS', 200000) if chunked else PDF_ANALYSIS_MAX_CHARS
+        
+        # Extract text from PDF, reading one character past the limit to detect truncation
+        text = extract_text_from_pdf(pdf_file, max_chars=max_chars + 1)
+        if progress:
+            progress(40)
         
         if len(text) < 100:
             return {
                 'summary': 'PDF appears to be empty or contains only images.',
-                'key_points': []
+                'key_points': [],
+                'source': '',
             }
         
-        # Truncate if too long (keep first 10000 chars)
-        if len(text) > 10000:
-            text = text[:10000] + "... [truncated]"
+        if len(text) > max_chars:
+            text = text[:max_chars] + "... [truncated]"
+        
+        extractive = None
+        if draft or not client:
+            extractive = {**summarize_extractive(text), 'source': 'extractive'}
+        if draft:
+            draft(extractive)
+        if not client:
+            return extractive
+    except Exception as e:
+        raise AIServiceError(f"Error analyzing PDF: {str(e)}") from e
+    
+    try:
+        if chunked and len(text) > PDF_ANALYSIS_MAX_CHARS:
+            return {**summarize_document_chunked(text, progress=progress), 'source': 'ai'}
         
         # Generate summary and key points
         prompt = f"""Analyze the following document and provide:
@@ -138,43 +619,58 @@ def analyze_pdf(pdf_file, filename=""):
 Document:
 {text}
 
-Format your response as:
-SUMMARY:
-[your summary here]
-
-KEY POINTS:
-1. [point 1]
-2. [point 2]
-...
-"""
+{ANALYSIS_FORMAT}"""
         
         messages = [
-            {"role": "system", "content": "You are a helpful assistant that analyzes documents and extracts key information."},
+            {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ]
         
-        response = get_chat_completion(messages, max_tokens=1500)
-        
-        # Parse response
-        summary = ""
-        key_points = []
-        
-        if "SUMMARY:" in response:
-            parts = response.split("KEY POINTS:")
-            summary = parts[0].replace("SUMMARY:", "").strip()
-            if len(parts) > 1:
-                points_text = parts[1].strip()
-                key_points = [p.strip() for p in points_text.split('\n') if p.strip() and (p.strip().startswith(('1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '10.', '-')))]
-        else:
-            summary = response
-            key_points = []
-        
-        return {
-            'summary': summary,
-            'key_points': key_points
-        }
+        response = get_chat_completion(messages, route='pdf_analysis')
+        return {**parse_analysis_response(response), 'source': 'ai'}
     except Exception as e:
-        raise Exception(f"Error analyzing PDF: {str(e)}")
+        if not fallback:
+            raise AIServiceError(f"Error analyzing PDF: {str(e)}") from e
+        logger.warning(f"AI analysis of {filename or 'PDF'} failed, using extractive summary: {e}")
+        return extractive or {**summarize_extractive(text), 'source': 'extractive'}
+
+def run_prompt_template(template, rows):
+    """
+    Render a prompt template for each row of variables and run the prompts.
+    
+    Rows run concurrently on a bounded thread pool (AI_TEMPLATE_BATCH_WORKERS);
+    a row with missing variables or a failed completion reports its error
+    without affecting the others.
+    
+    Args:
+        template: PromptTemplate to render
+        rows: List of dicts mapping variable names to values
+    
+    Returns:
+        List of dicts (one per row, in order) with 'prompt' and either
+        'response' or 'error'
+    """
+    compiled = template.compiled()
+    
+    def run(values):
+        try:
+            prompt = compiled.render(values)
+        except TemplateVariableError as e:
+            return {'prompt': None, 'error': str(e), 'missing': e.missing}
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": prompt}
+        ]
+        try:
+            return {'prompt': prompt, 'response': get_chat_completion(messages, route=template.category)}
+        except AIServiceError as e:
+            return {'prompt': prompt, 'error': str(e)}
+    
+    if len(rows) <= 1:
+        return [run(values) for values in rows]
+    max_workers = min(getattr(settings, 'AI_TEMPLATE_BATCH_WORKERS', 4), len(rows))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run, rows))
 
 def generate_questions(course_name, topic, num_questions=5):
     """
@@ -189,7 +685,7 @@ def generate_questions(course_name, topic, num_questions=5):
         List of question strings
     """
     if not client:
-        raise Exception("OpenAI API key not configured.")
+        raise AIServiceError("OpenAI API key not configured.")
     
     try:
         prompt = f"""Generate {num_questions} study questions for the course "{course_name}" on the topic: {topic}
@@ -203,7 +699,7 @@ Make the questions challenging but appropriate for the course level.
             {"role": "user", "content": prompt}
         ]
         
-        response = get_chat_completion(messages, max_tokens=1000)
+        response = get_chat_completion(messages, cache_as='generate_questions', route='questions')
         
         # Parse questions
         questions = []
@@ -221,9 +717,34 @@ Make the questions challenging but appropriate for the course level.
         
         return questions[:num_questions]
     except Exception as e:
-        raise Exception(f"Error generating questions: {str(e)}")
+        raise AIServiceError(f"Error generating questions: {str(e)}") from e
+
+def build_study_help_messages(course_name, topic, question, context_passages=None):
+    prompt = f"""You are a study assistant for the course "{course_name}" focusing on "{topic}".
+
+Student's question: {question}
+"""
+    if context_passages:
+        excerpts = "\n\n".join(
+            f"[{index}] {passage['title']}:\n{passage['text']}"
+            for index, passage in enumerate(context_passages, start=1)
+        )
+        prompt += f"""
+Relevant excerpts from the student's own notes and documents:
+{excerpts}
 
-def get_study_help(course_name, topic, question):
+Ground your answer in these excerpts where they apply and cite them by number.
+"""
+    prompt += """
+Provide a clear, educational answer that helps the student understand the concept.
+"""
+    
+    return [
+        {"role": "system", "content": "You are a helpful study assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+def get_study_help(course_name, topic, question, context_passages=None):
     """
     Get study help for a specific question.
     
@@ -231,29 +752,51 @@ def get_study_help(course_name, topic, question):
         course_name: Name of the course
         topic: Topic area
         question: Student's question
+        context_passages: Retrieved passages (see retrieval.search_passages) to ground the answer
     
     Returns:
         Helpful response text
     """
     if not client:
-        raise Exception("OpenAI API key not configured.")
+        raise AIServiceError("OpenAI API key not configured.")
     
     try:
-        prompt = f"""You are a study assistant for the course "{course_name}" focusing on "{topic}".
+        messages = build_study_help_messages(course_name, topic, question, context_passages)
+        return get_chat_completion(messages, cache_as='get_study_help', route='study')
+    except Exception as e:
+        raise AIServiceError(f"Error getting study help: {str(e)}") from e
 
-Student's question: {question}
+async def aget_study_help(course_name, topic, question, context_passages=None):
+    """Async counterpart of get_study_help."""
+    if not client:
+        raise AIServiceError("OpenAI API key not configured.")
+    
+    try:
+        messages = build_study_help_messages(course_name, topic, question, context_passages)
+        return await aget_chat_completion(messages, cache_as='get_study_help', route='study')
+    except Exception as e:
+        raise AIServiceError(f"Error getting study help: {str(e)}") from e
 
-Provide a clear, educational answer that helps the student understand the concept.
+def build_code_assistance_messages(code, language, question=""):
+    prompt = f"""You are a code assistant. Review this {language} code and provide helpful feedback.
+
+Code:
+```{language}
+{code}
+```
+
+Question/Request: {question or "Please review this code and provide suggestions for improvement."}
+
+Provide:
+1. Code review comments
+2. Suggestions for improvement
+3. Any potential bugs or issues
 """
-        
-        messages = [
-            {"role": "system", "content": "You are a helpful study assistant."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        return get_chat_completion(messages, max_tokens=1000)
-    except Exception as e:
-        raise Exception(f"Error getting study help: {str(e)}")
+    
+    return [
+        {"role": "system", "content": "You are an expert code reviewer and programming assistant."},
+        {"role": "user", "content": prompt}
+    ]
 
 def get_code_assistance(code, language, question=""):
     """
@@ -268,32 +811,40 @@ def get_code_assistance(code, language, question=""):
         Assistance response
     """
     if not client:
-        raise Exception("OpenAI API key not configured.")
+        raise AIServiceError("OpenAI API key not configured.")
     
     try:
-        prompt = f"""You are a code assistant. Review this {language} code and provide helpful feedback.
+        messages = build_code_assistance_messages(code, language, question)
+        return get_chat_completion(messages, cache_as='get_code_assistance', route='code')
+    except Exception as e:
+        raise AIServiceError(f"Error getting code assistance: {str(e)}") from e
 
-Code:
-```{language}
-{code}
-```
+async def aget_code_assistance(code, language, question=""):
+    """Async counterpart of get_code_assistance."""
+    if not client:
+        raise AIServiceError("OpenAI API key not configured.")
+    
+    try:
+        messages = build_code_assistance_messages(code, language, question)
+        return await aget_chat_completion(messages, cache_as='get_code_assistance', route='code')
+    except Exception as e:
+        raise AIServiceError(f"Error getting code assistance: {str(e)}") from e
 
-Question/Request: {question or "Please review this code and provide suggestions for improvement."}
+def build_writing_assistance_messages(text, request_type="review"):
+    prompt = f"""You are a writing assistant. {request_type.capitalize()} the following text:
+
+{text}
 
 Provide:
-1. Code review comments
-2. Suggestions for improvement
-3. Any potential bugs or issues
+1. Overall feedback
+2. Grammar and style suggestions
+3. Suggestions for improvement
 """
-        
-        messages = [
-            {"role": "system", "content": "You are an expert code reviewer and programming assistant."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        return get_chat_completion(messages, max_tokens=1500)
-    except Exception as e:
-        raise Exception(f"Error getting code assistance: {str(e)}")
+    
+    return [
+        {"role": "system", "content": "You are a helpful writing assistant."},
+        {"role": "user", "content": prompt}
+    ]
 
 def get_writing_assistance(text, request_type="review"):
     """
@@ -307,27 +858,50 @@ def get_writing_assistance(text, request_type="review"):
         Assistance response
     """
     if not client:
-        raise Exception("OpenAI API key not configured.")
+        raise AIServiceError("OpenAI API key not configured.")
     
     try:
-        prompt = f"""You are a writing assistant. {request_type.capitalize()} the following text:
+        messages = build_writing_assistance_messages(text, request_type)
+        return get_chat_completion(messages, cache_as='get_writing_assistance', route='writing')
+    except Exception as e:
+        raise AIServiceError(f"Error getting writing assistance: {str(e)}") from e
 
-{text}
+async def aget_writing_assistance(text, request_type="review"):
+    """Async counterpart of get_writing_assistance."""
+    if not client:
+        raise AIServiceError("OpenAI API key not configured.")
+    
+    try:
+        messages = build_writing_assistance_messages(text, request_type)
+        return await aget_chat_completion(messages, cache_as='get_writing_assistance', route='writing')
+    except Exception as e:
+        raise AIServiceError(f"Error getting writing assistance: {str(e)}") from e
+
+def build_course_recommendation_messages(interests, current_courses=None):
+    if isinstance(interests, list):
+        interests_str = ", ".join(interests)
+    else:
+        interests_str = interests
+    
+    current_str = ""
+    if current_courses:
+        current_str = f"\nCurrent courses: {', '.join(current_courses)}"
+    
+    prompt = f"""Based on the following interests, recommend relevant courses or learning paths:
+
+Interests: {interests_str}
+{current_str}
 
 Provide:
-1. Overall feedback
-2. Grammar and style suggestions
-3. Suggestions for improvement
+1. Recommended courses
+2. Why these courses are relevant
+3. Suggested learning path
 """
-        
-        messages = [
-            {"role": "system", "content": "You are a helpful writing assistant."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        return get_chat_completion(messages, max_tokens=1500)
-    except Exception as e:
-        raise Exception(f"Error getting writing assistance: {str(e)}")
+    
+    return [
+        {"role": "system", "content": "You are an educational advisor that recommends courses."},
+        {"role": "user", "content": prompt}
+    ]
 
 def get_course_recommendations(interests, current_courses=None):
     """
@@ -341,35 +915,21 @@ def get_course_recommendations(interests, current_courses=None):
         Recommendation text
     """
     if not client:
-        raise Exception("OpenAI API key not configured.")
+        raise AIServiceError("OpenAI API key not configured.")
     
     try:
-        if isinstance(interests, list):
-            interests_str = ", ".join(interests)
-        else:
-            interests_str = interests
-        
-        current_str = ""
-        if current_courses:
-            current_str = f"\nCurrent courses: {', '.join(current_courses)}"
-        
-        prompt = f"""Based on the following interests, recommend relevant courses or learning paths:
-
-Interests: {interests_str}
-{current_str}
-
-Provide:
-1. Recommended courses
-2. Why these courses are relevant
-3. Suggested learning path
-"""
-        
-        messages = [
-            {"role": "system", "content": "You are an educational advisor that recommends courses."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        return get_chat_completion(messages, max_tokens=1000)
+        messages = build_course_recommendation_messages(interests, current_courses)
+        return get_chat_completion(messages, cache_as='get_course_recommendations', route='recommendations')
     except Exception as e:
-        raise Exception(f"Error getting course recommendations: {str(e)}")
+        raise AIServiceError(f"Error getting course recommendations: {str(e)}") from e
 
+async def aget_course_recommendations(interests, current_courses=None):
+    """Async counterpart of get_course_recommendations."""
+    if not client:
+        raise AIServiceError("OpenAI API key not configured.")
+    
+    try:
+        messages = build_course_recommendation_messages(interests, current_courses)
+        return await aget_chat_completion(messages, cache_as='get_course_recommendations', route='recommendations')
+    except Exception as e:
+        raise AIServiceError(f"Error getting course recommendations: {str(e)}") from e
@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+import logging
+from academic.models import Note
+from productivity.blobs import track_blob_field
+from .models import PDFAnalysis, PromptTemplate
+from .prompts import template_cache
+from .retrieval import index_analysis, index_note, remove_document
+
+logger = logging.getLogger(__name__)
+
+track_blob_field(PDFAnalysis, 'file')
+
+
+@receiver(post_save, sender=Note)
+def index_saved_note(sender, instance, **kwargs):
+    """Keep the retrieval index in sync with note edits"""
+    try:
+        index_note(instance)
+    except Exception as e:
+        logger.error(f"Error indexing note {instance.id}: {e}", exc_info=True)
+
+
+@receiver(post_delete, sender=Note)
+def unindex_deleted_note(sender, instance, **kwargs):
+    remove_document('note', instance.id)
+
+
+@receiver(post_save, sender=PDFAnalysis)
+def index_saved_analysis(sender, instance, update_fields=None, **kwargs):
+    """Index analyses once their summary is written"""
+    if update_fields is not None and 'summary' not in update_fields and 'status' not in update_fields:
+        return
+    try:
+        index_analysis(instance)
+    except Exception as e:
+        logger.error(f"Error indexing PDF analysis {instance.id}: {e}", exc_info=True)
+
+
+@receiver(post_delete, sender=PDFAnalysis)
+def unindex_deleted_analysis(sender, instance, **kwargs):
+    remove_document('pdf', instance.id)
+
+
+@receiver(post_save, sender=PromptTemplate)
+@receiver(post_delete, sender=PromptTemplate)
+def invalidate_compiled_template(sender, instance, **kwargs):
+    template_cache.invalidate(instance.pk)
@@ -0,0 +1,192 @@
+"""
+Single-flight coalescing of identical concurrent AI requests.
+
+When several callers ask for the same completion at the same time, only the
+first one (the leader) calls upstream; the others wait for its result. Within
+a process this uses a lock and futures; with ``CROSS_PROCESS`` enabled the
+leader also takes a lock in a shared Django cache and publishes its result
+there, so waiters in other workers can reuse it.
+"""
+import asyncio
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_SINGLE_FLIGHT_SETTINGS = {
+    'ENABLED': True,
+    # Needs a cache shared by all workers (e.g. Redis); locmem is per process
+    'CROSS_PROCESS': False,
+    'CACHE': 'default',
+    'LOCK_TIMEOUT': 90,
+    'RESULT_TIMEOUT': 30,
+    'POLL_INTERVAL': 0.1,
+    # Helpers (cache_as names) whose calls are coalesced
+    'HELPERS': [],
+}
+
+
+def get_single_flight_settings():
+    config = dict(DEFAULT_SINGLE_FLIGHT_SETTINGS)
+    config.update(getattr(settings, 'AI_SINGLE_FLIGHT', {}))
+    return config
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        # In-flight asyncio tasks, one map per event loop
+        self._async_calls = weakref.WeakKeyDictionary()
+        self._stats = {'leaders': 0, 'coalesced': 0, 'shared': 0}
+
+    def enabled_for(self, helper):
+        config = get_single_flight_settings()
+        return bool(helper) and config['ENABLED'] and helper in config['HELPERS']
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run ``fn(*args, **kwargs)`` once for all concurrent callers with ``key``.
+
+        Args:
+            key: Identity of the request (e.g. a cache key)
+            fn: Callable that performs the upstream call
+
+        Returns:
+            The leader's result; its exception is re-raised to every waiter
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self._stats['leaders'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._run_shared(key, fn, *args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key, fn, *args, **kwargs):
+        """
+        Async counterpart of do: ``fn`` is a coroutine function.
+
+        Coroutines on the same event loop share one task; the task is shielded
+        so a cancelled waiter does not cancel the call for everyone else.
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is None:
+            self._count('leaders')
+            task = loop.create_task(self._arun_shared(key, fn, *args, **kwargs))
+            calls[key] = task
+            task.add_done_callback(lambda done: calls.pop(key, None))
+        else:
+            self._count('coalesced')
+        return await asyncio.shield(task)
+
+    def _cache_keys(self, key):
+        return f'singleflight:lock:{key}', f'singleflight:result:{key}'
+
+    def _run_shared(self, key, fn, *args, **kwargs):
+        """Run fn, first waiting on a leader in another process if one holds the lock."""
+        config = get_single_flight_settings()
+        if not config['CROSS_PROCESS']:
+            return fn(*args, **kwargs)
+
+        cache = caches[config['CACHE']]
+        lock_key, result_key = self._cache_keys(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + config['LOCK_TIMEOUT']
+        while True:
+            # A finished leader releases its lock, so look for its result before competing for it
+            result = cache.get(result_key)
+            if result is not None:
+                self._count('shared')
+                return result
+            if cache.add(lock_key, token, config['LOCK_TIMEOUT']):
+                break
+            if time.monotonic() > deadline:
+                return fn(*args, **kwargs)
+            time.sleep(config['POLL_INTERVAL'])
+
+        try:
+            # The previous leader may have published and released between our check and add
+            result = cache.get(result_key)
+            if result is not None:
+                self._count('shared')
+                return result
+            result = fn(*args, **kwargs)
+            if result is not None:
+                cache.set(result_key, result, config['RESULT_TIMEOUT'])
+            return result
+        finally:
+            # Best effort: the lock may have expired and been taken by another leader
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    async def _arun_shared(self, key, fn, *args, **kwargs):
+        config = get_single_flight_settings()
+        if not config['CROSS_PROCESS']:
+            return await fn(*args, **kwargs)
+
+        cache = caches[config['CACHE']]
+        lock_key, result_key = self._cache_keys(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + config['LOCK_TIMEOUT']
+        while True:
+            result = await sync_to_async(cache.get)(result_key)
+            if result is not None:
+                self._count('shared')
+                return result
+            if await sync_to_async(cache.add)(lock_key, token, config['LOCK_TIMEOUT']):
+                break
+            if time.monotonic() > deadline:
+                return await fn(*args, **kwargs)
+            await asyncio.sleep(config['POLL_INTERVAL'])
+
+        try:
+            result = await sync_to_async(cache.get)(result_key)
+            if result is not None:
+                self._count('shared')
+                return result
+            result = await fn(*args, **kwargs)
+            if result is not None:
+                await sync_to_async(cache.set)(result_key, result, config['RESULT_TIMEOUT'])
+            return result
+        finally:
+            if await sync_to_async(cache.get)(lock_key) == token:
+                await sync_to_async(cache.delete)(lock_key)
+
+    def stats(self):
+        """Leader calls, callers that waited on a local leader, and results shared across processes."""
+        with self._lock:
+            return dict(self._stats)
+
+
+single_flight = SingleFlight()
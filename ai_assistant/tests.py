@@ -1,8 +1,40 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import openai
+from datetime import timedelta
+from io import BytesIO
+
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
-from unittest.mock import patch
+from django.utils import timezone
+from django.core.cache import cache
+from django.test import override_settings
+from django.test import AsyncRequestFactory
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from unittest.mock import AsyncMock, MagicMock, patch
 from .models import Conversation, Message, PromptTemplate, PDFAnalysis
+from . import async_views
+from .cache import response_cache
+from .extractive import split_sentences, summarize_extractive
+from .fake_openai import start_background_server
+from .loadtest import LoadTestSession, percentile, run_scenario, summarize_results
+from .prompts import TemplateVariableError, compile_template, template_cache
+from .retrieval import rebuild_index, search_passages, split_passages
+from .routing import choose_route
+from .singleflight import SingleFlight
+from .client import AIServiceError, AITimeoutError, CircuitOpenError, ClientMetrics, ResilientOpenAIClient, get_client_settings
+from .jobs import claim_next_analysis, fold_pending_summaries, process_queued_analyses, requeue_stale_analyses
+from .models import CachedResponse, IndexedPassage
+from .services import (
+    aget_chat_completion, aget_course_recommendations, analyze_pdf, build_conversation_context, chunk_text,
+    extract_text_from_pdf, file_sha256, generate_questions, get_chat_completion, get_writing_assistance
+)
 
 User = get_user_model()
 
@@ -50,6 +82,398 @@ class MessageModelTest(TestCase):
         self.assertIn('Hello', str(message))
 
 
+@override_settings(AI_CONVERSATION_PAGE_SIZE=10)
+class ConversationPaginationTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user()
+        self.conversation = Conversation.objects.create(user=self.user, title='Long chat')
+        Message.objects.bulk_create(
+            Message(conversation=self.conversation, role='user' if n % 2 == 0 else 'assistant', content=f'Message {n}')
+            for n in range(25)
+        )
+        # Identical timestamps force the id tie-breaker
+        Message.objects.update(timestamp=timezone.now())
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_detail_renders_only_the_latest_page(self):
+        response = self.client.get(reverse('conversation_detail', args=[self.conversation.id]))
+
+        contents = [message.content for message in response.context['messages']]
+        self.assertEqual(contents, [f'Message {n}' for n in range(15, 25)])
+        self.assertIsNotNone(response.context['earlier_cursor'])
+        self.assertNotContains(response, 'Message 14<')
+
+    def test_earlier_pages_walk_back_to_the_first_message(self):
+        url = reverse('conversation_messages', args=[self.conversation.id])
+        cursor = self.client.get(reverse('conversation_detail', args=[self.conversation.id])).context['earlier_cursor']
+        pages = []
+        while cursor:
+            with self.assertNumQueries(4):
+                data = self.client.get(url, {'before': cursor}).json()
+            pages.append([message['content'] for message in data['messages']])
+            cursor = data['next_cursor']
+
+        self.assertEqual(pages, [
+            [f'Message {n}' for n in range(5, 15)],
+            [f'Message {n}' for n in range(0, 5)],
+        ])
+        self.assertFalse(data['has_more'])
+
+    def test_invalid_cursor_and_other_users_are_rejected(self):
+        url = reverse('conversation_messages', args=[self.conversation.id])
+        self.assertEqual(self.client.get(url, {'before': 'garbage'}).status_code, 400)
+
+        other = create_test_user('other@example.com', username='other')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ConversationContextTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user()
+        self.conversation = Conversation.objects.create(user=self.user, assistant_type='general')
+        for index in range(6):
+            Message.objects.create(
+                conversation=self.conversation,
+                role='user' if index % 2 == 0 else 'assistant',
+                content=f'Turn {index}'
+            )
+
+    @override_settings(AI_CONTEXT_FOLD_THRESHOLD=4)
+    @patch('ai_assistant.services.get_chat_completion', return_value='Earlier turns summary')
+    def test_older_turns_are_folded_by_the_worker(self, mock_completion):
+        payload = build_conversation_context(self.conversation, 'System', recent_messages=2)
+
+        # Building the payload never waits on the summarizer
+        mock_completion.assert_not_called()
+        self.assertEqual([item['content'] for item in payload[1:]], ['Turn 4', 'Turn 5'])
+        self.conversation.refresh_from_db()
+        self.assertTrue(self.conversation.summary_pending)
+
+        with self.settings(AI_CONTEXT_FOLD_BATCH=3):
+            self.assertEqual(fold_pending_summaries(), 1)
+        self.assertEqual(mock_completion.call_count, 2)
+        self.conversation.refresh_from_db()
+        self.assertFalse(self.conversation.summary_pending)
+        self.assertEqual(self.conversation.summary, 'Earlier turns summary')
+        self.assertEqual(
+            self.conversation.summarized_through,
+            self.conversation.messages.get(content='Turn 3').id
+        )
+
+        payload = build_conversation_context(self.conversation, 'System', recent_messages=2)
+        self.assertIn('Earlier turns summary', payload[1]['content'])
+        self.assertEqual(fold_pending_summaries(), 0)
+        self.assertEqual(mock_completion.call_count, 2)
+
+    @patch('ai_assistant.services.get_chat_completion', return_value='Summary')
+    def test_short_backlog_is_not_folded(self, mock_completion):
+        build_conversation_context(self.conversation, 'System', recent_messages=2)
+
+        self.conversation.refresh_from_db()
+        self.assertFalse(self.conversation.summary_pending)
+        self.assertEqual(fold_pending_summaries(), 0)
+        mock_completion.assert_not_called()
+
+    @patch('ai_assistant.services.get_chat_completion', return_value='Summary')
+    def test_token_budget_trims_verbatim_turns(self, mock_completion):
+        Message.objects.create(conversation=self.conversation, role='user', content='x' * 400)
+
+        payload = build_conversation_context(self.conversation, 'System', recent_messages=10, token_budget=105)
+
+        self.assertEqual(payload[-1]['content'], 'x' * 400)
+        self.assertEqual(len([item for item in payload if item['role'] != 'system']), 1)
+
+    @override_settings(AI_CONTEXT_FOLD_THRESHOLD=4)
+    @patch('ai_assistant.services.get_chat_completion', return_value='Summary')
+    def test_turns_trimmed_for_budget_are_folded(self, mock_completion):
+        Message.objects.create(conversation=self.conversation, role='user', content='x' * 400)
+
+        # Every message is inside the window, but the budget only leaves room for the last one
+        build_conversation_context(self.conversation, 'System', recent_messages=10, token_budget=105)
+        self.assertEqual(fold_pending_summaries(), 1)
+
+        transcript = mock_completion.call_args.args[0][-1]['content']
+        self.assertIn('Turn 5', transcript)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.summarized_through, self.conversation.messages.get(content='Turn 5').id)
+
+        # Nothing left to fold, so the next turn does not flag the conversation again
+        build_conversation_context(self.conversation, 'System', recent_messages=10, token_budget=105)
+        self.conversation.refresh_from_db()
+        self.assertFalse(self.conversation.summary_pending)
+
+
+def mock_openai_client(content='Reply'):
+    client = MagicMock()
+    completion = MagicMock()
+    completion.choices[0].message.content = content
+    client.create_chat_completion.return_value = completion
+    return client
+
+
+@override_settings(AI_RESPONSE_CACHE={'HELPERS': {'generate_questions': 60}, 'MAX_ENTRIES': 2})
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        response_cache.clear_local()
+
+    def test_identical_helper_calls_hit_the_cache(self):
+        client = mock_openai_client('1. What is a closure?')
+        with patch('ai_assistant.services.client', client):
+            first = generate_questions('Python', 'Functions', 1)
+            second = generate_questions('Python', 'Functions', 1)
+
+        self.assertEqual(first, second)
+        self.assertEqual(client.create_chat_completion.call_count, 1)
+        self.assertEqual(CachedResponse.objects.get().helper, 'generate_questions')
+
+    def test_shared_tier_serves_other_processes(self):
+        client = mock_openai_client('1. Define recursion')
+        with patch('ai_assistant.services.client', client):
+            generate_questions('Python', 'Recursion', 1)
+            response_cache.clear_local()
+            generate_questions('Python', 'Recursion', 1)
+
+        self.assertEqual(client.create_chat_completion.call_count, 1)
+        self.assertEqual(CachedResponse.objects.get().hits, 1)
+        self.assertGreaterEqual(response_cache.stats()['generate_questions']['shared_hits'], 1)
+
+    @override_settings(AI_RESPONSE_CACHE={'MAX_ENTRIES': 2, 'PRUNE_RATE': 1})
+    def test_expired_and_excess_entries_are_evicted(self):
+        for index in range(3):
+            response_cache.set('generate_questions', f'key-{index}', f'value-{index}', 60)
+        self.assertEqual(CachedResponse.objects.count(), 2)
+
+        response_cache.clear_local()
+        CachedResponse.objects.update(expires_at=timezone.now())
+        self.assertIsNone(response_cache.get('generate_questions', 'key-2'))
+
+    @override_settings(AI_RESPONSE_CACHE={'MAX_ENTRIES': 2, 'PRUNE_RATE': 0})
+    def test_writes_only_prune_when_sampled(self):
+        with patch.object(response_cache, 'prune') as mock_prune:
+            for index in range(3):
+                response_cache.set('generate_questions', f'key-{index}', f'value-{index}', 60)
+        mock_prune.assert_not_called()
+        self.assertEqual(CachedResponse.objects.count(), 3)
+
+        response_cache.prune()
+        self.assertEqual(CachedResponse.objects.count(), 2)
+
+    def test_helpers_without_opt_in_are_not_cached(self):
+        client = mock_openai_client('Looks good')
+        with patch('ai_assistant.services.client', client):
+            get_writing_assistance('Some text')
+            get_writing_assistance('Some text')
+
+        self.assertEqual(client.create_chat_completion.call_count, 2)
+
+
+class RetrievalIndexTest(TestCase):
+    def setUp(self):
+        from academic.models import Course
+        self.user = create_test_user()
+        self.course = Course.objects.create(user=self.user, name='Biology')
+
+    def add_note(self, title, content, course=None):
+        from academic.models import Note
+        return Note.objects.create(course=course or self.course, title=title, content=content)
+
+    def test_saved_notes_are_ranked_by_relevance(self):
+        self.add_note('Cells', 'Mitochondria produce energy for the cell through respiration.')
+        self.add_note('Plants', 'Photosynthesis uses chlorophyll to turn light into chemical energy. '
+                      'Chlorophyll absorbs red and blue light during photosynthesis.')
+
+        results = search_passages(self.user, 'How does photosynthesis use light?')
+
+        self.assertEqual(results[0]['title'], 'Plants')
+        self.assertGreater(results[0]['score'], results[-1]['score'] if len(results) > 1 else 0)
+
+    def test_index_follows_edits_and_deletes(self):
+        note = self.add_note('Cells', 'Mitochondria produce energy.')
+        note.content = 'Ribosomes build proteins.'
+        note.save()
+        self.assertEqual(search_passages(self.user, 'mitochondria'), [])
+        self.assertEqual(len(search_passages(self.user, 'ribosomes')), 1)
+
+        note.delete()
+        self.assertEqual(search_passages(self.user, 'ribosomes'), [])
+        self.assertFalse(IndexedPassage.objects.exists())
+
+    def test_search_is_scoped_to_the_user(self):
+        from academic.models import Course
+        other = create_test_user('other@example.com', username='other')
+        self.add_note('Secret', 'Enzymes catalyse reactions.', Course.objects.create(user=other, name='Chem'))
+        self.assertEqual(search_passages(self.user, 'enzymes'), [])
+        self.assertEqual(len(search_passages(other, 'enzymes')), 1)
+
+    def test_pdf_analyses_are_indexed_once_done(self):
+        analysis = PDFAnalysis.objects.create(
+            user=self.user, file='ai_assistant/pdfs/osmosis.pdf', original_filename='osmosis.pdf',
+        )
+        analysis.summary = 'Osmosis moves water across membranes.'
+        analysis.save(update_fields=['summary'])
+        self.assertEqual(search_passages(self.user, 'osmosis'), [])
+
+        analysis.status = 'done'
+        analysis.save(update_fields=['summary', 'status'])
+        self.assertEqual(search_passages(self.user, 'osmosis')[0]['title'], 'osmosis.pdf')
+
+    def test_rebuild_and_passage_splitting(self):
+        self.add_note('Long', '\n\n'.join(['word ' * 50] * 5))
+        IndexedPassage.objects.all().delete()
+        self.assertEqual(rebuild_index(self.user), 3)
+        self.assertEqual([len(p.split()) for p in split_passages('a ' * 250, 100)], [100, 100, 50])
+
+    def test_study_helper_prompt_includes_retrieved_passages(self):
+        self.add_note('Plants', 'Chlorophyll absorbs red and blue light.')
+        client = Client()
+        client.login(email='test@example.com', password='testpass123')
+        mock_client = mock_openai_client('Grounded answer')
+
+        with patch('ai_assistant.services.client', mock_client):
+            response = client.post(reverse('study_helper'), {
+                'course_id': self.course.id, 'topic': 'Light', 'question': 'What does chlorophyll absorb?',
+            })
+
+        self.assertContains(response, 'Grounded answer')
+        self.assertContains(response, 'Sources from your notes')
+        prompt = mock_client.create_chat_completion.call_args.kwargs['messages'][-1]['content']
+        self.assertIn('[1] Plants:\nChlorophyll absorbs red and blue light.', prompt)
+
+
+class SingleFlightTest(TestCase):
+    def run_concurrently(self, target, count=5):
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(target())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            release.wait(5)
+            return 'shared'
+
+        threads, results, errors = self.run_concurrently(lambda: flight.do('key', slow_call))
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['shared'] * 5)
+        self.assertEqual(flight.stats()['coalesced'], 4)
+
+    def test_leader_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def failing_call():
+            release.wait(5)
+            raise AIServiceError('upstream down')
+
+        threads, results, errors = self.run_concurrently(lambda: flight.do('key', failing_call), count=3)
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(flight.do('key', lambda: 'recovered'), 'recovered')
+
+    @override_settings(AI_SINGLE_FLIGHT={'CROSS_PROCESS': True, 'POLL_INTERVAL': 0.01})
+    def test_workers_sharing_a_cache_make_one_call(self):
+        # Each SingleFlight stands in for a worker process; the cache is shared like Redis
+        leader, waiter, latecomer = SingleFlight(), SingleFlight(), SingleFlight()
+        self.addCleanup(cache.clear)
+        release = threading.Event()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            release.wait(5)
+            return 'shared'
+
+        threads, results, errors = self.run_concurrently(lambda: leader.do('key', slow_call), count=1)
+        time.sleep(0.05)
+        more_threads, more_results, _ = self.run_concurrently(lambda: waiter.do('key', slow_call), count=1)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads + more_threads:
+            thread.join()
+
+        # Arriving after the leader released its lock still reuses the published result
+        self.assertEqual(latecomer.do('key', slow_call), 'shared')
+        self.assertEqual(calls, [1])
+        self.assertEqual(results + more_results, ['shared', 'shared'])
+        self.assertEqual((waiter.stats()['shared'], latecomer.stats()['shared']), (1, 1))
+
+    @override_settings(AI_SINGLE_FLIGHT={'CROSS_PROCESS': True, 'POLL_INTERVAL': 0.01})
+    async def test_async_workers_sharing_a_cache_make_one_call(self):
+        leader, waiter = SingleFlight(), SingleFlight()
+        self.addCleanup(cache.clear)
+        calls = []
+
+        async def slow_call():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'shared'
+
+        results = await asyncio.gather(leader.ado('key', slow_call), waiter.ado('key', slow_call))
+        results.append(await SingleFlight().ado('key', slow_call))
+
+        self.assertEqual(results, ['shared'] * 3)
+        self.assertEqual(calls, [1])
+
+    @override_settings(AI_RESPONSE_CACHE={'ENABLED': False})
+    def test_generate_questions_bursts_make_one_upstream_call(self):
+        release = threading.Event()
+        completion = MagicMock()
+        completion.choices[0].message.content = '1. What is a cell?'
+        client = MagicMock()
+        client.create_chat_completion.side_effect = lambda **kwargs: release.wait(5) and completion
+
+        with patch('ai_assistant.services.client', client):
+            threads, results, errors = self.run_concurrently(lambda: generate_questions('Biology', 'Cells'))
+            time.sleep(0.1)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(client.create_chat_completion.call_count, 1)
+        self.assertEqual(results, [['What is a cell?']] * 5)
+
+    @override_settings(AI_RESPONSE_CACHE={'ENABLED': False})
+    async def test_async_recommendations_are_coalesced(self):
+        async def slow_completion(**kwargs):
+            await asyncio.sleep(0.05)
+            return completion
+
+        completion = MagicMock()
+        completion.choices[0].message.content = 'Take Statistics'
+        client = MagicMock()
+        client.acreate_chat_completion = AsyncMock(side_effect=slow_completion)
+
+        with patch('ai_assistant.services.client', client):
+            results = await asyncio.gather(*[aget_course_recommendations('data') for _ in range(4)])
+
+        self.assertEqual(results, ['Take Statistics'] * 4)
+        client.acreate_chat_completion.assert_awaited_once()
+
+
 class PromptTemplateModelTest(TestCase):
     def setUp(self):
         self.user = create_test_user()
@@ -65,6 +489,94 @@ class PromptTemplateModelTest(TestCase):
         self.assertEqual(template.category, 'study')
 
 
+class PromptTemplateRenderingTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user()
+        self.template = PromptTemplate.objects.create(
+            user=self.user, name='Explain', category='study',
+            template_text='Explain {topic} to a {level} student. Reply as {{"topic": "{topic}"}}.',
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def render(self, payload):
+        return self.client.post(
+            reverse('prompt_template_render', args=[self.template.id]),
+            data=json.dumps(payload), content_type='application/json',
+        )
+
+    def test_compiles_variables_and_escaped_braces(self):
+        compiled = compile_template('Hi {name}, {{literal}} and { spaced } stay; {name} again')
+        self.assertEqual(compiled.variables, ('name',))
+        self.assertEqual(compiled.render({'name': 'Ada'}), 'Hi Ada, {literal} and { spaced } stay; Ada again')
+        with self.assertRaises(TemplateVariableError) as error:
+            compiled.render({})
+        self.assertEqual(error.exception.missing, ['name'])
+
+    def test_compiled_template_is_cached_until_saved(self):
+        template_cache.clear()
+        with patch('ai_assistant.prompts.compile_template', wraps=compile_template) as compile_mock:
+            self.template.render({'topic': 'cells', 'level': 'first-year'})
+            self.template.render({'topic': 'atoms', 'level': 'first-year'})
+            self.assertEqual(compile_mock.call_count, 1)
+
+            self.template.template_text = 'Summarize {topic}'
+            self.template.save()
+            self.assertEqual(self.template.variables, ('topic',))
+            self.assertEqual(compile_mock.call_count, 2)
+
+    def test_render_endpoint_runs_the_prompt(self):
+        mock_client = mock_openai_client('Cells are the unit of life.')
+        with patch('ai_assistant.services.client', mock_client):
+            data = self.render({'variables': {'topic': 'cells', 'level': 'first-year'}}).json()
+
+        self.assertTrue(data['success'])
+        self.assertEqual(data['prompt'], 'Explain cells to a first-year student. Reply as {"topic": "cells"}.')
+        self.assertEqual(data['response'], 'Cells are the unit of life.')
+        sent = mock_client.create_chat_completion.call_args.kwargs['messages'][-1]['content']
+        self.assertEqual(sent, data['prompt'])
+
+    def test_missing_variables_are_reported_without_calling_the_model(self):
+        mock_client = mock_openai_client()
+        with patch('ai_assistant.services.client', mock_client):
+            response = self.render({'variables': {'topic': 'cells'}})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['missing'], ['level'])
+        mock_client.create_chat_completion.assert_not_called()
+
+    def test_batch_mode_runs_rows_concurrently(self):
+        release = threading.Event()
+        in_flight = []
+
+        def create(**kwargs):
+            in_flight.append(1)
+            if len(in_flight) == 3:
+                release.set()
+            # Only returns once all three rows are in flight at the same time
+            self.assertTrue(release.wait(5))
+            completion = MagicMock()
+            completion.choices[0].message.content = 'Answer: ' + kwargs['messages'][-1]['content'].split()[1]
+            return completion
+
+        mock_client = mock_openai_client()
+        mock_client.create_chat_completion.side_effect = create
+        rows = [{'topic': 'cells', 'level': 'a'}, {'topic': 'atoms'}, {'topic': 'genes', 'level': 'b'}, {'topic': 'ions', 'level': 'c'}]
+        with patch('ai_assistant.services.client', mock_client):
+            data = self.render({'rows': rows}).json()
+
+        self.assertEqual([result.get('response') for result in data['results']],
+                         ['Answer: cells', None, 'Answer: genes', 'Answer: ions'])
+        self.assertEqual(data['results'][1]['missing'], ['level'])
+        self.assertEqual(data['variables'], ['topic', 'level'])
+
+    @override_settings(AI_TEMPLATE_BATCH_MAX_ROWS=2)
+    def test_preview_and_batch_limit(self):
+        data = self.render({'variables': {'topic': 'cells', 'level': 'a'}, 'run': False}).json()
+        self.assertEqual(data['prompt'], 'Explain cells to a a student. Reply as {"topic": "cells"}.')
+        self.assertEqual(self.render({'rows': [{}, {}, {}]}).status_code, 400)
+
+
 class AIAssistantViewsTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -106,3 +618,625 @@ class AIAssistantViewsTest(TestCase):
         self.assertEqual(user_messages.count('Need help with my capstone roadmap'), 1)
         conversation.refresh_from_db()
         self.assertEqual(conversation.title, 'Need help with my capstone roadmap')
+
+    @patch('ai_assistant.views.get_chat_completion', return_value=iter(['Hello', ' there']))
+    def test_conversation_stream_sends_tokens_and_saves_reply(self, mock_completion):
+        conversation = Conversation.objects.create(user=self.user, title='New Conversation', assistant_type='code')
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse('conversation_stream', args=[conversation.id]), {
+            'message': 'Explain generators',
+        })
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('data: {"token": "Hello"}', body)
+        self.assertIn('event: done', body)
+        self.assertTrue(mock_completion.call_args.kwargs['stream'])
+        reply = conversation.messages.get(role='assistant')
+        self.assertEqual(reply.content, 'Hello there')
+
+    @patch('ai_assistant.views.get_chat_completion', return_value=iter(['Partial', ' reply', ' lost']))
+    def test_conversation_stream_saves_partial_reply_on_disconnect(self, mock_completion):
+        conversation = Conversation.objects.create(user=self.user, assistant_type='general')
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse('conversation_stream', args=[conversation.id]), {
+            'message': 'Hi',
+        })
+        stream = iter(response.streaming_content)
+        next(stream)
+        next(stream)
+        response.close()
+
+        reply = conversation.messages.get(role='assistant')
+        self.assertEqual(reply.content, 'Partial reply')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PDFAnalysisPipelineTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = create_test_user()
+        self.client.force_login(self.user)
+
+    def upload(self, name='notes.pdf'):
+        return self.client.post(reverse('pdf_upload'), {
+            'file': SimpleUploadedFile(name, b'%PDF-1.4 test', content_type='application/pdf'),
+        })
+
+    @patch('ai_assistant.views.get_chat_completion')
+    def test_upload_queues_analysis_without_calling_the_model(self, mock_completion):
+        response = self.upload()
+
+        analysis = PDFAnalysis.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('pdf_analyze', args=[analysis.id]))
+        self.assertEqual(analysis.status, 'queued')
+        mock_completion.assert_not_called()
+
+        status = self.client.get(reverse('pdf_analysis_status', args=[analysis.id])).json()
+        self.assertEqual(status['status'], 'queued')
+        self.assertFalse(status['finished'])
+
+    @patch('ai_assistant.jobs.analyze_pdf', return_value={'summary': 'Short summary', 'key_points': ['1. Point']})
+    def test_worker_processes_queued_analyses(self, mock_analyze):
+        self.upload()
+
+        self.assertEqual(process_queued_analyses(), 1)
+
+        analysis = PDFAnalysis.objects.get(user=self.user)
+        self.assertEqual(analysis.status, 'done')
+        self.assertEqual(analysis.progress, 100)
+        self.assertEqual(analysis.summary, 'Short summary')
+        self.assertEqual(process_queued_analyses(), 0)
+
+    @patch('ai_assistant.jobs.analyze_pdf', side_effect=Exception('PDF appears corrupted'))
+    def test_worker_records_failures(self, mock_analyze):
+        self.upload()
+        process_queued_analyses()
+
+        analysis = PDFAnalysis.objects.get(user=self.user)
+        self.assertEqual(analysis.status, 'failed')
+        self.assertIn('corrupted', analysis.error_message)
+        status = self.client.get(reverse('pdf_analysis_status', args=[analysis.id])).json()
+        self.assertTrue(status['finished'])
+
+    def test_stale_running_analyses_are_requeued(self):
+        self.upload()
+        PDFAnalysis.objects.update(status='running', started_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale_analyses(), 1)
+        self.assertEqual(PDFAnalysis.objects.get().status, 'queued')
+
+    def test_recent_heartbeat_keeps_a_long_analysis_running(self):
+        self.upload()
+        claim_next_analysis()
+        PDFAnalysis.objects.update(started_at=timezone.now() - timedelta(hours=1), heartbeat_at=timezone.now())
+
+        self.assertEqual(requeue_stale_analyses(), 0)
+        self.assertEqual(PDFAnalysis.objects.get().status, 'running')
+
+    @override_settings(AI_PDF_JOB_MAX_ATTEMPTS=2)
+    def test_analysis_that_keeps_stalling_is_failed(self):
+        self.upload()
+        stale = timezone.now() - timedelta(hours=1)
+        for _ in range(2):
+            claim_next_analysis()
+            PDFAnalysis.objects.update(heartbeat_at=stale)
+            requeue_stale_analyses()
+
+        analysis = PDFAnalysis.objects.get()
+        self.assertEqual((analysis.status, analysis.attempts), ('failed', 2))
+        self.assertIn('abandoned', analysis.error_message)
+        self.assertIsNone(claim_next_analysis())
+
+
+PHOTOSYNTHESIS_TEXT = (
+    "Photosynthesis converts light energy into chemical energy in plants. "
+    "Chlorophyll in the leaves absorbs light energy for photosynthesis. "
+    "The light reactions of photosynthesis produce ATP and oxygen. "
+    "The Calvin cycle uses ATP from photosynthesis to fix carbon dioxide. "
+    "Plants store the chemical energy from photosynthesis as glucose. "
+    "The library opens at nine on weekdays during the semester. "
+    "Leaves with more chlorophyll capture more light energy. "
+) * 3
+
+
+class ExtractiveSummaryTest(TestCase):
+    def test_central_sentences_are_extracted(self):
+        result = summarize_extractive(PHOTOSYNTHESIS_TEXT, summary_sentences=2, key_points=3)
+
+        self.assertIn('photosynthesis', result['summary'].lower())
+        self.assertNotIn('library', result['summary'])
+        self.assertEqual(len(result['key_points']), 3)
+        self.assertTrue(all(point not in result['summary'] for point in result['key_points']))
+
+    def test_sentence_splitting_drops_fragments(self):
+        sentences = split_sentences("Figure 1.\nThe cell membrane\ncontrols what enters the cell. Table 2. Cells divide by mitosis in most tissues.")
+        self.assertEqual(sentences, [
+            'The cell membrane controls what enters the cell.',
+            'Cells divide by mitosis in most tissues.',
+        ])
+
+    @patch('ai_assistant.services.client', None)
+    def test_analyze_pdf_without_api_key_uses_extractive_summary(self):
+        with patch('ai_assistant.services.extract_text_from_pdf', return_value=PHOTOSYNTHESIS_TEXT):
+            result = analyze_pdf(BytesIO(b'pdf'))
+        self.assertEqual(result['source'], 'extractive')
+        self.assertTrue(result['summary'])
+
+    @patch('ai_assistant.services.client', MagicMock())
+    def test_analyze_pdf_falls_back_when_the_model_fails(self):
+        with patch('ai_assistant.services.extract_text_from_pdf', return_value=PHOTOSYNTHESIS_TEXT), \
+                patch('ai_assistant.services.get_chat_completion', side_effect=CircuitOpenError('down')):
+            result = analyze_pdf(BytesIO(b'pdf'))
+        self.assertEqual(result['source'], 'extractive')
+
+        with override_settings(AI_PDF_EXTRACTIVE_FALLBACK=False), \
+                patch('ai_assistant.services.extract_text_from_pdf', return_value=PHOTOSYNTHESIS_TEXT), \
+                patch('ai_assistant.services.get_chat_completion', side_effect=CircuitOpenError('down')):
+            with self.assertRaises(AIServiceError):
+                analyze_pdf(BytesIO(b'pdf'))
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    @patch('ai_assistant.services.client', MagicMock())
+    def test_worker_shows_quick_summary_before_the_ai_result(self):
+        user = create_test_user()
+        analysis = PDFAnalysis.objects.create(
+            user=user, file=SimpleUploadedFile('bio.pdf', b'%PDF-1.4 test'), original_filename='bio.pdf',
+        )
+        drafts = []
+
+        def ai_completion(messages, **kwargs):
+            drafts.append(PDFAnalysis.objects.values_list('summary_source', 'summary').get(id=analysis.id))
+            return 'SUMMARY:\nAI summary\n\nKEY POINTS:\n1. AI point'
+
+        with patch('ai_assistant.services.extract_text_from_pdf', return_value=PHOTOSYNTHESIS_TEXT), \
+                patch('ai_assistant.services.get_chat_completion', side_effect=ai_completion):
+            process_queued_analyses()
+
+        self.assertEqual(drafts[0][0], 'extractive')
+        self.assertIn('photosynthesis', drafts[0][1].lower())
+        analysis.refresh_from_db()
+        self.assertEqual((analysis.summary_source, analysis.summary), ('ai', 'AI summary'))
+
+
+def build_test_pdf(pages, text_per_page):
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for page in range(pages):
+        pdf.drawString(40, 800, f"Page {page} " + text_per_page)
+        pdf.showPage()
+    pdf.save()
+    buffer.seek(0)
+    return buffer
+
+
+class PDFTextExtractionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_extraction_stops_at_character_budget(self):
+        pdf = build_test_pdf(10, 'lorem ipsum ' * 5)
+
+        with patch('ai_assistant.services.PyPDF2.PageObject.extract_text', autospec=True,
+                   side_effect=lambda page: 'x' * 100) as mock_extract:
+            text = extract_text_from_pdf(pdf, max_chars=250)
+
+        self.assertEqual(len(text), 250)
+        self.assertEqual(mock_extract.call_count, 3)
+
+    def test_reupload_of_same_file_skips_parsing(self):
+        first = build_test_pdf(3, 'study notes')
+        second = BytesIO(first.getvalue())
+        self.assertEqual(file_sha256(first), file_sha256(second))
+
+        text = extract_text_from_pdf(first)
+        with patch('ai_assistant.services.iter_pdf_pages') as mock_pages:
+            self.assertEqual(extract_text_from_pdf(second), text)
+            self.assertEqual(extract_text_from_pdf(second, max_chars=10), text[:10])
+        mock_pages.assert_not_called()
+        self.assertIn('Page 2 study notes', text)
+
+
+class ChunkedSummarizationTest(TestCase):
+    def test_chunks_respect_token_bound(self):
+        text = '\n\n'.join(f'Paragraph {index} ' + 'word ' * 50 for index in range(40))
+        text += '\n\n' + 'y' * 5000
+
+        chunks = chunk_text(text, max_tokens=200)
+
+        self.assertTrue(all(len(chunk) <= 800 for chunk in chunks))
+        self.assertEqual(''.join(chunks).count('Paragraph'), 40)
+
+    @override_settings(AI_SUMMARY_CHUNK_TOKENS=500, AI_SUMMARY_MAX_WORKERS=3)
+    def test_long_documents_are_summarized_with_map_reduce(self):
+        text = '\n\n'.join(f'Section {index}. ' + 'content ' * 200 for index in range(12))
+
+        def fake_completion(messages, **kwargs):
+            prompt = messages[-1]['content']
+            if prompt.startswith('This is part'):
+                return 'partial ' + prompt.split(' of ')[0].split()[-1]
+            return 'SUMMARY:\nWhole document\n\nKEY POINTS:\n1. First\n2. Second'
+
+        progress_updates = []
+        with patch('ai_assistant.services.client', MagicMock()), \
+                patch('ai_assistant.services.extract_text_from_pdf', return_value=text), \
+                patch('ai_assistant.services.get_chat_completion', side_effect=fake_completion) as mock_completion:
+            result = analyze_pdf(BytesIO(b'pdf'), progress=progress_updates.append)
+
+        self.assertEqual(result['summary'], 'Whole document')
+        self.assertEqual(result['key_points'], ['1. First', '2. Second'])
+        chunk_count = len(chunk_text(text, 500))
+        self.assertGreater(chunk_count, 1)
+        self.assertEqual(mock_completion.call_count, chunk_count + 1)
+        reduce_prompt = mock_completion.call_args.args[0][-1]['content']
+        self.assertLess(reduce_prompt.index('partial 1'), reduce_prompt.index('partial 2'))
+        self.assertEqual(progress_updates[-1], 90)
+
+    @override_settings(AI_PDF_CHUNKED_SUMMARIES=False)
+    def test_long_documents_are_truncated_when_chunking_is_off(self):
+        text = '\n\n'.join(f'Section {index}. ' + 'content ' * 2000 for index in range(12))
+
+        with patch('ai_assistant.services.client', MagicMock()), \
+                patch('ai_assistant.services.extract_text_from_pdf', return_value=text), \
+                patch('ai_assistant.services.summarize_document_chunked') as mock_chunked, \
+                patch('ai_assistant.services.get_chat_completion',
+                      return_value='SUMMARY:\nTruncated\n\nKEY POINTS:\n1. Point') as mock_completion:
+            result = analyze_pdf(BytesIO(b'pdf'))
+
+        mock_chunked.assert_not_called()
+        self.assertEqual(mock_completion.call_count, 1)
+        self.assertIn('... [truncated]', mock_completion.call_args.args[0][-1]['content'])
+        self.assertEqual(result['summary'], 'Truncated')
+
+
+class ResilientClientTest(TestCase):
+    def build_client(self, **overrides):
+        config = get_client_settings()
+        config.update({'MAX_RETRIES': 2, 'BREAKER_FAILURE_THRESHOLD': 2, 'BREAKER_RESET_TIMEOUT': 60})
+        config.update(overrides)
+        client = ResilientOpenAIClient('test-key', config=config, sleep=lambda seconds: None)
+        client._client = MagicMock()
+        return client
+
+    def rate_limit_error(self):
+        return openai.RateLimitError('Rate limited', response=MagicMock(status_code=429), body=None)
+
+    def test_retries_rate_limits_then_succeeds(self):
+        client = self.build_client()
+        client._client.chat.completions.create.side_effect = [self.rate_limit_error(), 'completion']
+
+        self.assertEqual(client.create_chat_completion(model='gpt-4o-mini', messages=[]), 'completion')
+        metrics = client.metrics.snapshot()['gpt-4o-mini']
+        self.assertEqual(metrics['retries'], 1)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_client_errors_are_not_retried(self):
+        client = self.build_client()
+        client._client.chat.completions.create.side_effect = openai.BadRequestError(
+            'Bad request', response=MagicMock(status_code=400), body=None
+        )
+
+        with self.assertRaises(AIServiceError):
+            client.create_chat_completion(model='gpt-4o-mini', messages=[])
+        self.assertEqual(client._client.chat.completions.create.call_count, 1)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_breaker_opens_and_fails_fast(self):
+        client = self.build_client(MAX_RETRIES=0)
+        client._client.chat.completions.create.side_effect = openai.APIConnectionError(request=MagicMock())
+
+        for _ in range(2):
+            with self.assertRaises(AIServiceError):
+                client.create_chat_completion(model='gpt-4o-mini', messages=[])
+        with self.assertRaises(CircuitOpenError):
+            client.create_chat_completion(model='gpt-4o-mini', messages=[])
+
+        self.assertEqual(client._client.chat.completions.create.call_count, 2)
+        self.assertEqual(client.metrics.snapshot()['gpt-4o-mini']['rejected'], 1)
+
+    def test_breaker_half_open_trial_closes_circuit(self):
+        client = self.build_client(MAX_RETRIES=0, BREAKER_RESET_TIMEOUT=0)
+        client._client.chat.completions.create.side_effect = [
+            openai.APIConnectionError(request=MagicMock()),
+            openai.APIConnectionError(request=MagicMock()),
+            'completion',
+        ]
+        for _ in range(2):
+            with self.assertRaises(AIServiceError):
+                client.create_chat_completion(model='gpt-4o-mini', messages=[])
+        self.assertEqual(client.breaker.state, 'open')
+
+        self.assertEqual(client.create_chat_completion(model='gpt-4o-mini', messages=[]), 'completion')
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_half_open_trial_reopens_on_unexpected_errors(self):
+        client = self.build_client(MAX_RETRIES=0, BREAKER_RESET_TIMEOUT=0)
+        client._client.chat.completions.create.side_effect = [
+            openai.APIConnectionError(request=MagicMock()),
+            openai.APIConnectionError(request=MagicMock()),
+            ValueError('unexpected keyword'),
+            'completion',
+        ]
+        for _ in range(2):
+            with self.assertRaises(AIServiceError):
+                client.create_chat_completion(model='gpt-4o-mini', messages=[])
+
+        with self.assertRaises(ValueError):
+            client.create_chat_completion(model='gpt-4o-mini', messages=[])
+        self.assertEqual(client.breaker.state, 'open')
+
+        # The next trial is let through instead of the breaker staying half-open forever
+        self.assertEqual(client.create_chat_completion(model='gpt-4o-mini', messages=[]), 'completion')
+        self.assertEqual(client.breaker.state, 'closed')
+
+    async def test_cancelled_async_trial_reopens_the_breaker(self):
+        client = self.build_client(BREAKER_RESET_TIMEOUT=0)
+        client.breaker.state, client.breaker.opened_at = 'open', 0
+        async_client = MagicMock()
+        async_client.chat.completions.create = AsyncMock(side_effect=asyncio.CancelledError())
+        client._async_clients[asyncio.get_running_loop()] = async_client
+
+        with self.assertRaises(asyncio.CancelledError):
+            await client.acreate_chat_completion(model='gpt-4o-mini', messages=[])
+        self.assertEqual(client.breaker.state, 'open')
+
+    def test_metrics_endpoint_is_staff_only(self):
+        user = create_test_user()
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('ai_metrics')).status_code, 403)
+
+        user.is_staff = True
+        user.save(update_fields=['is_staff'])
+        response = self.client.get(reverse('ai_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('response_cache', response.json())
+
+
+@override_settings(AI_ROUTES={
+    'default': {'MODEL': 'fast-model', 'FALLBACK_MODEL': 'backup-model', 'LATENCY_SLO': 2},
+    'writing': {'MAX_TOKENS': 300},
+    'pdf_analysis': {'LONG_PROMPT_TOKENS': 100, 'LONG_PROMPT_MODEL': 'long-model', 'CONTEXT_WINDOW': 1000},
+})
+class ModelRoutingTest(TestCase):
+    def test_routes_inherit_defaults(self):
+        route = choose_route('writing', prompt_tokens=50)
+        self.assertEqual(route['model'], 'fast-model')
+        self.assertEqual(route['fallback_model'], 'backup-model')
+        self.assertEqual(route['max_tokens'], 300)
+        self.assertEqual(route['timeout'], 2)
+
+    def test_long_prompts_use_long_model_and_fit_the_context(self):
+        route = choose_route('pdf_analysis', prompt_tokens=900)
+        self.assertEqual(route['model'], 'long-model')
+        self.assertEqual(route['max_tokens'], 256)
+
+    def test_slow_primary_is_swapped_for_fallback(self):
+        metrics = ClientMetrics(ewma_alpha=0.5)
+        metrics.record('fast-model', latency=1)
+        self.assertEqual(choose_route('writing', 10, metrics)['model'], 'fast-model')
+
+        metrics.record('fast-model', latency=9)
+        metrics.record('fast-model', latency=0.1, error=True)  # fast failures do not count
+        metrics.record('fast-model', latency=0.2, streamed=True)  # nor does time to first byte
+        self.assertEqual(metrics.estimated_latency('fast-model'), 5)
+        self.assertEqual(metrics.snapshot()['fast-model']['p95_first_byte'], 0.2)
+        route = choose_route('writing', 10, metrics)
+        self.assertEqual((route['model'], route['fallback_model']), ('backup-model', 'fast-model'))
+
+    def test_timeout_falls_back_to_secondary_model(self):
+        completion = MagicMock()
+        completion.choices[0].message.content = 'From backup'
+
+        def create(**kwargs):
+            if kwargs['model'] == 'fast-model':
+                self.assertEqual(kwargs['timeout'], 2)
+                raise AITimeoutError('Request timed out.')
+            return completion
+
+        client = MagicMock()
+        client.create_chat_completion.side_effect = create
+        client.metrics = ClientMetrics()
+
+        with patch('ai_assistant.services.client', client):
+            self.assertEqual(get_chat_completion([{'role': 'user', 'content': 'Fix my grammar'}], route='writing'), 'From backup')
+        calls = client.create_chat_completion.call_args_list
+        self.assertEqual([c.kwargs['model'] for c in calls], ['fast-model', 'backup-model'])
+        # The fallback shares the first call's deadline instead of starting a new one
+        self.assertEqual(calls[0].kwargs['deadline'], calls[1].kwargs['deadline'])
+
+    def test_client_gives_up_on_first_timeout_by_default(self):
+        client = ResilientOpenAIClient('test-key', sleep=lambda seconds: None)
+        client._client = MagicMock()
+        client._client.chat.completions.create.side_effect = openai.APITimeoutError(request=MagicMock())
+
+        with self.assertRaises(AITimeoutError):
+            client.create_chat_completion(model='fast-model', messages=[])
+        self.assertEqual(client._client.chat.completions.create.call_count, 1)
+        self.assertEqual(client.metrics.snapshot()['fast-model']['timeouts'], 1)
+
+        with self.assertRaises(AITimeoutError):
+            client.create_chat_completion(model='fast-model', messages=[], retry_timeouts=True)
+        self.assertEqual(client._client.chat.completions.create.call_count, 4)
+
+    def test_retries_stop_at_the_call_deadline(self):
+        config = get_client_settings()
+        config.update({'DEADLINE': 5, 'READ_TIMEOUT': 60, 'BACKOFF_BASE': 8, 'BACKOFF_MAX': 8})
+        client = ResilientOpenAIClient('test-key', config=config, sleep=lambda seconds: None)
+        client._client = MagicMock()
+        client._client.chat.completions.create.side_effect = openai.APIConnectionError(request=MagicMock())
+
+        with patch('ai_assistant.client.random.uniform', side_effect=lambda low, high: high):
+            with self.assertRaises(AIServiceError):
+                client.create_chat_completion(model='fast-model', messages=[])
+
+        # An 8 s backoff would overrun the 5 s deadline, so there is no retry
+        self.assertEqual(client._client.chat.completions.create.call_count, 1)
+        self.assertLessEqual(client._client.chat.completions.create.call_args.kwargs['timeout'].read, 5)
+
+
+class FakeOpenAIServerTest(TestCase):
+    def start_server(self, **options):
+        server, base_url = start_background_server(**options)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        config = get_client_settings()
+        config.update({'MAX_RETRIES': 1, 'BREAKER_FAILURE_THRESHOLD': 100})
+        return ResilientOpenAIClient('fake-key', base_url=base_url, config=config, sleep=lambda seconds: None)
+
+    def test_chat_completion_round_trip(self):
+        client = self.start_server(reply_tokens=5)
+        with patch('ai_assistant.services.client', client):
+            reply = get_chat_completion([{'role': 'user', 'content': 'Hi'}])
+        self.assertEqual(len(reply.split()), 5)
+
+    def test_streaming_round_trip(self):
+        client = self.start_server(reply_tokens=4)
+        stream = client.create_chat_completion(
+            model='gpt-4o-mini', messages=[{'role': 'user', 'content': 'Hi'}], stream=True
+        )
+        text = ''.join(chunk.choices[0].delta.content or '' for chunk in stream if chunk.choices)
+        self.assertEqual(len(text.split()), 4)
+        # Opening a stream is time to first byte, kept out of the routing estimate
+        self.assertIsNone(client.metrics.estimated_latency('gpt-4o-mini'))
+        self.assertIsNotNone(client.metrics.snapshot()['gpt-4o-mini']['p95_first_byte'])
+
+    def test_injected_errors_surface_after_retries(self):
+        client = self.start_server(error_rate=1.0)
+        with patch('ai_assistant.services.client', client):
+            with self.assertRaises(AIServiceError):
+                get_chat_completion([{'role': 'user', 'content': 'Hi'}])
+        self.assertEqual(client.metrics.snapshot()['gpt-4o-mini']['retries'], 1)
+
+    def test_percentiles_and_throughput(self):
+        latencies = [0.1 * n for n in range(1, 101)]
+        report = summarize_results('conversation', latencies, errors=2, elapsed=10)
+        self.assertAlmostEqual(report['p50'], 5.0)
+        self.assertAlmostEqual(report['p99'], 9.9)
+        self.assertEqual(report['requests'], 102)
+        self.assertAlmostEqual(report['throughput'], 10.2)
+        self.assertIsNone(percentile([], 95))
+
+    def test_study_helper_scenario_posts_a_course_with_one_csrf_fetch(self):
+        session = LoadTestSession('http://testserver', session_cookie='abc')
+        session.http = MagicMock()
+        session.http.get.return_value.text = (
+            '<input name="csrfmiddlewaretoken" value="token">'
+            '<option value="">-- Select a course --</option><option value="7">BIO - Biology</option>'
+        )
+        session.http.post.return_value.status_code = 200
+
+        report = run_scenario('study_helper', lambda: session, users=1, requests_per_user=3)
+
+        self.assertEqual((report['requests'], report['errors']), (3, 0))
+        posted = [call.kwargs['data'] for call in session.http.post.call_args_list]
+        self.assertEqual([data['course_id'] for data in posted], [7, 7, 7])
+        self.assertTrue(all(data['csrfmiddlewaretoken'] == 'token' for data in posted))
+        # One GET for the CSRF token and one to look up the course, both before the timed requests
+        self.assertEqual(session.http.get.call_count, 2)
+
+    def test_helper_requests_are_unique_per_user_and_request(self):
+        sessions = []
+
+        def session_factory():
+            session = LoadTestSession('http://testserver', session_cookie='abc')
+            session.http = MagicMock()
+            session.http.get.return_value.text = '<input name="csrfmiddlewaretoken" value="token">'
+            session.http.post.return_value.status_code = 200
+            sessions.append(session)
+            return session
+
+        report = run_scenario('writing_assistant', session_factory, users=2, requests_per_user=3)
+
+        self.assertEqual((report['requests'], report['errors']), (6, 0))
+        texts = [call.kwargs['data']['text'] for session in sessions for call in session.http.post.call_args_list]
+        # Identical prompts would be served by the response cache after the first
+        self.assertEqual(len(set(texts)), 6)
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user()
+
+    async def call_view(self, view, method='get', data=None, **kwargs):
+        request = getattr(AsyncRequestFactory(), method)('/', data or {})
+        request.user = self.user
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        return await view(request, **kwargs)
+
+    @patch('ai_assistant.async_views.aget_code_assistance', new_callable=AsyncMock, return_value='Async review')
+    async def test_code_assistant_awaits_async_service(self, mock_assistance):
+        response = await self.call_view(async_views.code_assistant, 'post', {
+            'code': 'print(1)',
+            'language': 'python',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Async review', response.content)
+        mock_assistance.assert_awaited_once_with('print(1)', 'python', '')
+
+    @patch('ai_assistant.async_views.aget_chat_completion', new_callable=AsyncMock, return_value='Async reply')
+    async def test_conversation_detail_saves_reply(self, mock_completion):
+        conversation = await Conversation.objects.acreate(user=self.user, title='New Conversation')
+
+        response = await self.call_view(
+            async_views.conversation_detail, 'post', {'message': 'Hello async'},
+            conversation_id=conversation.id
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['response'], 'Async reply')
+        self.assertTrue(await Message.objects.filter(conversation=conversation, role='assistant', content='Async reply').aexists())
+
+    async def test_conversation_detail_rerenders_on_invalid_post(self):
+        conversation = await Conversation.objects.acreate(user=self.user, title='Chat')
+
+        response = await self.call_view(
+            async_views.conversation_detail, 'post', {'message': ''},
+            conversation_id=conversation.id
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Chat', response.content)
+        self.assertFalse(await Message.objects.filter(conversation=conversation).aexists())
+
+    async def test_conversation_stream_relays_async_tokens(self):
+        async def tokens():
+            for token in ['Async ', 'stream']:
+                yield token
+
+        conversation = await Conversation.objects.acreate(user=self.user, title='Chat')
+        with patch('ai_assistant.async_views.aget_chat_completion', new_callable=AsyncMock,
+                   return_value=tokens()) as mock_completion:
+            response = await self.call_view(
+                async_views.conversation_stream, 'post', {'message': 'Hi'},
+                conversation_id=conversation.id
+            )
+            body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('"token": "Async "', body)
+        self.assertIn('event: done', body)
+        self.assertTrue(mock_completion.call_args.kwargs['stream'])
+        self.assertTrue(await Message.objects.filter(
+            conversation=conversation, role='assistant', content='Async stream'
+        ).aexists())
+
+    async def test_aget_chat_completion_uses_async_client(self):
+        client = MagicMock()
+        completion = MagicMock()
+        completion.choices[0].message.content = 'Awaited'
+        client.acreate_chat_completion = AsyncMock(return_value=completion)
+
+        with patch('ai_assistant.services.client', client):
+            self.assertEqual(await aget_chat_completion([{'role': 'user', 'content': 'Hi'}]), 'Awaited')
+        client.acreate_chat_completion.assert_awaited_once()
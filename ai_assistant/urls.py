@@ -1,20 +1,29 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the AI views that wait on OpenAI can run as coroutines
+ai_views = async_views if settings.AI_ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.assistant_hub, name='assistant_hub'),
     path('conversations/', views.conversation_list, name='conversation_list'),
     path('conversations/create/', views.conversation_create, name='conversation_create'),
-    path('conversations/<int:conversation_id>/', views.conversation_detail, name='conversation_detail'),
+    path('conversations/<int:conversation_id>/', ai_views.conversation_detail, name='conversation_detail'),
+    path('conversations/<int:conversation_id>/stream/', ai_views.conversation_stream, name='conversation_stream'),
+    path('conversations/<int:conversation_id>/messages/', views.conversation_messages, name='conversation_messages'),
     path('chat/', views.chat_interface, name='chat_interface'),
     path('pdf/upload/', views.pdf_upload, name='pdf_upload'),
     path('pdf/<int:analysis_id>/', views.pdf_analyze, name='pdf_analyze'),
+    path('pdf/<int:analysis_id>/status/', views.pdf_analysis_status, name='pdf_analysis_status'),
     path('templates/', views.prompt_template_list, name='prompt_template_list'),
     path('templates/create/', views.prompt_template_create, name='prompt_template_create'),
-    path('study-helper/', views.study_helper, name='study_helper'),
-    path('code-assistant/', views.code_assistant, name='code_assistant'),
-    path('writing-assistant/', views.writing_assistant, name='writing_assistant'),
-    path('course-recommendation/', views.course_recommendation, name='course_recommendation'),
+    path('templates/<int:template_id>/render/', views.prompt_template_render, name='prompt_template_render'),
+    path('study-helper/', ai_views.study_helper, name='study_helper'),
+    path('code-assistant/', ai_views.code_assistant, name='code_assistant'),
+    path('writing-assistant/', ai_views.writing_assistant, name='writing_assistant'),
+    path('course-recommendation/', ai_views.course_recommendation, name='course_recommendation'),
+    path('metrics/', views.ai_metrics, name='ai_metrics'),
 ]
 
 
@@ -1,17 +1,27 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateformat import format as format_date
+from django.core.exceptions import PermissionDenied
 from .models import Conversation, Message, PromptTemplate, PDFAnalysis
 from .forms import ConversationForm, PromptTemplateForm, PDFUploadForm, MessageForm
+from . import services
+from .cache import response_cache
+from .retrieval import search_passages
+from .singleflight import single_flight
+from .prompts import TemplateVariableError
 from .services import (
-    get_chat_completion, analyze_pdf, generate_questions,
+    get_chat_completion,
     get_study_help, get_code_assistance, get_writing_assistance,
-    get_course_recommendations
+    get_course_recommendations, build_conversation_context
 )
 import json
+from datetime import datetime
 
 @login_required
 def assistant_hub(request):
@@ -50,45 +60,78 @@ def conversation_create(request):
         form = ConversationForm()
     return render(request, 'ai_assistant/conversation_form.html', {'form': form})
 
+SYSTEM_PROMPTS = {
+    'study': "You are a helpful study assistant.",
+    'code': "You are an expert code assistant and programming mentor.",
+    'writing': "You are a writing assistant that helps improve writing quality.",
+}
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+def _record_user_message(conversation, user_message):
+    """Save the user's message and return the API payload for the conversation."""
+    Message.objects.create(
+        conversation=conversation,
+        role='user',
+        content=user_message
+    )
+
+    # Update conversation title if it's still default
+    if conversation.title == 'New Conversation':
+        conversation.title = user_message[:50]
+        conversation.save()
+
+    system_prompt = SYSTEM_PROMPTS.get(conversation.assistant_type, DEFAULT_SYSTEM_PROMPT)
+    return build_conversation_context(conversation, system_prompt)
+
+
+def _sse_event(data, event=None):
+    """Format a payload as a Server-Sent Events frame."""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+
+def _message_page(conversation, before=None):
+    """
+    Load one page of a transcript by keyset on (timestamp, id), newest first.
+    
+    Args:
+        conversation: Conversation to page through
+        before: Cursor returned for the previous page (None for the latest page)
+    
+    Returns:
+        Tuple of (messages oldest-first, cursor for the earlier page or None)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    page_size = getattr(settings, 'AI_CONVERSATION_PAGE_SIZE', 30)
+    queryset = conversation.messages.order_by('-timestamp', '-id')
+    if before:
+        timestamp, message_id = before.rsplit('|', 1)
+        timestamp, message_id = datetime.fromisoformat(timestamp), int(message_id)
+        queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id))
+
+    page = list(queryset[:page_size + 1])
+    has_more = len(page) > page_size
+    page = page[:page_size][::-1]
+    cursor = f"{page[0].timestamp.isoformat()}|{page[0].id}" if has_more else None
+    return page, cursor
+
+
 @login_required
 def conversation_detail(request, conversation_id):
     conversation = get_object_or_404(Conversation, id=conversation_id, user=request.user)
-    messages_list = conversation.messages.all()
     
     if request.method == 'POST':
         form = MessageForm(request.POST)
         if form.is_valid():
             user_message = form.cleaned_data.get('message', '')
             if user_message:
-                # Save user message
-                Message.objects.create(
-                    conversation=conversation,
-                    role='user',
-                    content=user_message
-                )
-                
-                # Get conversation history
-                history = []
-                for msg in conversation.messages.all():
-                    history.append({
-                        'role': msg.role,
-                        'content': msg.content
-                    })
+                messages_for_api = _record_user_message(conversation, user_message)
                 
                 try:
-                    # Get AI response based on assistant type
-                    if conversation.assistant_type == 'study':
-                        system_prompt = "You are a helpful study assistant."
-                    elif conversation.assistant_type == 'code':
-                        system_prompt = "You are an expert code assistant and programming mentor."
-                    elif conversation.assistant_type == 'writing':
-                        system_prompt = "You are a writing assistant that helps improve writing quality."
-                    else:
-                        system_prompt = "You are a helpful assistant."
-                    
-                    messages_for_api = [{"role": "system", "content": system_prompt}] + history
-                    
-                    response_text = get_chat_completion(messages_for_api)
+                    response_text = get_chat_completion(messages_for_api, route=conversation.assistant_type)
                     
                     # Save assistant response
                     Message.objects.create(
@@ -97,11 +140,6 @@ def conversation_detail(request, conversation_id):
                         content=response_text
                     )
                     
-                    # Update conversation title if it's still default
-                    if conversation.title == 'New Conversation':
-                        conversation.title = user_message[:50]
-                        conversation.save()
-                    
                     return JsonResponse({
                         'success': True,
                         'response': response_text
@@ -118,12 +156,84 @@ def conversation_detail(request, conversation_id):
                 }, status=400)
     
     form = MessageForm()
+    messages_list, earlier_cursor = _message_page(conversation)
     return render(request, 'ai_assistant/conversation_detail.html', {
         'conversation': conversation,
         'messages': messages_list,
+        'earlier_cursor': earlier_cursor,
         'form': form
     })
 
+
+@login_required
+def conversation_messages(request, conversation_id):
+    """JSON page of earlier messages for the transcript's "load earlier" / infinite scroll."""
+    conversation = get_object_or_404(Conversation, id=conversation_id, user=request.user)
+    try:
+        page, cursor = _message_page(conversation, request.GET.get('before'))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({
+        'success': True,
+        'messages': [
+            {
+                'id': message.id,
+                'role': message.role,
+                'content': message.content,
+                'timestamp': message.timestamp.isoformat(),
+                'timestamp_display': format_date(timezone.localtime(message.timestamp), 'M d, Y H:i'),
+            }
+            for message in page
+        ],
+        'has_more': cursor is not None,
+        'next_cursor': cursor,
+    })
+
+@login_required
+@require_POST
+def conversation_stream(request, conversation_id):
+    """
+    Stream the assistant reply token by token as Server-Sent Events.
+
+    The assistant message is saved once the stream finishes. If the client
+    disconnects early, whatever text already arrived is saved instead.
+    """
+    conversation = get_object_or_404(Conversation, id=conversation_id, user=request.user)
+    form = MessageForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid form data'
+        }, status=400)
+
+    messages_for_api = _record_user_message(conversation, form.cleaned_data['message'])
+
+    def event_stream():
+        chunks = []
+        try:
+            for token in get_chat_completion(messages_for_api, stream=True, route=conversation.assistant_type):
+                chunks.append(token)
+                yield _sse_event({'token': token})
+        except Exception as e:
+            yield _sse_event({'error': str(e)}, event='error')
+        finally:
+            # Runs on completion, on upstream errors and when the server closes
+            # the generator because the client went away.
+            response_text = ''.join(chunks)
+            message = None
+            if response_text:
+                message = Message.objects.create(
+                    conversation=conversation,
+                    role='assistant',
+                    content=response_text
+                )
+        yield _sse_event({'message_id': message.id if message else None}, event='done')
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 def chat_interface(request):
     # Create or get a general conversation
@@ -144,24 +254,16 @@ def pdf_upload(request):
                 messages.error(request, 'Please upload a PDF file.')
                 return redirect('pdf_upload')
             
-            try:
-                # Analyze PDF
-                analysis = analyze_pdf(pdf_file, pdf_file.name)
-                
-                # Save analysis
-                pdf_analysis = PDFAnalysis.objects.create(
-                    user=request.user,
-                    file=pdf_file,
-                    summary=analysis['summary'],
-                    key_points=analysis['key_points'],
-                    original_filename=pdf_file.name
-                )
-                
-                messages.success(request, 'PDF analyzed successfully!')
-                return redirect('pdf_analyze', analysis_id=pdf_analysis.id)
-            except Exception as e:
-                messages.error(request, f'Error analyzing PDF: {str(e)}')
-                return redirect('pdf_upload')
+            # Analysis runs in the process_pdf_analyses worker
+            pdf_analysis = PDFAnalysis.objects.create(
+                user=request.user,
+                file=pdf_file,
+                original_filename=pdf_file.name,
+                status='queued'
+            )
+            
+            messages.success(request, 'PDF uploaded! Analysis will be ready shortly.')
+            return redirect('pdf_analyze', analysis_id=pdf_analysis.id)
     else:
         form = PDFUploadForm()
     
@@ -172,6 +274,19 @@ def pdf_analyze(request, analysis_id):
     analysis = get_object_or_404(PDFAnalysis, id=analysis_id, user=request.user)
     return render(request, 'ai_assistant/pdf_analyze.html', {'analysis': analysis})
 
+@login_required
+def pdf_analysis_status(request, analysis_id):
+    analysis = get_object_or_404(PDFAnalysis, id=analysis_id, user=request.user)
+    return JsonResponse({
+        'status': analysis.status,
+        'progress': analysis.progress,
+        'finished': analysis.is_finished,
+        'error': analysis.error_message,
+        'summary_source': analysis.summary_source,
+        'summary': analysis.summary,
+        'key_points': analysis.key_points,
+    })
+
 @login_required
 def prompt_template_list(request):
     templates = PromptTemplate.objects.filter(user=request.user).order_by('category', 'name')
@@ -197,6 +312,56 @@ def prompt_template_create(request):
         form = PromptTemplateForm()
     return render(request, 'ai_assistant/prompt_template_form.html', {'form': form})
 
+@login_required
+@require_POST
+def prompt_template_render(request, template_id):
+    """
+    Render a prompt template and run it through the model.
+
+    Accepts a JSON body with either ``variables`` (one prompt) or ``rows``
+    (a list of variable dicts rendered and run concurrently). With
+    ``"run": false`` the rendered prompts are returned without calling the model.
+    """
+    template = get_object_or_404(PromptTemplate, id=template_id, user=request.user)
+    try:
+        payload = json.loads(request.body or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+
+    batch = 'rows' in payload
+    rows = payload['rows'] if batch else [payload.get('variables', {})]
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return JsonResponse({'success': False, 'error': 'Variables must be objects'}, status=400)
+    max_rows = getattr(settings, 'AI_TEMPLATE_BATCH_MAX_ROWS', 20)
+    if len(rows) > max_rows:
+        return JsonResponse({'success': False, 'error': f'At most {max_rows} rows per batch'}, status=400)
+
+    if payload.get('run', True):
+        results = services.run_prompt_template(template, rows)
+    else:
+        results = []
+        for values in rows:
+            try:
+                results.append({'prompt': template.render(values)})
+            except TemplateVariableError as e:
+                results.append({'prompt': None, 'error': str(e), 'missing': e.missing})
+
+    if batch:
+        return JsonResponse({
+            'success': True,
+            'variables': list(template.variables),
+            'results': [{'index': index, **result} for index, result in enumerate(results)],
+        })
+
+    result = results[0]
+    if 'missing' in result:
+        return JsonResponse({'success': False, **result}, status=400)
+    if 'error' in result:
+        return JsonResponse({'success': False, **result}, status=500)
+    return JsonResponse({'success': True, **result})
+
 @login_required
 def study_helper(request):
     from academic.models import Course
@@ -210,8 +375,10 @@ def study_helper(request):
         if course_id:
             course = get_object_or_404(Course, id=course_id, user=request.user)
             try:
+                sources = []
                 if question:
-                    response = get_study_help(course.name, topic, question)
+                    sources = search_passages(request.user, f"{topic} {question}")
+                    response = get_study_help(course.name, topic, question, sources)
                 else:
                     response = "Please provide a question or topic to get study help."
                 
@@ -220,7 +387,8 @@ def study_helper(request):
                     'selected_course': course,
                     'topic': topic,
                     'question': question,
-                    'response': response
+                    'response': response,
+                    'sources': sources
                 })
             except Exception as e:
                 messages.error(request, f'Error: {str(e)}')
@@ -288,3 +456,16 @@ def course_recommendation(request):
                 messages.error(request, f'Error: {str(e)}')
     
     return render(request, 'ai_assistant/course_recommendation.html')
+
+@login_required
+def ai_metrics(request):
+    """Latency, error and cache metrics for this worker process (staff only)."""
+    if not request.user.is_staff:
+        raise PermissionDenied("Only staff users can view AI metrics.")
+    client = services.client
+    return JsonResponse({
+        'client': client.metrics.snapshot() if client else {},
+        'circuit_breaker': client.breaker.state if client else None,
+        'response_cache': response_cache.stats(),
+        'single_flight': single_flight.stats(),
+    })
@@ -99,8 +99,11 @@ class GoalSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Goal
-        fields = ['id', 'title', 'description', 'target_date', 'progress', 'milestones', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = [
+            'id', 'title', 'description', 'target_date', 'progress', 'milestones',
+            'milestone_total', 'milestone_completed', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'milestone_total', 'milestone_completed', 'created_at', 'updated_at']
 
 
 class TransactionSerializer(serializers.ModelSerializer):
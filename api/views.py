@@ -7,6 +7,7 @@ from django.contrib.auth import get_user_model
 from portfolio.models import Profile, Project, Skill
 from academic.models import Course, Note, Flashcard, StudySession
 from productivity.models import Task, Habit, Goal, Transaction, Milestone
+from productivity.rollups import finance_summary
 from journal.models import JournalEntry, Philosophy, VisionGoal
 from blog.models import BlogPost
 from notifications.models import Notification
@@ -152,7 +153,7 @@ class GoalViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Goal.objects.filter(user=self.request.user)
+        return Goal.objects.filter(user=self.request.user).prefetch_related('milestones')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -168,6 +169,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        return Response(finance_summary(request.user))
+
 
 class JournalEntryViewSet(viewsets.ModelViewSet):
     serializer_class = JournalEntrySerializer
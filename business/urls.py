@@ -19,6 +19,7 @@ urlpatterns = [
     path('import-export/create/', views.import_export_create, name='import_export_create'),
     path('import-export/<int:record_id>/update/', views.import_export_update, name='import_export_update'),
     path('import-export/<int:record_id>/delete/', views.import_export_delete, name='import_export_delete'),
+    path('import-export/export/csv/', views.export_import_export_csv, name='export_import_export_csv'),
     path('ideas/<int:idea_id>/projections/', views.financial_projections, name='financial_projections'),
 ]
 
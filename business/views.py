@@ -7,6 +7,7 @@ from decimal import Decimal
 import json
 from .models import BusinessIdea, MarketResearch, BusinessPlan, ImportExportRecord
 from .forms import BusinessIdeaForm, MarketResearchForm, BusinessPlanForm, ImportExportRecordForm
+from kouekam_hub.exports import stream_csv
 
 
 def _idea_workflow_actions(idea, research_count, has_plan):
@@ -302,6 +303,20 @@ def import_export_delete(request, record_id):
     
     return render(request, 'business/import_export_confirm_delete.html', {'record': record})
 
+@login_required
+def export_import_export_csv(request):
+    """Export import/export records as CSV"""
+    records = ImportExportRecord.objects.filter(user=request.user).order_by('-date', 'id')
+    return stream_csv(records, [
+        ('Date', 'date'),
+        ('Type', 'type'),
+        ('Product', 'product'),
+        ('Quantity', 'quantity'),
+        ('Value (USD)', 'value'),
+        ('Country', 'country'),
+        ('Description', 'description'),
+    ], 'import_export_records')
+
 @login_required
 def financial_projections(request, idea_id):
     idea = get_object_or_404(BusinessIdea, id=idea_id, user=request.user)
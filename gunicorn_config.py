@@ -17,7 +17,9 @@ cpu_count = multiprocessing.cpu_count()
 default_workers = min(cpu_count * 2 + 1, 10)  # Cap at 10 workers to prevent resource exhaustion
 workers_env = os.getenv('GUNICORN_WORKERS')
 workers = int(workers_env) if workers_env else default_workers
-worker_class = 'gthread'  # Use threaded workers for better I/O handling
+# Use threaded workers for better I/O handling. Set GUNICORN_WORKER_CLASS to
+# uvicorn.workers.UvicornWorker (and serve kouekam_hub.asgi:application) for the async AI views
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
 worker_connections = 1000
 threads = int(os.getenv('GUNICORN_THREADS', '2'))
 timeout = 120
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def parse_tags(text):
+    # Same normalization as productivity.tags.parse_tags
+    names = []
+    for part in (text or '').split(','):
+        name = ' '.join(part.split()).lower()[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def backfill_tags(apps, schema_editor):
+    Tag = apps.get_model('productivity', 'Tag')
+    JournalEntry = apps.get_model('journal', 'JournalEntry')
+    JournalEntryTag = apps.get_model('journal', 'JournalEntryTag')
+    tagged = [
+        (object_id, user_id, parse_tags(tags))
+        for object_id, user_id, tags in JournalEntry.objects.exclude(tags='').values_list('id', 'user_id', 'tags').iterator()
+    ]
+    pairs = {(user_id, name) for _, user_id, names in tagged for name in names}
+    Tag.objects.bulk_create(
+        [Tag(user_id=user_id, name=name) for user_id, name in pairs],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    tag_ids = {(user_id, name): tag_id for tag_id, user_id, name in Tag.objects.values_list('id', 'user_id', 'name').iterator()}
+    JournalEntryTag.objects.bulk_create(
+        [JournalEntryTag(entry_id=object_id, tag_id=tag_ids[user_id, name]) for object_id, user_id, names in tagged for name in names],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0001_initial'),
+        ('productivity', '0009_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalEntryTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='journal.journalentry')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='journal_entry_links', to='productivity.tag')),
+            ],
+            options={
+                'unique_together': {('entry', 'tag')},
+            },
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='tag_objects',
+            field=models.ManyToManyField(blank=True, related_name='journal_entries', through='journal.JournalEntryTag', to='productivity.tag'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
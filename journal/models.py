@@ -24,6 +24,9 @@ class JournalEntry(models.Model):
     mood = models.CharField(max_length=20, choices=MOOD_CHOICES, blank=True)
     energy_level = models.CharField(max_length=20, choices=ENERGY_CHOICES, blank=True)
     tags = models.CharField(max_length=500, blank=True, help_text="Comma-separated tags")
+    tag_objects = models.ManyToManyField(
+        'productivity.Tag', through='JournalEntryTag', related_name='journal_entries', blank=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -35,6 +38,13 @@ class JournalEntry(models.Model):
     def __str__(self):
         return f"Entry: {self.date}"
 
+class JournalEntryTag(models.Model):
+    entry = models.ForeignKey(JournalEntry, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey('productivity.Tag', on_delete=models.CASCADE, related_name='journal_entry_links')
+
+    class Meta:
+        unique_together = ['entry', 'tag']
+
 class Philosophy(models.Model):
     CATEGORY_CHOICES = [
         ('life', 'Life Philosophy'),
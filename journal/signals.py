@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from productivity.tags import sync_tags
+from .models import JournalEntry, JournalEntryTag
+
+
+@receiver(post_save, sender=JournalEntry)
+def sync_entry_tags(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_tags(instance, JournalEntryTag, 'entry')
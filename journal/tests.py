@@ -127,6 +127,19 @@ class JournalViewsTest(TestCase):
         entry = JournalEntry.objects.get(user=self.user)
         self.assertEqual(entry.date, timezone.now().date())
 
+    def test_journal_entry_list_filters_by_tag(self):
+        JournalEntry.objects.create(user=self.user, date=date.today(), content='First', tags='Work, gym')
+        JournalEntry.objects.create(user=self.user, date=date.today() - timedelta(days=1), content='Second', tags='workout')
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('journal_entry_list'), {'tag': 'work'})
+
+        self.assertEqual([entry.content for entry in response.context['entries']], ['First'])
+        self.assertEqual(
+            [(tag.name, tag.count) for tag in response.context['tag_cloud']],
+            [('gym', 1), ('work', 1), ('workout', 1)],
+        )
+
     def test_journal_entry_update_rejects_duplicate_date(self):
         entry_one = JournalEntry.objects.create(user=self.user, date=date.today(), content='First')
         entry_two = JournalEntry.objects.create(user=self.user, date=date.today() - timedelta(days=1), content='Second')
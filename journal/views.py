@@ -12,6 +12,8 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from io import BytesIO
 from .models import JournalEntry, Philosophy, VisionGoal, LifeLesson
 from .forms import JournalEntryForm, PhilosophyForm, VisionGoalForm, LifeLessonForm
+from kouekam_hub.exports import stream_csv
+from productivity.tags import tag_counts
 
 @login_required
 def journal_dashboard(request):
@@ -71,9 +73,14 @@ def journal_entry_list(request):
     date_filter = request.GET.get('date')
     if date_filter:
         entries = entries.filter(date=date_filter)
+    tag_filter = request.GET.get('tag')
+    if tag_filter:
+        entries = entries.filter(tag_objects__user=request.user, tag_objects__name=tag_filter.strip().lower())
     return render(request, 'journal/journal_entry_list.html', {
-        'entries': entries,
-        'date_filter': date_filter
+        'entries': entries.prefetch_related('tag_objects'),
+        'date_filter': date_filter,
+        'tag_filter': tag_filter,
+        'tag_cloud': tag_counts(request.user, 'journal_entries'),
     })
 
 @login_required
@@ -358,3 +365,16 @@ def export_journal_pdf(request):
     response = HttpResponse(buffer.read(), content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="journal_entries_{timezone.now().date()}.pdf"'
     return response
+
+
+@login_required
+def export_journal_csv(request):
+    """Export journal entries as CSV"""
+    entries = JournalEntry.objects.filter(user=request.user).order_by('-date')
+    return stream_csv(entries, [
+        ('Date', 'date'),
+        ('Mood', 'mood'),
+        ('Energy Level', 'energy_level'),
+        ('Tags', 'tags'),
+        ('Content', 'content'),
+    ], 'journal_export')
@@ -0,0 +1,92 @@
+"""
+Streaming CSV exports shared by the apps.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` and written
+to a ``StreamingHttpResponse`` one line at a time, so memory stays flat no
+matter how many rows a user exports. Choice fields are mapped to their
+display labels with a dict built once per export rather than calling
+``get_FOO_display()`` on model instances.
+"""
+import csv
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _resolve_field(model, lookup):
+    """Model field at the end of a ``__``-separated lookup (e.g. 'course__name')."""
+    field = None
+    for name in lookup.split('__'):
+        field = model._meta.get_field(name)
+        if field.is_relation:
+            model = field.related_model
+    return field
+
+
+def _formatter(model, lookup):
+    field = _resolve_field(model, lookup)
+    if field.choices:
+        labels = {value: str(label) for value, label in field.flatchoices}
+        return lambda value: labels.get(value, value)
+    return None
+
+
+def _format(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def iter_csv_rows(queryset, columns, chunk_size=None):
+    """
+    Yield CSV lines for a queryset.
+
+    Args:
+        queryset: Queryset to export (ordering is kept)
+        columns: List of (header, lookup) pairs; lookups may span relations
+        chunk_size: Rows fetched per database round trip
+
+    Yields:
+        CSV lines as str, starting with the header row
+    """
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', DEFAULT_EXPORT_CHUNK_SIZE)
+    writer = csv.writer(Echo())
+    formatters = [_formatter(queryset.model, lookup) for _, lookup in columns]
+
+    yield writer.writerow([header for header, _ in columns])
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield writer.writerow([
+            _format(formatter(value) if formatter else value)
+            for formatter, value in zip(formatters, row)
+        ])
+
+
+def stream_csv(queryset, columns, filename, chunk_size=None):
+    """
+    Build a streaming CSV download.
+
+    Args:
+        queryset: Queryset to export
+        columns: List of (header, lookup) pairs
+        filename: Download name without date or extension (e.g. 'finance_export')
+        chunk_size: Rows fetched per database round trip
+
+    Returns:
+        StreamingHttpResponse
+    """
+    response = StreamingHttpResponse(iter_csv_rows(queryset, columns, chunk_size), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}_{timezone.now().date()}.csv"'
+    return response
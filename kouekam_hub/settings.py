@@ -318,6 +318,122 @@ BREVO_CONTACT_RECIPIENT_EMAIL = os.getenv('BREVO_CONTACT_RECIPIENT_EMAIL', ADMIN
 
 # OpenAI API Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+# Optional OpenAI-compatible endpoint (e.g. a proxy or local stand-in server)
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', '')
+
+# Resilience policy for the shared OpenAI client (ai_assistant/client.py)
+AI_CLIENT = {
+    'CONNECT_TIMEOUT': float(os.getenv('AI_CLIENT_CONNECT_TIMEOUT', 5)),
+    'READ_TIMEOUT': float(os.getenv('AI_CLIENT_READ_TIMEOUT', 60)),
+    # All attempts of one call must finish within this many seconds (below the 120 s worker timeout)
+    'DEADLINE': float(os.getenv('AI_CLIENT_DEADLINE', 90)),
+    'MAX_RETRIES': int(os.getenv('AI_CLIENT_MAX_RETRIES', 2)),
+    'BACKOFF_BASE': float(os.getenv('AI_CLIENT_BACKOFF_BASE', 0.5)),
+    'BACKOFF_MAX': float(os.getenv('AI_CLIENT_BACKOFF_MAX', 8)),
+    'BREAKER_FAILURE_THRESHOLD': int(os.getenv('AI_CLIENT_BREAKER_FAILURE_THRESHOLD', 5)),
+    'BREAKER_RESET_TIMEOUT': float(os.getenv('AI_CLIENT_BREAKER_RESET_TIMEOUT', 30)),
+}
+
+# Route the AI assistant views to their async versions (ai_assistant/async_views.py).
+# Only useful when serving kouekam_hub.asgi:application with uvicorn workers.
+AI_ASYNC_VIEWS = os.getenv('AI_ASYNC_VIEWS', 'False').lower() in ('true', '1', 'yes', 'on')
+
+# Conversation context window: the most recent messages are sent verbatim,
+# older ones are folded into a rolling summary stored on the conversation.
+AI_CONTEXT_RECENT_MESSAGES = int(os.getenv('AI_CONTEXT_RECENT_MESSAGES', 12))
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv('AI_CONTEXT_TOKEN_BUDGET', 3000))
+# Older turns are folded by the process_pdf_analyses worker once this many are
+# waiting, AI_CONTEXT_FOLD_BATCH messages per summarization call.
+AI_CONTEXT_FOLD_THRESHOLD = int(os.getenv('AI_CONTEXT_FOLD_THRESHOLD', 8))
+AI_CONTEXT_FOLD_BATCH = int(os.getenv('AI_CONTEXT_FOLD_BATCH', 20))
+# Messages per page of a conversation transcript ("load earlier" fetches the next page)
+AI_CONVERSATION_PAGE_SIZE = int(os.getenv('AI_CONVERSATION_PAGE_SIZE', 30))
+
+# PDF analyses run in the process_pdf_analyses worker; running jobs that have not
+# reported progress for this many seconds are assumed to belong to a dead worker
+# and are requeued, until they have been claimed AI_PDF_JOB_MAX_ATTEMPTS times.
+AI_PDF_JOB_TIMEOUT = int(os.getenv('AI_PDF_JOB_TIMEOUT', 600))
+AI_PDF_JOB_MAX_ATTEMPTS = int(os.getenv('AI_PDF_JOB_MAX_ATTEMPTS', 3))
+# Extracted PDF text is cached by the file's SHA-256 in this cache alias
+AI_PDF_TEXT_CACHE = 'default'
+AI_PDF_TEXT_CACHE_TIMEOUT = int(os.getenv('AI_PDF_TEXT_CACHE_TIMEOUT', 60 * 60 * 24))
+# Long PDFs are summarized with map-reduce: token-bounded chunks are summarized
+# concurrently (AI_SUMMARY_MAX_WORKERS at a time), then combined.
+AI_PDF_CHUNKED_SUMMARIES = os.getenv('AI_PDF_CHUNKED_SUMMARIES', 'True').lower() in ('true', '1', 'yes', 'on')
+AI_PDF_MAX_CHARS = int(os.getenv('AI_PDF_MAX_CHARS', 200000))
+AI_SUMMARY_CHUNK_TOKENS = int(os.getenv('AI_SUMMARY_CHUNK_TOKENS', 3000))
+AI_SUMMARY_MAX_WORKERS = int(os.getenv('AI_SUMMARY_MAX_WORKERS', 4))
+# Batch rendering of prompt templates: rows per request and concurrent completions
+AI_TEMPLATE_BATCH_MAX_ROWS = int(os.getenv('AI_TEMPLATE_BATCH_MAX_ROWS', 20))
+AI_TEMPLATE_BATCH_WORKERS = int(os.getenv('AI_TEMPLATE_BATCH_WORKERS', 4))
+# A local extractive summary (TF-IDF + TextRank) is shown while the LLM works
+# and is kept as the result when the AI service is unavailable.
+AI_PDF_QUICK_SUMMARY = os.getenv('AI_PDF_QUICK_SUMMARY', 'True').lower() in ('true', '1', 'yes', 'on')
+AI_PDF_EXTRACTIVE_FALLBACK = os.getenv('AI_PDF_EXTRACTIVE_FALLBACK', 'True').lower() in ('true', '1', 'yes', 'on')
+
+# AI response cache: in-process LRU plus the shared ai_assistant.CachedResponse table.
+# Helpers opt in by name with their TTL in seconds.
+AI_RESPONSE_CACHE_TTL = int(os.getenv('AI_RESPONSE_CACHE_TTL', 60 * 60 * 24))
+AI_RESPONSE_CACHE = {
+    'ENABLED': os.getenv('AI_RESPONSE_CACHE_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on'),
+    'LOCAL_MAX_ENTRIES': int(os.getenv('AI_RESPONSE_CACHE_LOCAL_MAX_ENTRIES', 256)),
+    'MAX_ENTRIES': int(os.getenv('AI_RESPONSE_CACHE_MAX_ENTRIES', 5000)),
+    # Share of writes that also evict expired and excess rows
+    'PRUNE_RATE': float(os.getenv('AI_RESPONSE_CACHE_PRUNE_RATE', 0.05)),
+    'HELPERS': {
+        'generate_questions': AI_RESPONSE_CACHE_TTL,
+        'get_study_help': AI_RESPONSE_CACHE_TTL,
+        'get_course_recommendations': AI_RESPONSE_CACHE_TTL,
+        'get_code_assistance': AI_RESPONSE_CACHE_TTL,
+        'get_writing_assistance': AI_RESPONSE_CACHE_TTL,
+    },
+}
+
+# Identical concurrent requests of these helpers wait on one upstream call.
+# CROSS_PROCESS also coalesces across workers through AI_SINGLE_FLIGHT['CACHE'],
+# which must then be a shared backend (e.g. Redis), not the per-process locmem.
+AI_SINGLE_FLIGHT = {
+    'ENABLED': os.getenv('AI_SINGLE_FLIGHT_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on'),
+    'CROSS_PROCESS': os.getenv('AI_SINGLE_FLIGHT_CROSS_PROCESS', 'False').lower() in ('true', '1', 'yes', 'on'),
+    'CACHE': 'default',
+    'HELPERS': ['generate_questions', 'get_course_recommendations'],
+}
+
+# Model routing per assistant type / helper: model, completion budget and the
+# latency SLO (seconds, also the per-call timeout). On timeout a route retries
+# once on FALLBACK_MODEL, and it switches to the fallback while the primary's
+# observed latency exceeds the SLO. Routes inherit unset keys from 'default'.
+AI_ROUTES = {
+    'default': {
+        'MODEL': os.getenv('AI_DEFAULT_MODEL', 'gpt-4o-mini'),
+        'FALLBACK_MODEL': os.getenv('AI_FALLBACK_MODEL', ''),
+        'MAX_TOKENS': 1000,
+        'LATENCY_SLO': 30,
+    },
+    'general': {'LATENCY_SLO': 20},
+    'study': {'LATENCY_SLO': 20},
+    'code': {'MAX_TOKENS': 1500, 'LATENCY_SLO': 30},
+    'writing': {'MAX_TOKENS': 1500, 'LATENCY_SLO': 15},
+    'questions': {'LATENCY_SLO': 20},
+    'recommendations': {'LATENCY_SLO': 20},
+    'conversation_summary': {'MAX_TOKENS': 400, 'LATENCY_SLO': 15},
+    'pdf_chunk': {'MAX_TOKENS': 400, 'LATENCY_SLO': 60},
+    'pdf_analysis': {'MAX_TOKENS': 1500, 'LATENCY_SLO': 120},
+}
+
+# BM25 retrieval over each user's notes and PDF summaries; the top passages
+# are added to study-helper prompts so answers use the student's own material.
+AI_RETRIEVAL = {
+    'ENABLED': os.getenv('AI_RETRIEVAL_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on'),
+    'TOP_K': int(os.getenv('AI_RETRIEVAL_TOP_K', 4)),
+    'PASSAGE_WORDS': int(os.getenv('AI_RETRIEVAL_PASSAGE_WORDS', 120)),
+}
+
+# CSV exports stream rows from the database in chunks of this many rows
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+# Bulk transaction imports: rows validated and inserted per batch, and the file limit
+TRANSACTION_IMPORT_BATCH_SIZE = int(os.getenv('TRANSACTION_IMPORT_BATCH_SIZE', 500))
+TRANSACTION_IMPORT_MAX_ROWS = int(os.getenv('TRANSACTION_IMPORT_MAX_ROWS', 100000))
 
 # Django REST Framework Settings
 REST_FRAMEWORK = {
@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import Task, Habit, Goal, Document, Timetable, Transaction, Milestone
+from .milestones import rebuild_milestone_counters
+from .models import Task, Habit, HabitCompletion, Goal, Document, StoredBlob, Tag, Timetable, Transaction, Milestone, MonthlyFinanceRollup
+
+
+class HabitCompletionInline(admin.TabularInline):
+    model = HabitCompletion
+    extra = 0
+    fields = ['date']
 
 
 class MilestoneInline(admin.TabularInline):
@@ -62,14 +69,15 @@ class HabitAdmin(admin.ModelAdmin):
     list_filter = ['frequency', 'created_at']
     search_fields = ['name', 'user__email']
     readonly_fields = ['created_at']
+    inlines = [HabitCompletionInline]
 
 
 @admin.register(Goal)
 class GoalAdmin(admin.ModelAdmin):
-    list_display = ['title', 'user', 'progress', 'target_date', 'created_at']
+    list_display = ['title', 'user', 'progress', 'milestone_completed', 'milestone_total', 'target_date', 'created_at']
     list_filter = ['target_date', 'created_at']
     search_fields = ['title', 'description', 'user__email']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['milestone_total', 'milestone_completed', 'created_at', 'updated_at']
     inlines = [MilestoneInline]
     actions = ['mark_as_complete', 'reset_progress', 'increase_progress_25', 'increase_progress_50']
     
@@ -78,7 +86,7 @@ class GoalAdmin(admin.ModelAdmin):
             'fields': ('user', 'title', 'description')
         }),
         ('Progress', {
-            'fields': ('progress', 'target_date')
+            'fields': ('progress', 'target_date', 'milestone_completed', 'milestone_total')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -122,12 +130,16 @@ class MilestoneAdmin(admin.ModelAdmin):
     @admin.action(description='Mark selected milestones as completed')
     def mark_as_completed(self, request, queryset):
         from django.utils import timezone
+        goal_ids = list(queryset.values_list('goal_id', flat=True))
         updated = queryset.update(completed=True, completed_date=timezone.now().date())
+        rebuild_milestone_counters(Goal.objects.filter(id__in=goal_ids))
         self.message_user(request, f'{updated} milestone(s) marked as completed.')
     
     @admin.action(description='Mark selected milestones as incomplete')
     def mark_as_incomplete(self, request, queryset):
+        goal_ids = list(queryset.values_list('goal_id', flat=True))
         updated = queryset.update(completed=False, completed_date=None)
+        rebuild_milestone_counters(Goal.objects.filter(id__in=goal_ids))
         self.message_user(request, f'{updated} milestone(s) marked as incomplete.')
 
 
@@ -150,6 +162,15 @@ class TransactionAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(MonthlyFinanceRollup)
+class MonthlyFinanceRollupAdmin(admin.ModelAdmin):
+    list_display = ['month', 'user', 'type', 'category', 'total', 'count']
+    list_filter = ['type', 'category', 'month']
+    search_fields = ['user__email']
+    readonly_fields = ['user', 'month', 'type', 'category', 'total', 'count']
+    date_hierarchy = 'month'
+
+
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     list_display = ['title', 'user', 'category', 'uploaded_at']
@@ -159,6 +180,19 @@ class DocumentAdmin(admin.ModelAdmin):
     date_hierarchy = 'uploaded_at'
 
 
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'ref_count', 'created_at']
+    search_fields = ['sha256', 'name']
+    readonly_fields = ['sha256', 'name', 'size', 'ref_count', 'created_at']
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user']
+    search_fields = ['name', 'user__email']
+
+
 @admin.register(Timetable)
 class TimetableAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'active', 'updated_at']
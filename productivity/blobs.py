@@ -0,0 +1,297 @@
+"""
+Content-addressed storage for uploaded files.
+
+Tracked file fields (``Document.file``, ``Note.file``, ``PDFAnalysis.file``)
+store each distinct file once, under ``blobs/<aa>/<sha256><ext>``. A new
+upload is hashed in streaming chunks before it is saved. If a
+``StoredBlob`` with that digest exists, the field just points at it and the
+storage upload (an S3 PUT in production) is skipped. Each blob counts the
+rows referencing it; when the last reference is replaced or deleted, the row
+and the stored object are removed after the transaction commits, unless the
+same content was uploaded again in the meantime. A new object is only written
+once its row exists; if the surrounding transaction rolls back, the object
+stays behind unregistered, is reused by the next upload of the same content
+and is otherwise removed by ``repair_blobs`` after ORPHAN_GRACE. Because the
+digest is in the name, downstream caches can key on ``blob_digest(name)``
+without re-reading the file. ``manage.py verify_blobs`` recounts references
+and can re-hash stored objects to check their integrity.
+"""
+import hashlib
+import os
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .models import StoredBlob
+
+BLOB_PREFIX = 'blobs/'
+BLOB_NAME_RE = re.compile(r'^blobs/[0-9a-f]{2}/([0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+# Unregistered objects younger than this may belong to an upload that has not committed yet
+ORPHAN_GRACE = timedelta(hours=1)
+
+# (model, field name) pairs registered with track_blob_field
+TRACKED_FIELDS = []
+
+
+def file_sha256(file_obj, chunk_size=64 * 1024):
+    """
+    Hash a file in fixed-size chunks without loading it into memory.
+
+    Args:
+        file_obj: File-like object (Django File/UploadedFile or binary file)
+        chunk_size: Bytes read per iteration
+
+    Returns:
+        Hex SHA-256 digest; the file is rewound afterwards
+    """
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(chunk_size), b''):
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def blob_digest(name):
+    """SHA-256 encoded in a content-addressed file name, or None for other names"""
+    match = BLOB_NAME_RE.match(name or '')
+    return match.group(1) if match else None
+
+
+def blob_name(digest, original_name):
+    extension = os.path.splitext(original_name or '')[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,10}', extension):
+        extension = ''
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest}{extension}'
+
+
+def store_blob(content, original_name, storage):
+    """
+    Reference the blob for ``content``, uploading it only if it is new.
+
+    Args:
+        content: Uploaded file
+        original_name: Name the file was uploaded with (for its extension)
+        storage: Storage backend of the file field
+
+    Returns:
+        Storage name of the blob
+    """
+    digest = file_sha256(content)
+    existing = StoredBlob.objects.filter(sha256=digest)
+    if existing.update(ref_count=F('ref_count') + 1):
+        return existing.values_list('name', flat=True).get()
+
+    name = blob_name(digest, original_name)
+    try:
+        with transaction.atomic():
+            # Register first: a failed upload rolls the row back, and no object is stored without one
+            StoredBlob.objects.create(sha256=digest, name=name, size=content.size, ref_count=1)
+            # An existing object was left by a rolled-back upload of the same content
+            if not storage.exists(name):
+                saved = storage.save(name, content)
+                if saved != name:
+                    # Written concurrently under the same name, with the same content
+                    storage.delete(saved)
+    except IntegrityError:
+        # Another upload of the same content registered the blob first
+        existing.update(ref_count=F('ref_count') + 1)
+        return existing.values_list('name', flat=True).get()
+    return name
+
+
+def acquire_blob(name):
+    """Add a reference to an already stored blob (no-op for other names)"""
+    if blob_digest(name):
+        StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+
+def release_blob(name, storage):
+    """
+    Drop a reference to a blob, deleting it once nothing refers to it.
+
+    The row is kept with ``ref_count=0`` until the surrounding transaction
+    commits, so a rolled-back delete never loses the file and an upload of
+    the same content in the meantime revives the blob instead of reusing a
+    file that is about to go (see delete_unreferenced_blob).
+    """
+    if not blob_digest(name):
+        return
+    blobs = StoredBlob.objects.filter(name=name)
+    blobs.filter(ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    if blobs.filter(ref_count=0).exists():
+        transaction.on_commit(lambda: delete_unreferenced_blob(name, storage))
+
+
+def delete_unreferenced_blob(name, storage):
+    """
+    Delete a released blob's row and stored object if it is still unreferenced.
+
+    The row stays locked while the object is deleted: a concurrent
+    store_blob waits on its ref_count update, then finds neither the row nor
+    the file and uploads the content again.
+
+    Returns:
+        True if the blob was deleted
+    """
+    with transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(name=name, ref_count=0).first()
+        if blob is None:
+            return False
+        blob.delete()
+        storage.delete(name)
+    return True
+
+
+def _stored_name(model, pk, field_name):
+    if pk is None:
+        return None
+    return model._default_manager.filter(pk=pk).values_list(field_name, flat=True).first()
+
+
+def track_blob_field(model, field_name):
+    """
+    Store ``model.<field_name>`` uploads content-addressed and reference-counted.
+
+    Args:
+        model: Model class with a FileField
+        field_name: Name of the FileField
+    """
+    TRACKED_FIELDS.append((model, field_name))
+    uid = f'blobs:{model._meta.label}.{field_name}'
+
+    def store_upload(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        field_file = getattr(instance, field_name)
+        stored = False
+        if field_file and not field_file._committed:
+            setattr(instance, field_name, store_blob(field_file.file, field_file.name, field_file.storage))
+            stored = True
+        previous = _stored_name(model, instance.pk, field_name)
+        current = getattr(instance, field_name).name or None
+        if current != previous and not stored:
+            acquire_blob(current)
+        instance._blob_previous = {field_name: previous if previous != current else None}
+
+    def release_replaced(sender, instance, raw=False, **kwargs):
+        previous = getattr(instance, '_blob_previous', {}).get(field_name)
+        if previous and not raw:
+            release_blob(previous, getattr(instance, field_name).storage)
+
+    def release_deleted(sender, instance, **kwargs):
+        field_file = getattr(instance, field_name)
+        if field_file:
+            release_blob(field_file.name, field_file.storage)
+
+    pre_save.connect(store_upload, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(release_replaced, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(release_deleted, sender=model, weak=False, dispatch_uid=uid)
+
+
+def count_references():
+    """
+    References to each blob across all tracked fields.
+
+    Returns:
+        Counter of blob name to number of referencing rows
+    """
+    counts = Counter()
+    for model, field_name in TRACKED_FIELDS:
+        names = model._default_manager.filter(**{f'{field_name}__startswith': BLOB_PREFIX})
+        counts.update(names.values_list(field_name, flat=True).iterator())
+    return counts
+
+
+def verify_blobs(check_content=False, storage=None):
+    """
+    Compare blob reference counts (and optionally contents) with reality.
+
+    Args:
+        check_content: Also re-hash every stored object
+        storage: Storage to read objects from (default storage when None)
+
+    Returns:
+        List of (blob name, problem) tuples; empty when consistent
+    """
+    storage = storage or default_storage
+    references = count_references()
+    problems = []
+    blobs = {blob.name: blob for blob in StoredBlob.objects.all().iterator()}
+    for name in sorted(references.keys() - blobs.keys()):
+        problems.append((name, 'referenced but not registered'))
+    for name, blob in sorted(blobs.items()):
+        if blob.ref_count != references.get(name, 0):
+            problems.append((name, f'ref_count {blob.ref_count}, referenced {references.get(name, 0)} times'))
+        if not check_content:
+            continue
+        if not storage.exists(name):
+            problems.append((name, 'missing from storage'))
+            continue
+        with storage.open(name, 'rb') as stored:
+            if file_sha256(stored) != blob.sha256:
+                problems.append((name, 'content does not match its SHA-256'))
+    return problems
+
+
+def unregistered_objects(storage, older_than):
+    """
+    Stored blob objects without a StoredBlob row.
+
+    Args:
+        storage: Storage to list
+        older_than: Only objects last modified before this datetime
+
+    Yields:
+        Storage names
+    """
+    registered = set(StoredBlob.objects.values_list('name', flat=True))
+    try:
+        directories, _ = storage.listdir(BLOB_PREFIX.rstrip('/'))
+    except FileNotFoundError:
+        return
+    for directory in directories:
+        _, files = storage.listdir(f'{BLOB_PREFIX}{directory}')
+        for file_name in files:
+            name = f'{BLOB_PREFIX}{directory}/{file_name}'
+            if blob_digest(name) and name not in registered and storage.get_modified_time(name) < older_than:
+                yield name
+
+
+def repair_blobs(storage=None):
+    """
+    Reset reference counts from the tracked fields and drop unreferenced blobs.
+
+    Objects left unregistered by rolled-back uploads are deleted once they
+    are older than ORPHAN_GRACE.
+
+    Args:
+        storage: Storage to delete orphaned objects from (default storage when None)
+
+    Returns:
+        (number of counts fixed, number of blobs deleted)
+    """
+    storage = storage or default_storage
+    references = count_references()
+    fixed = deleted = 0
+    with transaction.atomic():
+        for blob in StoredBlob.objects.select_for_update().iterator():
+            count = references.get(blob.name, 0)
+            if count == 0:
+                # Deleted while the row is locked, as in delete_unreferenced_blob
+                blob.delete()
+                storage.delete(blob.name)
+                deleted += 1
+            elif count != blob.ref_count:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=count)
+                fixed += 1
+    for name in list(unregistered_objects(storage, timezone.now() - ORPHAN_GRACE)):
+        storage.delete(name)
+        deleted += 1
+    return fixed, deleted
@@ -82,29 +82,40 @@ class TransactionForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['date'].required = False
 
-    def clean_amount(self):
-        amount = self.cleaned_data.get('amount')
+    # The checks below are shared with the bulk importer (productivity.importers)
+    @staticmethod
+    def validate_amount(amount):
         if amount is not None and amount <= 0:
             raise forms.ValidationError('Amount must be greater than 0.')
+
+    @staticmethod
+    def validate_date(transaction_date):
+        if transaction_date and transaction_date > timezone.now().date():
+            raise forms.ValidationError('Transactions cannot be recorded in the future.')
+
+    @classmethod
+    def category_error(cls, transaction_type, category):
+        if transaction_type == 'income' and category and category not in cls.INCOME_CATEGORIES:
+            return 'Choose an income category for income transactions.'
+        if transaction_type == 'expense' and category and category not in cls.EXPENSE_CATEGORIES:
+            return 'Choose an expense category for expense transactions.'
+        return None
+
+    def clean_amount(self):
+        amount = self.cleaned_data.get('amount')
+        self.validate_amount(amount)
         return amount
 
     def clean_date(self):
         transaction_date = self.cleaned_data.get('date')
-        if transaction_date and transaction_date > timezone.now().date():
-            raise forms.ValidationError('Transactions cannot be recorded in the future.')
+        self.validate_date(transaction_date)
         return transaction_date
 
     def clean(self):
         cleaned_data = super().clean()
-        transaction_type = cleaned_data.get('type')
-        category = cleaned_data.get('category')
-
-        if transaction_type == 'income' and category and category not in self.INCOME_CATEGORIES:
-            self.add_error('category', 'Choose an income category for income transactions.')
-
-        if transaction_type == 'expense' and category and category not in self.EXPENSE_CATEGORIES:
-            self.add_error('category', 'Choose an expense category for expense transactions.')
-
+        error = self.category_error(cleaned_data.get('type'), cleaned_data.get('category'))
+        if error:
+            self.add_error('category', error)
         return cleaned_data
 
     class Meta:
@@ -134,6 +145,37 @@ class TransactionForm(forms.ModelForm):
         }
 
 
+class TransactionImportForm(forms.Form):
+    FORMAT_CHOICES = [
+        ('auto', 'Detect from file name'),
+        ('csv', 'CSV'),
+        ('ofx', 'OFX / QFX'),
+    ]
+
+    file = forms.FileField(
+        help_text='CSV with Date, Type, Category, Amount and Description columns, or an OFX/QFX bank statement',
+        widget=forms.FileInput(attrs={
+            'class': 'block w-full text-sm text-gray-900 dark:text-gray-300 border border-gray-300 dark:border-gray-600 rounded-md cursor-pointer bg-white dark:bg-gray-800 focus:outline-none focus:ring-2 focus:ring-inset focus:ring-blue-600 dark:focus:ring-blue-500',
+            'accept': '.csv,.ofx,.qfx',
+        }),
+    )
+    format = forms.ChoiceField(
+        choices=FORMAT_CHOICES,
+        initial='auto',
+        widget=forms.Select(attrs={
+            'class': 'block w-full rounded-md border-0 py-1.5 text-gray-900 dark:text-white shadow-sm ring-1 ring-inset ring-gray-300 dark:ring-gray-600 focus:ring-2 focus:ring-inset focus:ring-blue-600 dark:focus:ring-blue-500 sm:text-sm sm:leading-6 bg-white dark:bg-gray-800'
+        }),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        uploaded = cleaned_data.get('file')
+        if uploaded and cleaned_data.get('format') == 'auto':
+            name = uploaded.name.lower()
+            cleaned_data['format'] = 'ofx' if name.endswith(('.ofx', '.qfx')) else 'csv'
+        return cleaned_data
+
+
 class TimetableForm(forms.ModelForm):
     class Meta:
         model = Timetable
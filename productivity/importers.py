@@ -0,0 +1,262 @@
+"""
+Bulk import of transactions from CSV or OFX files.
+
+The upload is read row by row and validated in batches with the same field
+rules as ``TransactionForm``. Each valid row gets a content fingerprint
+(``Transaction.make_fingerprint``), which is checked against the
+``(user, fingerprint)`` index to skip rows that were already imported. New
+rows are inserted with ``bulk_create`` inside a single database transaction,
+and the monthly rollups are rebuilt once at the end since ``bulk_create``
+does not send signals.
+"""
+import csv
+import html
+import io
+import re
+from collections import Counter
+from datetime import date
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.db.models import Count
+
+from .forms import TransactionForm
+from .models import Transaction
+from .rollups import rebuild_rollups
+
+DEFAULT_IMPORT_BATCH_SIZE = 500
+DEFAULT_IMPORT_MAX_ROWS = 100000
+
+FIELDS = ['type', 'amount', 'category', 'date', 'description']
+ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+OFX_TAG_RE = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+
+class ImportFormatError(ValueError):
+    """Raised when an uploaded file cannot be read as the selected format."""
+
+
+def _choice_lookup(choices):
+    """Map both stored values and (lowercased) labels to the stored value."""
+    lookup = {}
+    for value, label in choices:
+        lookup[value] = value
+        lookup[str(label).lower()] = value
+    return lookup
+
+
+TYPE_LOOKUP = _choice_lookup(Transaction.TYPE_CHOICES)
+CATEGORY_LOOKUP = _choice_lookup(Transaction.CATEGORY_CHOICES)
+CHOICE_VALUES = {
+    'type': {value for value, _ in Transaction.TYPE_CHOICES},
+    'category': {value for value, _ in Transaction.CATEGORY_CHOICES},
+}
+
+
+def normalize_row(raw):
+    """
+    Turn a raw CSV/OFX record into TransactionForm field values.
+
+    Labels such as 'Expense' or 'Food' (as written by the CSV export) map to
+    stored values. A signed amount sets the type when the type is missing,
+    and a negative expense is read as its absolute value.
+    """
+    amount = raw.get('amount', '').replace(',', '').replace('$', '').strip()
+    type = raw.get('type', '').strip()
+    type = TYPE_LOOKUP.get(type.lower(), type)
+    if amount.startswith('-') and type in ('', 'expense'):
+        amount, type = amount[1:], 'expense'
+    elif not type and amount:
+        type = 'income'
+    category = raw.get('category', '').strip()
+    return {
+        'type': type,
+        'amount': amount.lstrip('+'),
+        'category': CATEGORY_LOOKUP.get(category.lower(), category) or 'other',
+        'date': raw.get('date', '').strip(),
+        'description': raw.get('description', '').strip(),
+    }
+
+
+def _clean_field(name, value):
+    """TransactionForm's field cleaning, with shortcuts for well-formed choice and ISO date values"""
+    if value in CHOICE_VALUES.get(name, ()):
+        return value
+    if name == 'date' and ISO_DATE_RE.match(value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    return TransactionForm.base_fields[name].clean(value)
+
+
+def validate_row(raw):
+    """
+    Validate one record with TransactionForm's field and clean rules.
+
+    Args:
+        raw: Dict of normalized string values
+
+    Returns:
+        (cleaned values, None) when valid, otherwise (None, {field: [messages]})
+    """
+    cleaned, errors = {}, {}
+    for name in FIELDS:
+        try:
+            cleaned[name] = _clean_field(name, raw.get(name, ''))
+        except ValidationError as e:
+            errors[name] = e.messages
+
+    for name, check in (('amount', TransactionForm.validate_amount), ('date', TransactionForm.validate_date)):
+        if name in cleaned:
+            try:
+                check(cleaned[name])
+            except ValidationError as e:
+                errors[name] = e.messages
+
+    if 'type' in cleaned and 'category' in cleaned:
+        error = TransactionForm.category_error(cleaned['type'], cleaned['category'])
+        if error:
+            errors['category'] = [error]
+    return (None, errors) if errors else (cleaned, None)
+
+
+def iter_csv(file):
+    """
+    Yield (line number, record) from a CSV upload.
+
+    Date and Amount columns are required; Type, Category and Description are
+    optional. Headers are matched case-insensitively.
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(text)
+        headers = {name.strip().lower(): name for name in reader.fieldnames or [] if name}
+        missing = [column for column in ('date', 'amount') if column not in headers]
+        if missing:
+            raise ImportFormatError(f"The CSV file needs these columns: {', '.join(missing)}.")
+        for row in reader:
+            yield reader.line_num, {
+                field: row.get(headers[field]) or ''
+                for field in FIELDS
+                if field in headers
+            }
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f'The CSV file could not be read: {e}')
+    finally:
+        text.detach()
+
+
+def _ofx_record(tags):
+    posted = tags.get('DTPOSTED', '')
+    if len(posted) >= 8 and posted[:8].isdigit():
+        posted = f'{posted[:4]}-{posted[4:6]}-{posted[6:8]}'
+    description = ' - '.join(value for value in (tags.get('NAME'), tags.get('MEMO')) if value)
+    return {'date': posted, 'amount': tags.get('TRNAMT', ''), 'description': description}
+
+
+def iter_ofx(file):
+    """
+    Yield (transaction number, record) from an OFX/QFX statement.
+
+    Handles both SGML (OFX 1.x, unclosed tags) and XML (OFX 2.x) files. The
+    sign of TRNAMT gives the type; the category is left as 'other'.
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8', errors='replace')
+    number = 0
+    tags = None
+    try:
+        for line in text:
+            for closing, tag, value in OFX_TAG_RE.findall(line):
+                tag = tag.upper()
+                if tag == 'STMTTRN':
+                    if closing and tags is not None:
+                        number += 1
+                        yield number, _ofx_record(tags)
+                        tags = None
+                    elif not closing:
+                        tags = {}
+                elif tags is not None and not closing:
+                    tags[tag] = html.unescape(value.strip())
+    finally:
+        text.detach()
+    if number == 0:
+        raise ImportFormatError('No transactions were found in the OFX file.')
+
+
+def import_transactions(user, file, file_format='csv', batch_size=None, max_rows=None):
+    """
+    Import transactions for a user from an uploaded file.
+
+    Valid rows are created; invalid rows and duplicates are skipped and
+    reported. A row is a duplicate when the user already has as many
+    transactions with its fingerprint as the file has seen so far, so
+    re-importing a file creates nothing while two identical purchases in one
+    file are both kept.
+
+    Args:
+        user: Owner of the new transactions
+        file: Binary file object (e.g. an UploadedFile)
+        file_format: 'csv' or 'ofx'
+        batch_size: Rows validated and inserted per batch
+        max_rows: Largest number of rows accepted
+
+    Returns:
+        Dict with rows, created, duplicates (row numbers) and errors
+        ([{'row': n, 'errors': {field: [messages]}}])
+
+    Raises:
+        ImportFormatError: If the file cannot be read or has too many rows
+    """
+    batch_size = batch_size or getattr(settings, 'TRANSACTION_IMPORT_BATCH_SIZE', DEFAULT_IMPORT_BATCH_SIZE)
+    max_rows = max_rows or getattr(settings, 'TRANSACTION_IMPORT_MAX_ROWS', DEFAULT_IMPORT_MAX_ROWS)
+    records = iter_ofx(file) if file_format == 'ofx' else iter_csv(file)
+    report = {'rows': 0, 'created': 0, 'duplicates': [], 'errors': []}
+    seen = Counter()
+    stored = {}
+
+    with db_transaction.atomic():
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            report['rows'] += len(batch)
+            if report['rows'] > max_rows:
+                raise ImportFormatError(f'Imports are limited to {max_rows} rows per file.')
+
+            valid = []
+            for number, raw in batch:
+                cleaned, errors = validate_row(normalize_row(raw))
+                if errors:
+                    report['errors'].append({'row': number, 'errors': errors})
+                    continue
+                cleaned['fingerprint'] = Transaction.make_fingerprint(
+                    cleaned['date'], cleaned['type'], cleaned['category'], cleaned['amount'], cleaned['description'],
+                )
+                valid.append((number, cleaned))
+
+            unknown = {cleaned['fingerprint'] for _, cleaned in valid} - stored.keys()
+            if unknown:
+                counts = dict(
+                    Transaction.objects.filter(user=user, fingerprint__in=unknown)
+                    .order_by()
+                    .values_list('fingerprint')
+                    .annotate(count=Count('id'))
+                )
+                stored.update({fingerprint: counts.get(fingerprint, 0) for fingerprint in unknown})
+
+            new = []
+            for number, cleaned in valid:
+                seen[cleaned['fingerprint']] += 1
+                if seen[cleaned['fingerprint']] <= stored[cleaned['fingerprint']]:
+                    report['duplicates'].append(number)
+                else:
+                    new.append(Transaction(user=user, **cleaned))
+            Transaction.objects.bulk_create(new, batch_size=batch_size)
+            report['created'] += len(new)
+
+        if report['created']:
+            rebuild_rollups(user)
+    return report
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from productivity.rollups import rebuild_rollups, verify_rollups
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly finance rollups from raw transactions and verify them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='Only rebuild the rollups of this user')
+        parser.add_argument('--check', action='store_true', help='Only verify; exit with an error if rollups have drifted')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user_id']:
+            try:
+                user = User.objects.get(id=options['user_id'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user_id']} does not exist")
+
+        if not options['check']:
+            count = rebuild_rollups(user)
+            self.stdout.write(f'Wrote {count} rollup rows')
+
+        mismatches = verify_rollups(user)
+        for (user_id, month, type, category), expected, stored in mismatches:
+            self.stdout.write(
+                f'user {user_id} {month:%Y-%m} {type}/{category}: '
+                f'expected {expected[0]} ({expected[1]}), stored {stored[0]} ({stored[1]})'
+            )
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} rollup rows do not match the transactions')
+        self.stdout.write(self.style.SUCCESS('Rollups match the transactions'))
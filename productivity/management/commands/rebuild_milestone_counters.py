@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from productivity.milestones import rebuild_milestone_counters, verify_milestone_counters
+from productivity.models import Goal
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the milestone counters on goals from their milestones and verify them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help="Only rebuild this user's goals")
+        parser.add_argument('--check', action='store_true', help='Only verify; exit with an error if counters have drifted')
+
+    def handle(self, *args, **options):
+        goals = Goal.objects.all()
+        if options['user_id']:
+            goals = goals.filter(user_id=options['user_id'])
+
+        if not options['check']:
+            count = rebuild_milestone_counters(goals)
+            self.stdout.write(f'Repaired {count} goals')
+
+        mismatches = verify_milestone_counters(goals)
+        for goal_id, expected, stored in mismatches:
+            self.stdout.write(
+                f'goal {goal_id}: expected {expected[1]}/{expected[0]} completed, stored {stored[1]}/{stored[0]}'
+            )
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} goals have milestone counters that do not match their milestones')
+        self.stdout.write(self.style.SUCCESS('Milestone counters match the milestones'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from productivity.blobs import repair_blobs, verify_blobs
+
+
+class Command(BaseCommand):
+    help = 'Check content-addressed blobs against the rows that reference them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--content', action='store_true', help='Also re-hash every stored object')
+        parser.add_argument('--repair', action='store_true', help='Reset reference counts and delete unreferenced blobs first')
+
+    def handle(self, *args, **options):
+        if options['repair']:
+            fixed, deleted = repair_blobs()
+            self.stdout.write(f'Fixed {fixed} reference counts, deleted {deleted} unreferenced blobs')
+
+        problems = verify_blobs(check_content=options['content'])
+        for name, problem in problems:
+            self.stdout.write(f'{name}: {problem}')
+        if problems:
+            raise CommandError(f'{len(problems)} blob problems found')
+        self.stdout.write(self.style.SUCCESS('Blobs match their references'))
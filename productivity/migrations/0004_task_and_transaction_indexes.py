@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productivity', '0003_alter_document_options_alter_goal_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'status'], name='productivit_user_id_75ce26_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_date'], name='productivit_user_id_58012b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'date'], name='productivit_user_id_a2da47_idx'),
+        ),
+    ]
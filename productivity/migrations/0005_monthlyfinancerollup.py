@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('productivity', 'Transaction')
+    MonthlyFinanceRollup = apps.get_model('productivity', 'MonthlyFinanceRollup')
+    rows = (
+        Transaction.objects.order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'type', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    MonthlyFinanceRollup.objects.bulk_create(
+        [MonthlyFinanceRollup(**row) for row in rows.iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productivity', '0004_task_and_transaction_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyFinanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=20)),
+                ('category', models.CharField(choices=[('food', 'Food'), ('transport', 'Transport'), ('entertainment', 'Entertainment'), ('shopping', 'Shopping'), ('bills', 'Bills'), ('education', 'Education'), ('health', 'Health'), ('salary', 'Salary'), ('freelance', 'Freelance'), ('investment', 'Investment'), ('other', 'Other')], max_length=50)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='finance_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Monthly Finance Rollup',
+                'verbose_name_plural': 'Monthly Finance Rollups',
+                'ordering': ['month', 'type', 'category'],
+                'unique_together': {('user', 'month', 'type', 'category')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:11
+
+from django.conf import settings
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def fill_fingerprints(apps, schema_editor):
+    # Same hash as Transaction.make_fingerprint (model methods are not available here)
+    Transaction = apps.get_model('productivity', 'Transaction')
+    batch = []
+    for row in Transaction.objects.only('date', 'type', 'category', 'amount', 'description').iterator(chunk_size=2000):
+        raw = '|'.join([
+            row.date.isoformat(),
+            row.type,
+            row.category,
+            f'{Decimal(str(row.amount)):.2f}',
+            ' '.join(row.description.split()).lower(),
+        ])
+        row.fingerprint = hashlib.sha256(raw.encode()).hexdigest()
+        batch.append(row)
+        if len(batch) >= 2000:
+            Transaction.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    Transaction.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productivity', '0005_monthlyfinancerollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Content hash used to skip duplicate imports', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'fingerprint'], name='productivit_user_id_11481c_idx'),
+        ),
+        migrations.RunPython(fill_fingerprints, migrations.RunPython.noop),
+    ]
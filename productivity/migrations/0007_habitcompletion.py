@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:19
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_completions(apps, schema_editor):
+    # Rebuild the days behind each habit's current streak, so streaks carry over
+    # (same days as productivity.streaks.streak_days)
+    Habit = apps.get_model('productivity', 'Habit')
+    HabitCompletion = apps.get_model('productivity', 'HabitCompletion')
+    completions = []
+    habits = Habit.objects.filter(last_completed_date__isnull=False)
+    for habit in habits.iterator():
+        step = 7 if habit.frequency == 'weekly' else 1
+        for i in range(max(habit.current_streak, 1)):
+            completions.append(HabitCompletion(habit=habit, date=habit.last_completed_date - timedelta(days=i * step)))
+    HabitCompletion.objects.bulk_create(completions, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productivity', '0006_transaction_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='productivity.habit')),
+            ],
+            options={
+                'verbose_name': 'Habit Completion',
+                'verbose_name_plural': 'Habit Completions',
+                'ordering': ['-date'],
+                'unique_together': {('habit', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_completions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:20
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    Goal = apps.get_model('productivity', 'Goal')
+    rows = Goal.objects.order_by().annotate(
+        total=Count('milestones'),
+        completed=Count('milestones', filter=Q(milestones__completed=True)),
+    ).filter(total__gt=0).values_list('id', 'total', 'completed')
+    Goal.objects.bulk_update(
+        [Goal(id=goal_id, milestone_total=total, milestone_completed=completed) for goal_id, total, completed in rows.iterator()],
+        ['milestone_total', 'milestone_completed'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productivity', '0007_habitcompletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='milestone_completed',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goal',
+            name='milestone_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def parse_tags(text):
+    # Same normalization as productivity.tags.parse_tags
+    names = []
+    for part in (text or '').split(','):
+        name = ' '.join(part.split()).lower()[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def backfill_tags(apps, schema_editor):
+    Tag = apps.get_model('productivity', 'Tag')
+    Document = apps.get_model('productivity', 'Document')
+    DocumentTag = apps.get_model('productivity', 'DocumentTag')
+    tagged = [
+        (object_id, user_id, parse_tags(tags))
+        for object_id, user_id, tags in Document.objects.exclude(tags='').values_list('id', 'user_id', 'tags').iterator()
+    ]
+    pairs = {(user_id, name) for _, user_id, names in tagged for name in names}
+    Tag.objects.bulk_create(
+        [Tag(user_id=user_id, name=name) for user_id, name in pairs],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    tag_ids = {(user_id, name): tag_id for tag_id, user_id, name in Tag.objects.values_list('id', 'user_id', 'name').iterator()}
+    DocumentTag.objects.bulk_create(
+        [DocumentTag(document_id=object_id, tag_id=tag_ids[user_id, name]) for object_id, user_id, names in tagged for name in names],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productivity', '0008_goal_milestone_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['name'],
+                'unique_together': {('user', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DocumentTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='productivity.document')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_links', to='productivity.tag')),
+            ],
+            options={
+                'unique_together': {('document', 'tag')},
+            },
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='tag_objects',
+            field=models.ManyToManyField(blank=True, related_name='documents', through='productivity.DocumentTag', to='productivity.tag'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productivity', '0009_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(help_text='Storage path', max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Stored Blob',
+                'verbose_name_plural': 'Stored Blobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
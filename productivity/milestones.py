@@ -0,0 +1,96 @@
+"""
+Denormalized milestone counters on ``Goal``.
+
+``Goal.milestone_total`` and ``Goal.milestone_completed`` are adjusted with
+atomic ``F()`` updates by signals whenever a ``Milestone`` is saved or
+deleted, so goal progress is derived without counting milestone rows.
+Writes that bypass signals (``QuerySet.update``, ``bulk_create``) must call
+``rebuild_milestone_counters`` for the affected goals;
+``manage.py rebuild_milestone_counters`` rebuilds and verifies every goal.
+"""
+from django.db.models import Count, F, Q
+
+from .models import Goal
+
+
+def apply_delta(goal_id, total, completed):
+    """
+    Add ``total`` and ``completed`` to a goal's milestone counters.
+
+    Args:
+        goal_id: Goal to update
+        total: Number of milestones to add (negative to subtract)
+        completed: Number of completed milestones to add (negative to subtract)
+    """
+    changes = {}
+    if total:
+        changes['milestone_total'] = F('milestone_total') + total
+    if completed:
+        changes['milestone_completed'] = F('milestone_completed') + completed
+    if changes:
+        Goal.objects.filter(pk=goal_id).update(**changes)
+
+
+def record_milestone_change(previous, instance):
+    """
+    Move a saved milestone between goal counters.
+
+    Args:
+        previous: Dict of the row before the save (goal_id, completed), or
+            None for a new milestone
+        instance: The saved Milestone
+    """
+    completed = int(instance.completed)
+    if previous is None:
+        apply_delta(instance.goal_id, 1, completed)
+    elif previous['goal_id'] != instance.goal_id:
+        apply_delta(previous['goal_id'], -1, -int(previous['completed']))
+        apply_delta(instance.goal_id, 1, completed)
+    else:
+        apply_delta(instance.goal_id, 0, completed - int(previous['completed']))
+
+
+def record_milestone_delete(instance):
+    apply_delta(instance.goal_id, -1, -int(instance.completed))
+
+
+def verify_milestone_counters(goals=None):
+    """
+    Compare stored counters with a fresh count of milestone rows.
+
+    Args:
+        goals: Goal queryset to check (all goals when None)
+
+    Returns:
+        List of (goal id, expected (total, completed), stored (total,
+        completed)) for every goal that differs; empty when consistent
+    """
+    if goals is None:
+        goals = Goal.objects.all()
+    rows = goals.order_by('id').annotate(
+        total=Count('milestones'),
+        completed=Count('milestones', filter=Q(milestones__completed=True)),
+    ).values_list('id', 'total', 'completed', 'milestone_total', 'milestone_completed')
+    return [
+        (goal_id, (total, completed), (stored_total, stored_completed))
+        for goal_id, total, completed, stored_total, stored_completed in rows.iterator()
+        if (total, completed) != (stored_total, stored_completed)
+    ]
+
+
+def rebuild_milestone_counters(goals=None):
+    """
+    Recompute milestone counters from the milestone rows.
+
+    Args:
+        goals: Goal queryset to rebuild (all goals when None)
+
+    Returns:
+        Number of goals whose counters were repaired
+    """
+    stale = [
+        Goal(id=goal_id, milestone_total=total, milestone_completed=completed)
+        for goal_id, (total, completed), _ in verify_milestone_counters(goals)
+    ]
+    Goal.objects.bulk_update(stale, ['milestone_total', 'milestone_completed'], batch_size=500)
+    return len(stale)
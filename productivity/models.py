@@ -1,3 +1,6 @@
+import hashlib
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -57,12 +60,30 @@ class Habit(models.Model):
     def __str__(self):
         return self.name
 
+
+class HabitCompletion(models.Model):
+    """One day on which a habit was completed."""
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='completions')
+    date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Habit Completion'
+        verbose_name_plural = 'Habit Completions'
+        unique_together = ['habit', 'date']
+
+    def __str__(self):
+        return f"{self.habit.name} on {self.date}"
+
 class Goal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='goals')
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     target_date = models.DateField(null=True, blank=True)
     progress = models.IntegerField(default=0, help_text="Progress in %")
+    milestone_total = models.PositiveIntegerField(default=0, editable=False)
+    milestone_completed = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
     
@@ -75,22 +96,53 @@ class Goal(models.Model):
         return self.title
 
     def recalculate_progress_from_milestones(self, save=True):
-        total_milestones = self.milestones.count()
-        if total_milestones == 0:
+        # Counters are updated in the database by milestone signals, so this copy may be stale
+        self.refresh_from_db(fields=['milestone_total', 'milestone_completed'])
+        if self.milestone_total == 0:
             return self.progress
 
-        completed_milestones = self.milestones.filter(completed=True).count()
-        self.progress = round((completed_milestones / total_milestones) * 100)
+        self.progress = round((self.milestone_completed / self.milestone_total) * 100)
         if save:
             self.save(update_fields=['progress', 'updated_at'])
         return self.progress
 
+class Tag(models.Model):
+    """A user's tag, shared by documents and journal entries (see tags.py)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tags')
+    name = models.CharField(max_length=50)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Tag'
+        verbose_name_plural = 'Tags'
+        unique_together = ['user', 'name']
+
+    def __str__(self):
+        return self.name
+
+class StoredBlob(models.Model):
+    """One stored file, shared by every upload with the same content (see blobs.py)."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True, help_text="Storage path")
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Stored Blob'
+        verbose_name_plural = 'Stored Blobs'
+
+    def __str__(self):
+        return self.name
+
 class Document(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='documents')
     title = models.CharField(max_length=255)
     file = models.FileField(upload_to='productivity/documents/')
     category = models.CharField(max_length=100, blank=True)
     tags = models.CharField(max_length=500, blank=True, help_text="Comma-separated tags")
+    tag_objects = models.ManyToManyField(Tag, through='DocumentTag', related_name='documents', blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -101,6 +153,13 @@ class Document(models.Model):
     def __str__(self):
         return self.title
 
+class DocumentTag(models.Model):
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='document_links')
+
+    class Meta:
+        unique_together = ['document', 'tag']
+
 class Timetable(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timetables')
     name = models.CharField(max_length=255)
@@ -117,6 +176,11 @@ class Timetable(models.Model):
     def __str__(self):
         return self.name
 
+    def compiled(self):
+        """Compiled form of schedule_json (cached, see timetables.py)."""
+        from .timetables import timetable_cache
+        return timetable_cache.get(self)
+
 class Transaction(models.Model):
     TYPE_CHOICES = [
         ('income', 'Income'),
@@ -143,16 +207,57 @@ class Transaction(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     date = models.DateField()
     description = models.TextField(blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True, editable=False, help_text='Content hash used to skip duplicate imports')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-date', '-created_at']
         verbose_name = 'Transaction'
         verbose_name_plural = 'Transactions'
+        indexes = [
+            models.Index(fields=['user', 'date']),
+            models.Index(fields=['user', 'fingerprint']),
+        ]
 
     def __str__(self):
         return f"{self.type.title()}: {self.amount} - {self.category}"
 
+    @staticmethod
+    def make_fingerprint(date, transaction_type, category, amount, description=''):
+        """SHA-256 of the fields that identify a transaction (description case and spacing ignored)"""
+        raw = '|'.join([
+            date.isoformat(),
+            transaction_type,
+            category,
+            f'{Decimal(str(amount)):.2f}',
+            ' '.join(description.split()).lower(),
+        ])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        if self.date:
+            self.fingerprint = self.make_fingerprint(self.date, self.type, self.category, self.amount, self.description)
+        super().save(*args, **kwargs)
+
+
+class MonthlyFinanceRollup(models.Model):
+    """Per-month totals of a user's transactions, one row per type and category."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='finance_rollups')
+    month = models.DateField(help_text='First day of the month')
+    type = models.CharField(max_length=20, choices=Transaction.TYPE_CHOICES)
+    category = models.CharField(max_length=50, choices=Transaction.CATEGORY_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['month', 'type', 'category']
+        verbose_name = 'Monthly Finance Rollup'
+        verbose_name_plural = 'Monthly Finance Rollups'
+        unique_together = ['user', 'month', 'type', 'category']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.type}/{self.category}: {self.total}"
+
 class Milestone(models.Model):
     goal = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='milestones')
     title = models.CharField(max_length=255)
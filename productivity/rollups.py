@@ -0,0 +1,195 @@
+"""
+Incrementally maintained monthly finance rollups.
+
+``MonthlyFinanceRollup`` holds one row per user, month, type and category.
+Signals adjust those rows with atomic ``F()`` updates whenever a
+``Transaction`` is saved or deleted, so dashboards read O(months) rollup
+rows instead of scanning raw transactions. Writes that bypass signals
+(``QuerySet.update``, ``bulk_create``) must call ``rebuild_rollups`` for the
+affected user; ``manage.py rebuild_finance_rollups`` rebuilds and verifies
+the whole table.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import MonthlyFinanceRollup, Transaction
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def rollup_key(user_id, day, type, category):
+    return (user_id, month_start(day), type, category)
+
+
+def apply_delta(key, amount, count):
+    """
+    Add ``amount`` and ``count`` to the rollup row for ``key``.
+
+    Args:
+        key: (user_id, month, type, category)
+        amount: Decimal to add to the total (negative to subtract)
+        count: Number of transactions to add (negative to subtract)
+    """
+    user_id, month, type, category = key
+    rows = MonthlyFinanceRollup.objects.filter(user_id=user_id, month=month, type=type, category=category)
+    if rows.update(total=F('total') + amount, count=F('count') + count):
+        if count < 0:
+            rows.filter(count__lte=0).delete()
+        return
+    if count <= 0:
+        # Nothing to subtract from; rebuild_rollups repairs a drifted table
+        return
+    try:
+        with transaction.atomic():
+            MonthlyFinanceRollup.objects.create(
+                user_id=user_id, month=month, type=type, category=category, total=amount, count=count
+            )
+    except IntegrityError:
+        # Another request created the row first
+        rows.update(total=F('total') + amount, count=F('count') + count)
+
+
+def record_transaction_change(previous, instance):
+    """
+    Move a saved transaction's amount between rollup rows.
+
+    Args:
+        previous: Dict of the row before the save (user_id, date, type,
+            category, amount), or None for a new transaction
+        instance: The saved Transaction
+    """
+    amount = Decimal(str(instance.amount))
+    key = rollup_key(instance.user_id, instance.date, instance.type, instance.category)
+    with transaction.atomic():
+        if previous is None:
+            apply_delta(key, amount, 1)
+            return
+        previous_key = rollup_key(previous['user_id'], previous['date'], previous['type'], previous['category'])
+        if previous_key == key:
+            if amount != previous['amount']:
+                apply_delta(key, amount - previous['amount'], 0)
+            return
+        apply_delta(previous_key, -previous['amount'], -1)
+        apply_delta(key, amount, 1)
+
+
+def record_transaction_delete(instance):
+    key = rollup_key(instance.user_id, instance.date, instance.type, instance.category)
+    apply_delta(key, -Decimal(str(instance.amount)), -1)
+
+
+def _aggregate_transactions(user=None):
+    transactions = Transaction.objects.order_by()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+    return (
+        transactions
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'type', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+
+
+def rebuild_rollups(user=None):
+    """
+    Recompute rollups from raw transactions.
+
+    Args:
+        user: Only rebuild this user's rows (all users when None)
+
+    Returns:
+        Number of rollup rows written
+    """
+    rollups = MonthlyFinanceRollup.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+    with transaction.atomic():
+        rollups.delete()
+        created = MonthlyFinanceRollup.objects.bulk_create(
+            [MonthlyFinanceRollup(**row) for row in _aggregate_transactions(user).iterator()],
+            batch_size=500,
+        )
+    return len(created)
+
+
+def verify_rollups(user=None):
+    """
+    Compare stored rollups with a fresh aggregate of raw transactions.
+
+    Args:
+        user: Only check this user's rows (all users when None)
+
+    Returns:
+        List of (key, expected (total, count), stored (total, count)) for
+        every row that differs; empty when the table is consistent
+    """
+    expected = {
+        (row['user_id'], row['month'], row['type'], row['category']): (row['total'], row['count'])
+        for row in _aggregate_transactions(user).iterator()
+    }
+    rollups = MonthlyFinanceRollup.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+    stored = {
+        (row['user_id'], row['month'], row['type'], row['category']): (row['total'], row['count'])
+        for row in rollups.values('user_id', 'month', 'type', 'category', 'total', 'count').iterator()
+    }
+    empty = (Decimal('0.00'), 0)
+    return [
+        (key, expected.get(key, empty), stored.get(key, empty))
+        for key in sorted(expected.keys() | stored.keys(), key=str)
+        if expected.get(key, empty) != stored.get(key, empty)
+    ]
+
+
+def finance_summary(user):
+    """
+    Totals, category breakdown and monthly series for a user's transactions.
+
+    Args:
+        user: User whose rollups to read
+
+    Returns:
+        Dict with total_income, total_expenses, balance, income_by_category,
+        expense_by_category and monthly_data ({'YYYY-MM': {'income', 'expense'}})
+    """
+    totals = {'income': Decimal('0.00'), 'expense': Decimal('0.00')}
+    by_category = {'income': {}, 'expense': {}}
+    monthly_data = {}
+    rows = MonthlyFinanceRollup.objects.filter(user=user).order_by('month').values_list('month', 'type', 'category', 'total')
+    for month, type, category, total in rows:
+        kind = 'income' if type == 'income' else 'expense'
+        totals[kind] += total
+        by_category[kind][category] = by_category[kind].get(category, 0) + float(total)
+        bucket = monthly_data.setdefault(month.strftime('%Y-%m'), {'income': 0, 'expense': 0})
+        bucket[kind] += float(total)
+
+    return {
+        'total_income': totals['income'],
+        'total_expenses': totals['expense'],
+        'balance': totals['income'] - totals['expense'],
+        'income_by_category': by_category['income'],
+        'expense_by_category': by_category['expense'],
+        'monthly_data': monthly_data,
+    }
+
+
+def month_totals(user, day):
+    """
+    Income and expenses for the month containing ``day``.
+
+    Returns:
+        (income, expenses) as Decimals
+    """
+    rows = (
+        MonthlyFinanceRollup.objects.filter(user=user, month=month_start(day))
+        .values('type')
+        .annotate(sum=Sum('total'))
+    )
+    totals = {row['type']: row['sum'] for row in rows}
+    return totals.get('income', Decimal('0.00')), totals.get('expense', Decimal('0.00'))
@@ -0,0 +1,83 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .blobs import track_blob_field
+from .milestones import record_milestone_change, record_milestone_delete
+from .models import Document, DocumentTag, Habit, HabitCompletion, Milestone, Timetable, Transaction
+from .rollups import record_transaction_change, record_transaction_delete
+from .streaks import invalidate_habit_stats
+from .tags import sync_tags
+from .timetables import timetable_cache
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    """Keep the stored row so post_save can move its amount out of the old rollup"""
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        instance._rollup_previous = (
+            Transaction.objects.filter(pk=instance.pk)
+            .values('user_id', 'date', 'type', 'category', 'amount')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    record_transaction_change(getattr(instance, '_rollup_previous', None), instance)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    record_transaction_delete(instance)
+
+
+@receiver(post_save, sender=HabitCompletion)
+@receiver(post_delete, sender=HabitCompletion)
+def drop_cached_habit_stats(sender, instance, **kwargs):
+    invalidate_habit_stats(instance.habit_id)
+
+
+@receiver(post_save, sender=Habit)
+def drop_cached_stats_for_edited_habit(sender, instance, update_fields=None, **kwargs):
+    """Frequency and streak edits change the stats; record_completion's own save does not"""
+    if update_fields is None or not {'current_streak', 'last_completed_date'} >= set(update_fields):
+        invalidate_habit_stats(instance.id)
+
+
+@receiver(pre_save, sender=Milestone)
+def remember_previous_milestone(sender, instance, raw=False, **kwargs):
+    """Keep the stored goal and state so post_save can move the milestone between counters"""
+    instance._counter_previous = None
+    if instance.pk and not raw:
+        instance._counter_previous = (
+            Milestone.objects.filter(pk=instance.pk).values('goal_id', 'completed').first()
+        )
+
+
+@receiver(post_save, sender=Milestone)
+def update_goal_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    record_milestone_change(None if created else getattr(instance, '_counter_previous', None), instance)
+
+
+@receiver(post_delete, sender=Milestone)
+def update_goal_counters_on_delete(sender, instance, **kwargs):
+    record_milestone_delete(instance)
+
+
+@receiver(post_save, sender=Timetable)
+@receiver(post_delete, sender=Timetable)
+def invalidate_compiled_timetable(sender, instance, **kwargs):
+    timetable_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Document)
+def sync_document_tags(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_tags(instance, DocumentTag, 'document')
+
+
+track_blob_field(Document, 'file')
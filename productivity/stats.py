@@ -0,0 +1,75 @@
+"""
+Per-user productivity statistics.
+
+Each model is summarized with a single aggregate query (conditional
+``Count(filter=Q(...))``, ``Avg`` and ``Sum``), so the number of queries is
+fixed no matter how many tasks, habits or goals a user has.
+"""
+from datetime import timedelta
+
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from .models import Goal, Habit, Task
+from .rollups import month_totals
+
+
+def task_stats(user, today):
+    stats = Task.objects.filter(user=user).aggregate(
+        total=Count('id'),
+        todo=Count('id', filter=Q(status='todo')),
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        done=Count('id', filter=Q(status='done')),
+        due_this_week=Count('id', filter=Q(
+            due_date__gte=today,
+            due_date__lte=today + timedelta(days=7),
+            status__in=['todo', 'in_progress'],
+        )),
+    )
+    stats['completion_rate'] = round(stats['done'] / stats['total'] * 100, 1) if stats['total'] else 0
+    return stats
+
+
+def habit_stats(user):
+    stats = Habit.objects.filter(user=user).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(current_streak__gt=0)),
+        avg_streak=Avg('current_streak'),
+    )
+    stats['avg_streak'] = round(stats['avg_streak'] or 0, 1)
+    return stats
+
+
+def goal_stats(user):
+    stats = Goal.objects.filter(user=user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(progress=100)),
+        avg_progress=Avg('progress'),
+    )
+    stats['avg_progress'] = round(stats['avg_progress'] or 0, 1)
+    return stats
+
+
+def finance_stats(user, today):
+    income, expenses = month_totals(user, today)
+    return {'monthly_income': income, 'monthly_expenses': expenses, 'monthly_balance': income - expenses}
+
+
+def get_user_stats(user, today=None):
+    """
+    Dashboard statistics for a user.
+
+    Args:
+        user: User to summarize
+        today: Reference date for "due this week" and "this month" (defaults to today)
+
+    Returns:
+        Dict with 'tasks', 'habits', 'goals' and 'finance' stat dicts
+    """
+    today = today or timezone.now().date()
+    return {
+        'tasks': task_stats(user, today),
+        'habits': habit_stats(user),
+        'goals': goal_stats(user),
+        'finance': finance_stats(user, today),
+    }
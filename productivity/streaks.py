@@ -0,0 +1,210 @@
+"""
+Habit streaks and completion history.
+
+Completions live in ``HabitCompletion``. For a set of habits, every
+completion date is read with one query and turned into NumPy arrays of day
+(or ISO week) numbers. Streaks are the lengths of runs of consecutive
+numbers, found with ``np.diff``, and the heatmap is a boolean array over the
+requested range. Results are cached per habit and dropped by a signal
+whenever one of its completions is added or removed.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import HabitCompletion
+
+DEFAULT_HEATMAP_DAYS = 365
+DEFAULT_HABIT_STATS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def cache_key(habit_id):
+    return f'habit_stats:{habit_id}'
+
+
+def invalidate_habit_stats(habit_id):
+    cache.delete(cache_key(habit_id))
+
+
+def week_number(days):
+    """ISO week index of day ordinals (ordinal 1, 0001-01-01, was a Monday)."""
+    return (days - 1) // 7
+
+
+def streak_days(habit):
+    """
+    Days implied by a habit's stored current_streak and last_completed_date.
+
+    Habits tracked before the completion log existed (or edited through the
+    API) have a streak but no log rows; these days stand in for them.
+    """
+    if not habit.last_completed_date:
+        return []
+    step = 7 if habit.frequency == 'weekly' else 1
+    return [
+        habit.last_completed_date - timedelta(days=i * step)
+        for i in reversed(range(max(habit.current_streak, 1)))
+    ]
+
+
+def _runs(units):
+    """
+    Consecutive runs in a sorted array of unique integers.
+
+    Returns:
+        (run lengths, last unit of each run) as NumPy arrays
+    """
+    breaks = np.flatnonzero(np.diff(units) != 1)
+    ends = np.append(breaks, len(units) - 1)
+    starts = np.insert(breaks + 1, 0, 0)
+    return ends - starts + 1, units[ends]
+
+
+def compute_habit_stats(days, frequency, today, range_days, created=None):
+    """
+    Streaks, completion rate and heatmap for one habit.
+
+    Args:
+        days: Sorted NumPy array of unique completion day ordinals
+        frequency: 'daily' or 'weekly'
+        today: Date the stats are computed for
+        range_days: Length of the heatmap and completion-rate window
+        created: Date the habit was created (the rate is not counted before it)
+
+    Returns:
+        Dict with current_streak, longest_streak, completion_rate (percent of
+        days or weeks in the window), completions (in the window), start
+        (ISO date of the first heatmap day) and heatmap ('0'/'1' per day)
+    """
+    today_ordinal = today.toordinal()
+    start_ordinal = today_ordinal - range_days + 1
+    weekly = frequency == 'weekly'
+    units = np.unique(week_number(days)) if weekly else days
+    current_unit = week_number(today_ordinal) if weekly else today_ordinal
+
+    current_streak = longest_streak = 0
+    if units.size:
+        lengths, ends = _runs(units)
+        longest_streak = int(lengths.max())
+        # A streak is still alive until a whole day (or week) has been missed
+        if ends[-1] >= current_unit - 1:
+            current_streak = int(lengths[-1])
+
+    in_range = days[(days >= start_ordinal) & (days <= today_ordinal)]
+    heatmap = np.zeros(range_days, dtype=bool)
+    heatmap[in_range - start_ordinal] = True
+
+    since = start_ordinal
+    if created is not None:
+        since = max(since, created.toordinal())
+    if in_range.size:
+        since = min(since, int(in_range[0]))
+    if weekly:
+        done = np.unique(week_number(in_range[in_range >= since])).size
+        periods = week_number(today_ordinal) - week_number(since) + 1
+    else:
+        done = int((in_range >= since).sum())
+        periods = today_ordinal - since + 1
+
+    return {
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'completion_rate': round(done / periods * 100, 1) if periods > 0 else 0,
+        'completions': int(in_range.size),
+        'start': date.fromordinal(start_ordinal).isoformat(),
+        'heatmap': (heatmap.view(np.uint8) + ord('0')).tobytes().decode(),
+    }
+
+
+def habit_stats_for(habits, today=None, range_days=None):
+    """
+    Stats for several habits, reading completions with a single query.
+
+    Args:
+        habits: Iterable of Habit instances
+        today: Date to compute for (defaults to today)
+        range_days: Heatmap window in days (defaults to HABIT_HEATMAP_DAYS)
+
+    Returns:
+        Dict of habit id to the compute_habit_stats dict
+    """
+    habits = list(habits)
+    today = today or timezone.now().date()
+    range_days = range_days or getattr(settings, 'HABIT_HEATMAP_DAYS', DEFAULT_HEATMAP_DAYS)
+    variant = (today.isoformat(), range_days)
+
+    cached = cache.get_many([cache_key(habit.id) for habit in habits])
+    results = {}
+    missing = []
+    for habit in habits:
+        entry = cached.get(cache_key(habit.id))
+        if entry and variant in entry:
+            results[habit.id] = entry[variant]
+        else:
+            missing.append(habit)
+    if not missing:
+        return results
+
+    ordinals = defaultdict(list)
+    rows = HabitCompletion.objects.filter(habit__in=missing).order_by('date').values_list('habit_id', 'date')
+    for habit_id, day in rows:
+        ordinals[habit_id].append(day.toordinal())
+
+    updates = {}
+    for habit in missing:
+        if habit.id not in ordinals:
+            ordinals[habit.id] = [day.toordinal() for day in streak_days(habit)]
+        days = np.array(ordinals[habit.id], dtype=np.int64)
+        created = timezone.localtime(habit.created_at).date() if habit.created_at else None
+        stats = compute_habit_stats(days, habit.frequency, today, range_days, created)
+        results[habit.id] = stats
+        entry = cached.get(cache_key(habit.id)) or {}
+        # Keep only today's variants; older days can never be asked for again
+        entry = {key: value for key, value in entry.items() if key[0] == variant[0]}
+        entry[variant] = stats
+        updates[cache_key(habit.id)] = entry
+    cache.set_many(updates, getattr(settings, 'HABIT_STATS_CACHE_TIMEOUT', DEFAULT_HABIT_STATS_CACHE_TIMEOUT))
+    return results
+
+
+def habit_stats(habit, today=None, range_days=None):
+    return habit_stats_for([habit], today, range_days)[habit.id]
+
+
+def record_completion(habit, day=None):
+    """
+    Log a completion and refresh the habit's stored streak fields.
+
+    Weekly habits count at most one completion per ISO week.
+
+    Args:
+        habit: Habit that was completed
+        day: Completion date (defaults to today)
+
+    Returns:
+        True if a completion was recorded, False if the day (or week) was already done
+    """
+    day = day or timezone.now().date()
+    if habit.last_completed_date and not habit.completions.exists():
+        HabitCompletion.objects.bulk_create(
+            [HabitCompletion(habit=habit, date=past) for past in streak_days(habit)],
+            ignore_conflicts=True,
+        )
+    if habit.frequency == 'weekly':
+        monday = day - timedelta(days=day.weekday())
+        if habit.completions.filter(date__range=(monday, monday + timedelta(days=6))).exists():
+            return False
+    _, created = HabitCompletion.objects.get_or_create(habit=habit, date=day)
+    if not created:
+        return False
+
+    stats = habit_stats(habit, today=max(day, timezone.now().date()))
+    habit.current_streak = stats['current_streak']
+    if habit.last_completed_date is None or day > habit.last_completed_date:
+        habit.last_completed_date = day
+    habit.save(update_fields=['current_streak', 'last_completed_date'])
+    return True
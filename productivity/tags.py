@@ -0,0 +1,79 @@
+"""
+Normalized tags for documents and journal entries.
+
+The comma-separated ``tags`` text on ``Document`` and ``JournalEntry`` stays
+the editable source. Whenever one is saved, its tags are parsed into
+per-user ``Tag`` rows and the through table is synced, so tag filters are
+indexed joins on (user, name) and tag clouds are a single GROUP BY instead
+of ``icontains`` scans over the text.
+"""
+from django.db.models import Count
+
+from .models import Tag
+
+MAX_TAG_LENGTH = 50
+
+
+def parse_tags(text):
+    """
+    Tag names in comma-separated text.
+
+    Names are stripped, lowercased and whitespace-collapsed; empty names and
+    repeats are dropped.
+
+    Returns:
+        List of names in first-seen order
+    """
+    names = []
+    for part in (text or '').split(','):
+        name = ' '.join(part.split()).lower()[:MAX_TAG_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def sync_tags(instance, through, field):
+    """
+    Point a tagged object's through rows at the tags in its ``tags`` text.
+
+    Args:
+        instance: Saved Document or JournalEntry (anything with user_id and tags)
+        through: Through model linking ``instance`` to Tag
+        field: Name of the through model's foreign key to ``instance``
+    """
+    names = parse_tags(instance.tags)
+    if names:
+        Tag.objects.bulk_create(
+            [Tag(user_id=instance.user_id, name=name) for name in names],
+            ignore_conflicts=True,
+        )
+    wanted = set(Tag.objects.filter(user_id=instance.user_id, name__in=names).values_list('id', flat=True))
+    links = through.objects.filter(**{field: instance})
+    existing = set(links.values_list('tag_id', flat=True))
+    if existing - wanted:
+        links.filter(tag_id__in=existing - wanted).delete()
+    if wanted - existing:
+        through.objects.bulk_create(
+            [through(**{field: instance}, tag_id=tag_id) for tag_id in wanted - existing],
+            ignore_conflicts=True,
+        )
+
+
+def tag_counts(user, related_name):
+    """
+    How often each of a user's tags is used, counted with one GROUP BY.
+
+    Args:
+        user: Owner of the tags
+        related_name: Tag's reverse relation to count ('documents' or 'journal_entries')
+
+    Returns:
+        Queryset of Tag with a ``count`` attribute, most used first; unused
+        tags are left out
+    """
+    return (
+        Tag.objects.filter(user=user)
+        .annotate(count=Count(related_name))
+        .filter(count__gt=0)
+        .order_by('-count', 'name')
+    )
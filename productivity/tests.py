@@ -1,11 +1,31 @@
+import csv
+import io
+import tempfile
+
+import numpy as np
+
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
 from datetime import date, timedelta
 from decimal import Decimal
-from .models import Task, Habit, Goal, Document, Timetable, Transaction, Milestone
+from unittest.mock import patch
+from .models import Task, Habit, HabitCompletion, Goal, Document, DocumentTag, StoredBlob, Tag, Timetable, Transaction, Milestone, MonthlyFinanceRollup
 from .forms import TaskForm, HabitForm, GoalForm, TransactionForm
+from .blobs import blob_digest, repair_blobs, verify_blobs
+from .importers import ImportFormatError, import_transactions
+from .milestones import rebuild_milestone_counters, verify_milestone_counters
+from .rollups import finance_summary, rebuild_rollups, verify_rollups
+from .stats import get_user_stats
+from .timetables import TimetableError, compile_schedule, timetable_cache
+from .tags import parse_tags, tag_counts
+from .streaks import compute_habit_stats, habit_stats, habit_stats_for, record_completion
+from kouekam_hub.exports import iter_csv_rows
 
 User = get_user_model()
 
@@ -95,6 +115,68 @@ class MilestoneModelTest(TestCase):
         self.assertIn('Test Goal', str(milestone))
 
 
+class MilestoneCounterTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user(username='counteruser')
+        self.goal = Goal.objects.create(user=self.user, title='Ship App')
+
+    def counters(self, goal=None):
+        goal = goal or self.goal
+        goal.refresh_from_db()
+        return goal.milestone_total, goal.milestone_completed
+
+    def test_counters_follow_milestone_changes(self):
+        first = Milestone.objects.create(goal=self.goal, title='Design')
+        second = Milestone.objects.create(goal=self.goal, title='Build', completed=True)
+        self.assertEqual(self.counters(), (2, 1))
+
+        first.completed = True
+        first.save()
+        self.assertEqual(self.counters(), (2, 2))
+
+        other = Goal.objects.create(user=self.user, title='Other')
+        second.goal = other
+        second.save()
+        self.assertEqual(self.counters(), (1, 1))
+        self.assertEqual(self.counters(other), (1, 1))
+
+        first.delete()
+        self.assertEqual(self.counters(), (0, 0))
+        self.assertEqual(verify_milestone_counters(), [])
+
+    def test_progress_uses_counters(self):
+        Milestone.objects.create(goal=self.goal, title='A', completed=True)
+        for title in 'BCD':
+            Milestone.objects.create(goal=self.goal, title=title)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.goal.recalculate_progress_from_milestones(), 25)
+
+    def test_rebuild_repairs_drift(self):
+        Milestone.objects.create(goal=self.goal, title='A')
+        Milestone.objects.filter(goal=self.goal).update(completed=True)
+        self.assertEqual(verify_milestone_counters(), [(self.goal.id, (1, 1), (1, 0))])
+
+        self.assertEqual(rebuild_milestone_counters(), 1)
+        self.assertEqual(self.counters(), (1, 1))
+        self.assertEqual(verify_milestone_counters(), [])
+
+    def test_goal_api_query_count_does_not_grow_with_goals(self):
+        self.client.force_login(self.user)
+        Milestone.objects.create(goal=self.goal, title='A')
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/goals/')
+
+        for i in range(10):
+            goal = Goal.objects.create(user=self.user, title=f'Goal {i}')
+            Milestone.objects.create(goal=goal, title='Step', completed=True)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/goals/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+
 class TransactionModelTest(TestCase):
     def setUp(self):
         self.user = create_test_user()
@@ -282,3 +364,606 @@ class ProductivityWorkflowLogicTest(TestCase):
         self.assertEqual(response.status_code, 302)
         goal.refresh_from_db()
         self.assertEqual(goal.progress, 50)
+
+
+class TimetableIndexTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user(username='timetableuser')
+        self.addCleanup(timetable_cache.clear)
+        self.schedule = {
+            'monday': [
+                {'time': '13:00', 'activity': 'Lunch'},
+                {'time': '09:00-13:00', 'activity': 'Deep work'},
+                {'time': '12:30-14:00', 'activity': 'Gym'},
+            ],
+            'Wednesday': [{'time': '08:00', 'end': '09:00', 'activity': 'Class'}],
+        }
+
+    def test_now_and_next(self):
+        compiled = compile_schedule(self.schedule)
+
+        self.assertEqual(compiled.now('monday', 10 * 60)['activity'], 'Deep work')
+        self.assertEqual(compiled.now('monday', 12 * 60 + 45)['activity'], 'Gym')
+        self.assertEqual(compiled.now('monday', 13 * 60 + 30)['activity'], 'Lunch')
+        self.assertIsNone(compiled.now('monday', 8 * 60))
+        self.assertEqual(compiled.next('monday', 10 * 60)['activity'], 'Gym')
+        self.assertEqual(compiled.next('monday', 20 * 60), {
+            'day': 'wednesday', 'start': '08:00', 'end': '09:00', 'activity': 'Class',
+        })
+        self.assertEqual(compiled.next('thursday', 0)['activity'], 'Deep work')
+
+    def test_conflicts_are_found_with_a_sweep(self):
+        conflicts = compile_schedule(self.schedule).conflicts()
+
+        self.assertEqual(
+            [(first['activity'], second['activity']) for first, second in conflicts],
+            [('Deep work', 'Gym'), ('Gym', 'Lunch')],
+        )
+
+    def test_invalid_slots_are_reported(self):
+        with self.assertRaises(TimetableError) as raised:
+            compile_schedule({'monday': [{'time': '25:00', 'activity': 'X'}], 'someday': []})
+
+        self.assertEqual(len(raised.exception.problems), 2)
+
+    def test_compiled_timetable_is_cached_until_saved(self):
+        timetable = Timetable.objects.create(user=self.user, name='Week', schedule_json=self.schedule)
+        self.assertIs(timetable.compiled(), timetable.compiled())
+
+        first = timetable.compiled()
+        timetable.schedule_json = {'monday': []}
+        timetable.save()
+
+        self.assertIsNot(timetable.compiled(), first)
+
+    def test_now_endpoint(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('timetable_now')).json()['timetable'], None)
+
+        Timetable.objects.create(user=self.user, name='Week', schedule_json=self.schedule, active=True)
+        data = self.client.get(reverse('timetable_now')).json()
+
+        self.assertEqual(data['timetable']['name'], 'Week')
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(len(data['conflicts']), 2)
+
+    def test_create_rejects_invalid_schedule(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse('timetable_create'), {
+            'name': 'Broken',
+            'active': 'on',
+            'schedule_json': '{"monday": [{"time": "noon", "activity": "Lunch"}]}',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Timetable.objects.filter(name='Broken').exists())
+
+    def test_generator_rejects_invalid_schedule(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse('timetable_generator'), {
+            'name': 'Generated',
+            'monday_time': ['09:00-10:00', '25:00-26:00'],
+            'monday_activity': ['Study', 'Gym'],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Timetable.objects.filter(name='Generated').exists())
+        self.assertContains(response, 'Invalid schedule')
+
+    def test_generator_saves_valid_schedule(self):
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('timetable_generator')), 'monday_activities')
+
+        response = self.client.post(reverse('timetable_generator'), {
+            'name': 'Generated',
+            'monday_time': ['09:00-10:00'],
+            'monday_activity': ['Study'],
+        })
+
+        self.assertRedirects(response, reverse('timetable_list'))
+        timetable = Timetable.objects.get(name='Generated')
+        self.assertEqual(timetable.schedule_json['monday'], [{'time': '09:00-10:00', 'activity': 'Study'}])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class TagIndexTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user(username='taguser')
+
+    def upload(self, title, tags, user=None):
+        return Document.objects.create(
+            user=user or self.user,
+            title=title,
+            file=SimpleUploadedFile(f'{title}.txt', b'text'),
+            tags=tags,
+        )
+
+    def test_parse_tags_normalizes(self):
+        self.assertEqual(parse_tags(' Work, deep  Focus,,work ,'), ['work', 'deep focus'])
+
+    def test_saving_syncs_tag_rows(self):
+        document = self.upload('Report', 'work, finance')
+        self.assertEqual(sorted(document.tag_objects.values_list('name', flat=True)), ['finance', 'work'])
+
+        document.tags = 'work, travel'
+        document.save()
+
+        self.assertEqual(sorted(document.tag_objects.values_list('name', flat=True)), ['travel', 'work'])
+        self.assertEqual(DocumentTag.objects.filter(document=document).count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_tag_filter_matches_whole_tags_only(self):
+        self.client.force_login(self.user)
+        self.upload('Notes', 'art')
+        self.upload('Slides', 'smart, art')
+        self.upload('Plan', 'smart')
+        self.upload('Other', 'art', user=create_test_user(email='other@example.com', username='othertagger'))
+
+        response = self.client.get(reverse('document_list'), {'tag': 'Art'})
+
+        self.assertEqual(sorted(doc.title for doc in response.context['documents']), ['Notes', 'Slides'])
+        self.assertEqual([(tag.name, tag.count) for tag in response.context['tag_cloud']], [('art', 2), ('smart', 2)])
+
+    def test_tag_counts_use_one_query(self):
+        for i in range(5):
+            self.upload(f'Doc {i}', 'work' if i % 2 else 'work, home')
+
+        with self.assertNumQueries(1):
+            counts = [(tag.name, tag.count) for tag in tag_counts(self.user, 'documents')]
+
+        self.assertEqual(counts, [('work', 5), ('home', 3)])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user(username='blobuser')
+
+    def upload(self, title, content, name='report.PDF'):
+        return Document.objects.create(user=self.user, title=title, file=SimpleUploadedFile(name, content))
+
+    def test_duplicate_uploads_share_one_blob(self):
+        first = self.upload('First', b'same bytes')
+        second = self.upload('Second', b'same bytes', name='copy.pdf')
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith('blobs/'))
+        self.assertTrue(first.file.name.endswith('.pdf'))
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob_digest(first.file.name), blob.sha256)
+        self.assertEqual(blob.size, len(b'same bytes'))
+
+    def test_last_reference_deletes_the_object(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.upload('First', b'shared')
+            second = self.upload('Second', b'shared')
+        storage = first.file.storage
+        name = first.file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_reupload_before_the_delete_commits_keeps_the_object(self):
+        document = self.upload('Doc', b'shared')
+        storage, name = document.file.storage, document.file.name
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            document.delete()
+        again = self.upload('Again', b'shared')
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(again.file.name, name)
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertEqual(verify_blobs(check_content=True), [])
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_object_of_a_rolled_back_upload_is_reused_or_swept(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                name = self.upload('Doc', b'rolled back').file.name
+                raise RuntimeError('request failed')
+        self.assertTrue(default_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+        # Within the grace period the object may still belong to an uncommitted upload
+        self.assertEqual(repair_blobs(), (0, 0))
+        with patch('productivity.blobs.ORPHAN_GRACE', timedelta(0)):
+            self.assertEqual(repair_blobs(), (0, 1))
+        self.assertFalse(default_storage.exists(name))
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_upload_after_a_rollback_reuses_the_left_object(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.upload('Doc', b'rolled back')
+                raise RuntimeError('request failed')
+
+        document = self.upload('Again', b'rolled back')
+
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertEqual(verify_blobs(check_content=True), [])
+        with patch('productivity.blobs.ORPHAN_GRACE', timedelta(0)):
+            self.assertEqual(repair_blobs(), (0, 0))
+        self.assertTrue(document.file.storage.exists(document.file.name))
+
+    def test_replacing_a_file_releases_the_old_blob(self):
+        document = self.upload('Doc', b'version one')
+        old_name = document.file.name
+
+        document.file = SimpleUploadedFile('doc.pdf', b'version two')
+        with self.captureOnCommitCallbacks(execute=True):
+            document.save()
+
+        self.assertNotEqual(document.file.name, old_name)
+        self.assertEqual(list(StoredBlob.objects.values_list('name', flat=True)), [document.file.name])
+        self.assertEqual(verify_blobs(check_content=True), [])
+
+    def test_verify_reports_corrupted_content(self):
+        document = self.upload('Doc', b'original')
+        with open(document.file.path, 'wb') as stored:
+            stored.write(b'tampered')
+
+        self.assertEqual(verify_blobs(check_content=True), [(document.file.name, 'content does not match its SHA-256')])
+
+
+class FinanceDashboardTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = create_test_user(username='financeuser')
+        self.client.force_login(self.user)
+
+    def add(self, type, amount, category, day):
+        return Transaction.objects.create(
+            user=self.user, type=type, amount=Decimal(amount), category=category, date=day
+        )
+
+    def test_totals_categories_and_months_are_aggregated(self):
+        self.add('income', '1000.00', 'salary', date(2026, 1, 5))
+        self.add('expense', '20.50', 'food', date(2026, 1, 9))
+        self.add('expense', '9.50', 'food', date(2026, 1, 20))
+        self.add('expense', '45.00', 'transport', date(2026, 3, 2))
+        other = create_test_user(email='other@example.com', username='otherfinance')
+        Transaction.objects.create(user=other, type='income', amount=Decimal('999.00'), category='salary', date=date(2026, 1, 1))
+
+        with self.assertNumQueries(1):
+            finance_summary(self.user)
+        response = self.client.get(reverse('finance_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        context = response.context
+        self.assertEqual(context['total_income'], Decimal('1000.00'))
+        self.assertEqual(context['total_expenses'], Decimal('75.00'))
+        self.assertEqual(context['balance'], Decimal('925.00'))
+        self.assertEqual(context['income_by_category'], {'salary': 1000.0})
+        self.assertEqual(context['expense_by_category'], {'food': 30.0, 'transport': 45.0})
+        self.assertEqual(context['monthly_data'], {
+            '2026-01': {'income': 1000.0, 'expense': 30.0},
+            '2026-03': {'income': 0, 'expense': 45.0},
+        })
+        self.assertEqual(len(context['recent_transactions']), 4)
+
+    def test_empty_dashboard(self):
+        response = self.client.get(reverse('finance_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['balance'], Decimal('0.00'))
+        self.assertEqual(response.context['monthly_data'], {})
+
+
+class MonthlyFinanceRollupTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user(username='rollupuser')
+
+    def rollup(self, month, type, category):
+        row = MonthlyFinanceRollup.objects.filter(
+            user=self.user, month=month, type=type, category=category
+        ).values_list('total', 'count').first()
+        return row
+
+    def test_create_update_and_delete_keep_rollups_in_sync(self):
+        first = Transaction.objects.create(
+            user=self.user, type='expense', amount=Decimal('10.00'), category='food', date=date(2026, 2, 3)
+        )
+        Transaction.objects.create(
+            user=self.user, type='expense', amount=Decimal('5.25'), category='food', date=date(2026, 2, 20)
+        )
+        self.assertEqual(self.rollup(date(2026, 2, 1), 'expense', 'food'), (Decimal('15.25'), 2))
+
+        first.amount = Decimal('12.00')
+        first.save()
+        self.assertEqual(self.rollup(date(2026, 2, 1), 'expense', 'food'), (Decimal('17.25'), 2))
+
+        first.category = 'transport'
+        first.date = date(2026, 3, 1)
+        first.save()
+        self.assertEqual(self.rollup(date(2026, 2, 1), 'expense', 'food'), (Decimal('5.25'), 1))
+        self.assertEqual(self.rollup(date(2026, 3, 1), 'expense', 'transport'), (Decimal('12.00'), 1))
+
+        first.delete()
+        self.assertIsNone(self.rollup(date(2026, 3, 1), 'expense', 'transport'))
+        self.assertEqual(verify_rollups(self.user), [])
+
+    def test_rebuild_repairs_drift(self):
+        Transaction.objects.create(
+            user=self.user, type='income', amount=Decimal('300.00'), category='salary', date=date(2026, 1, 31)
+        )
+        # Queryset updates bypass the signals
+        Transaction.objects.filter(user=self.user).update(amount=Decimal('350.00'))
+        self.assertEqual(len(verify_rollups(self.user)), 1)
+
+        self.assertEqual(rebuild_rollups(self.user), 1)
+
+        self.assertEqual(verify_rollups(self.user), [])
+        self.assertEqual(finance_summary(self.user)['total_income'], Decimal('350.00'))
+
+    def test_dashboard_shows_current_month_from_rollups(self):
+        today = timezone.now().date()
+        Transaction.objects.create(user=self.user, type='income', amount=Decimal('80.00'), category='freelance', date=today)
+        Transaction.objects.create(user=self.user, type='expense', amount=Decimal('30.00'), category='bills', date=today)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('productivity_dashboard'))
+
+        self.assertEqual(response.context['monthly_income'], Decimal('80.00'))
+        self.assertEqual(response.context['monthly_balance'], Decimal('50.00'))
+
+
+class UserStatsTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user(username='statsuser')
+        self.today = date(2026, 5, 11)
+
+    def test_stats_use_one_query_per_model(self):
+        Task.objects.create(user=self.user, title='A', status='done')
+        Task.objects.create(user=self.user, title='B', status='todo', due_date=self.today + timedelta(days=3))
+        Task.objects.create(user=self.user, title='C', status='in_progress', due_date=self.today + timedelta(days=30))
+        Task.objects.create(user=self.user, title='D', status='done', due_date=self.today + timedelta(days=1))
+        Habit.objects.create(user=self.user, name='Read', current_streak=4)
+        Habit.objects.create(user=self.user, name='Run', current_streak=0)
+        Goal.objects.create(user=self.user, title='Ship', progress=100)
+        Goal.objects.create(user=self.user, title='Learn', progress=25)
+        Transaction.objects.create(user=self.user, type='expense', amount=Decimal('12.00'), category='food', date=self.today)
+
+        with self.assertNumQueries(4):
+            stats = get_user_stats(self.user, self.today)
+
+        self.assertEqual(stats['tasks'], {
+            'total': 4, 'todo': 1, 'in_progress': 1, 'done': 2, 'due_this_week': 1, 'completion_rate': 50.0,
+        })
+        self.assertEqual(stats['habits'], {'total': 2, 'active': 1, 'avg_streak': 2.0})
+        self.assertEqual(stats['goals'], {'total': 2, 'completed': 1, 'avg_progress': 62.5})
+        self.assertEqual(stats['finance']['monthly_expenses'], Decimal('12.00'))
+        self.assertEqual(stats['finance']['monthly_balance'], Decimal('-12.00'))
+
+    def test_empty_stats(self):
+        stats = get_user_stats(self.user, self.today)
+
+        self.assertEqual(stats['tasks']['completion_rate'], 0)
+        self.assertEqual(stats['habits']['avg_streak'], 0)
+        self.assertEqual(stats['goals']['avg_progress'], 0)
+
+    def test_dashboard_query_count_does_not_grow_with_data(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as empty:
+            self.client.get(reverse('productivity_dashboard'))
+
+        for i in range(15):
+            Task.objects.create(user=self.user, title=f'Task {i}', status='todo')
+            Goal.objects.create(user=self.user, title=f'Goal {i}', progress=i)
+        with CaptureQueriesContext(connection) as full:
+            response = self.client.get(reverse('productivity_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(full), len(empty))
+
+
+class HabitStreakTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user(username='streakuser')
+        self.today = date(2026, 5, 13)
+
+    def ordinals(self, *offsets):
+        return np.array(sorted((self.today - timedelta(days=d)).toordinal() for d in offsets), dtype=np.int64)
+
+    def test_daily_current_and_longest_streak(self):
+        days = self.ordinals(1, 2, 3, 10, 11, 12, 13, 14)
+
+        stats = compute_habit_stats(days, 'daily', self.today, 30)
+
+        self.assertEqual(stats['current_streak'], 3)
+        self.assertEqual(stats['longest_streak'], 5)
+        self.assertEqual(stats['completions'], 8)
+        self.assertEqual(len(stats['heatmap']), 30)
+        self.assertEqual(stats['heatmap'][-4:], '1110')
+
+    def test_daily_streak_broken_after_missed_day(self):
+        stats = compute_habit_stats(self.ordinals(2, 3), 'daily', self.today, 30)
+
+        self.assertEqual(stats['current_streak'], 0)
+        self.assertEqual(stats['longest_streak'], 2)
+
+    def test_weekly_streak_counts_iso_weeks(self):
+        # 2026-05-13 is a Wednesday; one completion in each of the last three weeks
+        days = self.ordinals(0, 8, 13)
+
+        stats = compute_habit_stats(days, 'weekly', self.today, 28)
+
+        self.assertEqual(stats['current_streak'], 3)
+        self.assertEqual(stats['completion_rate'], 60.0)
+
+    def test_stats_for_many_habits_use_one_query_and_cache(self):
+        habits = [Habit.objects.create(user=self.user, name=f'Habit {i}') for i in range(5)]
+        for habit in habits:
+            HabitCompletion.objects.create(habit=habit, date=self.today)
+
+        with self.assertNumQueries(1):
+            stats = habit_stats_for(habits, today=self.today)
+        with self.assertNumQueries(0):
+            habit_stats_for(habits, today=self.today)
+
+        self.assertEqual({s['current_streak'] for s in stats.values()}, {1})
+
+    def test_new_completion_invalidates_cache(self):
+        habit = Habit.objects.create(user=self.user, name='Read')
+        self.assertEqual(habit_stats(habit, today=self.today)['completions'], 0)
+
+        HabitCompletion.objects.create(habit=habit, date=self.today)
+
+        self.assertEqual(habit_stats(habit, today=self.today)['completions'], 1)
+
+    def test_record_completion_keeps_existing_streak(self):
+        today = timezone.now().date()
+        habit = Habit.objects.create(
+            user=self.user, name='Run', current_streak=3, last_completed_date=today - timedelta(days=1),
+        )
+
+        self.assertTrue(record_completion(habit))
+        self.assertFalse(record_completion(habit))
+
+        habit.refresh_from_db()
+        self.assertEqual(habit.current_streak, 4)
+        self.assertEqual(habit.completions.count(), 4)
+        self.assertEqual(habit_stats(habit)['longest_streak'], 4)
+
+
+class CSVExportTest(TestCase):
+    def setUp(self):
+        self.user = create_test_user(username='exportuser')
+        self.client.force_login(self.user)
+
+    def read_csv(self, response):
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_finance_export_streams_display_labels(self):
+        Transaction.objects.create(
+            user=self.user, type='expense', amount=Decimal('12.50'), category='food',
+            date=date(2026, 4, 2), description='Lunch, with "team"'
+        )
+        Transaction.objects.create(
+            user=self.user, type='income', amount=Decimal('900.00'), category='salary', date=date(2026, 4, 30)
+        )
+
+        response = self.client.get(reverse('export_finance_csv'))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(self.read_csv(response), [
+            ['Date', 'Type', 'Category', 'Amount', 'Description'],
+            ['2026-04-30', 'Income', 'Salary', '900.00', ''],
+            ['2026-04-02', 'Expense', 'Food', '12.50', 'Lunch, with "team"'],
+        ])
+
+    def test_task_export_only_includes_own_rows(self):
+        Task.objects.create(user=self.user, title='Mine', status='in_progress', priority='high')
+        other = create_test_user(email='other@example.com', username='otherexport')
+        Task.objects.create(user=other, title='Theirs')
+
+        rows = self.read_csv(self.client.get(reverse('export_tasks_csv')))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:4], ['Mine', 'In Progress', 'High', ''])
+
+    def test_rows_are_fetched_in_chunks(self):
+        for i in range(5):
+            Habit.objects.create(user=self.user, name=f'Habit {i}')
+
+        lines = list(iter_csv_rows(Habit.objects.filter(user=self.user).order_by('name'), [('Name', 'name')], chunk_size=2))
+
+        self.assertEqual(lines[0], 'Name\r\n')
+        self.assertEqual(lines[1:], [f'Habit {i}\r\n' for i in range(5)])
+
+
+class TransactionImportTest(TestCase):
+    CSV = (
+        'Date,Type,Category,Amount,Description\n'
+        '2026-01-03,Expense,Food,12.50,Lunch\n'
+        '2026-01-03,Expense,Food,12.50,Lunch\n'
+        '2026-01-04,income,salary,"1,500.00",January pay\n'
+        '2026-01-05,Income,Food,10.00,Wrong category\n'
+        '2026-01-06,Expense,Transport,-3.00,Bus\n'
+        'not-a-date,Expense,Food,abc,Broken\n'
+        '2999-01-01,Expense,Food,1.00,Future\n'
+    )
+
+    def setUp(self):
+        self.user = create_test_user(username='importuser')
+
+    def run_import(self, content, file_format='csv', **kwargs):
+        return import_transactions(self.user, io.BytesIO(content.encode()), file_format, **kwargs)
+
+    def test_csv_import_validates_like_the_form_and_reports_rows(self):
+        report = self.run_import(self.CSV, batch_size=2)
+
+        self.assertEqual(report['rows'], 7)
+        self.assertEqual(report['created'], 4)
+        self.assertEqual(report['duplicates'], [])
+        errors = {error['row']: error['errors'] for error in report['errors']}
+        self.assertEqual(sorted(errors), [5, 7, 8])
+        self.assertEqual(errors[5], {'category': ['Choose an income category for income transactions.']})
+        self.assertEqual(set(errors[7]), {'amount', 'date'})
+        self.assertEqual(errors[8], {'date': ['Transactions cannot be recorded in the future.']})
+
+        bus = Transaction.objects.get(user=self.user, description='Bus')
+        self.assertEqual((bus.type, bus.amount), ('expense', Decimal('3.00')))
+        self.assertEqual(Transaction.objects.filter(user=self.user, description='Lunch').count(), 2)
+        self.assertEqual(verify_rollups(self.user), [])
+
+    def test_reimport_skips_existing_rows(self):
+        Transaction.objects.create(
+            user=self.user, type='expense', amount=Decimal('12.50'), category='food',
+            date=date(2026, 1, 3), description='lunch '
+        )
+
+        first = self.run_import(self.CSV)
+        second = self.run_import(self.CSV)
+
+        self.assertEqual(first['created'], 3)
+        self.assertEqual(first['duplicates'], [2])
+        self.assertEqual(second['created'], 0)
+        self.assertEqual(second['duplicates'], [2, 3, 4, 6])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+
+    def test_ofx_import(self):
+        ofx = (
+            'OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+            '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260210120000<TRNAMT>-42.10<FITID>1<NAME>Grocer &amp; Co</STMTTRN>\n'
+            '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260215<TRNAMT>250.00<FITID>2<NAME>Client<MEMO>Invoice 7</STMTTRN>\n'
+            '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+        )
+
+        report = self.run_import(ofx, 'ofx')
+
+        self.assertEqual((report['created'], report['errors']), (2, []))
+        grocer = Transaction.objects.get(user=self.user, type='expense')
+        self.assertEqual((grocer.amount, grocer.category, grocer.date), (Decimal('42.10'), 'other', date(2026, 2, 10)))
+        self.assertEqual(grocer.description, 'Grocer & Co')
+        self.assertEqual(Transaction.objects.get(user=self.user, type='income').description, 'Client - Invoice 7')
+
+    def test_missing_columns_and_row_limit_are_rejected(self):
+        with self.assertRaises(ImportFormatError):
+            self.run_import('Date,Description\n2026-01-01,x\n')
+        with self.assertRaises(ImportFormatError):
+            self.run_import(self.CSV, max_rows=3)
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+
+    def test_import_view(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('bank.csv', self.CSV.encode(), content_type='text/csv')
+
+        response = self.client.post(reverse('transaction_import'), {'file': upload, 'format': 'auto'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report']['created'], 4)
+        self.assertContains(response, 'Choose an income category for income transactions.')
@@ -0,0 +1,254 @@
+"""
+Compiled weekly timetables.
+
+``Timetable.schedule_json`` maps day names to lists of ``{time, activity}``
+slots, where ``time`` is ``HH:MM`` (or ``HH:MM-HH:MM``) and an optional
+``end`` gives the end time. A slot without an end runs until the next slot
+starts, or until midnight. Each day is compiled once into sorted start/end
+minute arrays so "what is on now" and "what is next" are binary searches,
+and overlapping slots are found with a single sweep. Compiled timetables are
+cached per process by id and ``updated_at`` and dropped when the timetable
+is saved or deleted.
+"""
+import re
+import threading
+from bisect import bisect_right
+
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+MINUTES_PER_DAY = 24 * 60
+
+TIME_RE = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*$')
+
+
+class TimetableError(ValueError):
+    """Raised when a schedule contains slots that can't be compiled."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__('; '.join(problems))
+
+
+def parse_minutes(value):
+    """
+    Minutes since midnight of an ``HH:MM`` string.
+
+    Raises:
+        ValueError: If the value is not a valid time of day
+    """
+    match = TIME_RE.match(str(value))
+    if not match:
+        raise ValueError(f'"{value}" is not a HH:MM time')
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if (hours, minutes) == (24, 0):
+        return MINUTES_PER_DAY
+    if hours > 23 or minutes > 59:
+        raise ValueError(f'"{value}" is not a HH:MM time')
+    return hours * 60 + minutes
+
+
+def format_minutes(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+class CompiledDay:
+    """One day's slots as parallel arrays sorted by start minute."""
+
+    def __init__(self, starts, ends, activities):
+        self.starts = starts
+        self.ends = ends
+        self.activities = activities
+        # reach[i] is the slot among 0..i that ends last, so a covering slot is found in O(1) after bisecting
+        reach = []
+        for i, end in enumerate(ends):
+            reach.append(i if not reach or end > ends[reach[-1]] else reach[-1])
+        self.reach = reach
+
+    def slot(self, index):
+        return {
+            'start': format_minutes(self.starts[index]),
+            'end': format_minutes(self.ends[index]),
+            'activity': self.activities[index],
+        }
+
+    def at(self, minute):
+        """Index of a slot running at ``minute``, or None"""
+        position = bisect_right(self.starts, minute) - 1
+        if position < 0:
+            return None
+        index = self.reach[position]
+        return index if self.ends[index] > minute else None
+
+    def after(self, minute):
+        """Index of the first slot starting after ``minute``, or None"""
+        position = bisect_right(self.starts, minute)
+        return position if position < len(self.starts) else None
+
+    def conflicts(self):
+        """Pairs of overlapping slot indexes, found with one sweep over the sorted slots"""
+        pairs = []
+        latest = None
+        for index, start in enumerate(self.starts):
+            if latest is not None and start < self.ends[latest]:
+                pairs.append((latest, index))
+            if latest is None or self.ends[index] > self.ends[latest]:
+                latest = index
+        return pairs
+
+
+class CompiledTimetable:
+    """A schedule compiled into one CompiledDay per weekday."""
+
+    def __init__(self, days):
+        self.days = days
+
+    def now(self, day, minute):
+        """
+        Slot running at a given time.
+
+        Args:
+            day: Day name from DAYS
+            minute: Minutes since midnight
+
+        Returns:
+            Slot dict (day, start, end, activity), or None
+        """
+        compiled = self.days[day]
+        index = compiled.at(minute)
+        if index is None:
+            return None
+        return {'day': day, **compiled.slot(index)}
+
+    def next(self, day, minute):
+        """
+        First slot starting after a given time, looking up to a week ahead.
+
+        Args:
+            day: Day name from DAYS
+            minute: Minutes since midnight
+
+        Returns:
+            Slot dict (day, start, end, activity), or None for an empty timetable
+        """
+        offset = DAYS.index(day)
+        for step in range(len(DAYS) + 1):
+            current = DAYS[(offset + step) % len(DAYS)]
+            compiled = self.days[current]
+            index = compiled.after(minute if step == 0 else -1)
+            if index is not None:
+                return {'day': current, **compiled.slot(index)}
+        return None
+
+    def conflicts(self):
+        """
+        Overlapping slots.
+
+        Returns:
+            List of (first slot, second slot) dict pairs, in day and start order
+        """
+        return [
+            ({'day': day, **compiled.slot(a)}, {'day': day, **compiled.slot(b)})
+            for day, compiled in self.days.items()
+            for a, b in compiled.conflicts()
+        ]
+
+
+def _parse_slot(slot):
+    if not isinstance(slot, dict):
+        raise ValueError('slot is not an object')
+    time = str(slot.get('time', ''))
+    end = slot.get('end')
+    if end is None and '-' in time:
+        time, end = time.split('-', 1)
+    start = parse_minutes(time)
+    if start >= MINUTES_PER_DAY:
+        raise ValueError(f'"{time}" is not a HH:MM time')
+    if end is not None and end != '':
+        end = parse_minutes(end)
+        if end <= start:
+            raise ValueError(f'ends at {format_minutes(end)}, before it starts at {format_minutes(start)}')
+    else:
+        end = None
+    return start, end, str(slot.get('activity', ''))
+
+
+def compile_schedule(schedule):
+    """
+    Compile a schedule_json dict.
+
+    Args:
+        schedule: Dict of day name to a list of {time, activity[, end]} slots
+
+    Returns:
+        CompiledTimetable
+
+    Raises:
+        TimetableError: If a day is unknown or a slot has an invalid time
+    """
+    problems = []
+    if not isinstance(schedule, dict):
+        raise TimetableError(['schedule is not an object of days'])
+    schedule = {str(day).strip().lower(): slots for day, slots in schedule.items()}
+    problems.extend(f'unknown day "{day}"' for day in schedule if day not in DAYS)
+
+    days = {}
+    for day in DAYS:
+        parsed = []
+        for number, slot in enumerate(schedule.get(day) or [], start=1):
+            try:
+                parsed.append(_parse_slot(slot))
+            except ValueError as exc:
+                problems.append(f'{day} slot {number}: {exc}')
+        parsed.sort(key=lambda item: item[0])
+        starts = [start for start, _, _ in parsed]
+        ends = []
+        for start, end, _ in parsed:
+            if end is None:
+                # Run until the next slot that starts later, or midnight
+                following = bisect_right(starts, start)
+                end = starts[following] if following < len(starts) else MINUTES_PER_DAY
+            ends.append(end)
+        days[day] = CompiledDay(starts, ends, [activity for _, _, activity in parsed])
+    if problems:
+        raise TimetableError(problems)
+    return CompiledTimetable(days)
+
+
+class TimetableCache:
+    """Per-process cache of compiled timetables, keyed by id and updated_at."""
+
+    def __init__(self):
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def get(self, timetable):
+        """
+        Compiled form of a timetable.
+
+        ``schedule_json`` is only read on a cache miss, so callers polling
+        with ``.only('id', 'updated_at')`` skip loading it.
+
+        Raises:
+            TimetableError: If the stored schedule can't be compiled
+        """
+        if timetable.pk is None:
+            return compile_schedule(timetable.schedule_json)
+        version = timetable.updated_at
+        with self._lock:
+            entry = self._compiled.get(timetable.pk)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        compiled = compile_schedule(timetable.schedule_json)
+        with self._lock:
+            self._compiled[timetable.pk] = (version, compiled)
+        return compiled
+
+    def invalidate(self, timetable_id):
+        with self._lock:
+            self._compiled.pop(timetable_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+
+
+timetable_cache = TimetableCache()
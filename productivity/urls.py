@@ -8,12 +8,14 @@ urlpatterns = [
     path('tasks/create/', views.task_create, name='task_create'),
     path('tasks/<int:task_id>/update/', views.task_update, name='task_update'),
     path('tasks/<int:task_id>/delete/', views.task_delete, name='task_delete'),
+    path('tasks/export/csv/', views.export_tasks_csv, name='export_tasks_csv'),
     # Habits
     path('habits/', views.habit_list, name='habit_list'),
     path('habits/create/', views.habit_create, name='habit_create'),
     path('habits/<int:habit_id>/update/', views.habit_update, name='habit_update'),
     path('habits/<int:habit_id>/delete/', views.habit_delete, name='habit_delete'),
     path('habits/<int:habit_id>/track/', views.habit_track, name='habit_track'),
+    path('habits/export/csv/', views.export_habits_csv, name='export_habits_csv'),
     # Goals
     path('goals/', views.goal_list, name='goal_list'),
     path('goals/create/', views.goal_create, name='goal_create'),
@@ -26,11 +28,13 @@ urlpatterns = [
     path('timetables/<int:timetable_id>/update/', views.timetable_update, name='timetable_update'),
     path('timetables/<int:timetable_id>/delete/', views.timetable_delete, name='timetable_delete'),
     path('timetables/generator/', views.timetable_generator, name='timetable_generator'),
+    path('timetables/now/', views.timetable_now, name='timetable_now'),
     # Finance
     path('transactions/', views.transaction_list, name='transaction_list'),
     path('transactions/create/', views.transaction_create, name='transaction_create'),
     path('transactions/<int:transaction_id>/update/', views.transaction_update, name='transaction_update'),
     path('transactions/<int:transaction_id>/delete/', views.transaction_delete, name='transaction_delete'),
+    path('transactions/import/', views.transaction_import, name='transaction_import'),
     path('finance/', views.finance_dashboard, name='finance_dashboard'),
     path('finance/export/csv/', views.export_finance_csv, name='export_finance_csv'),
     # Documents
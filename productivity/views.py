@@ -1,14 +1,18 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.utils import timezone
-from datetime import datetime, timedelta
-from decimal import Decimal
 import json
-import csv
 from .models import Task, Habit, Goal, Document, Timetable, Transaction, Milestone
-from .forms import TaskForm, HabitForm, GoalForm, TransactionForm, TimetableForm, DocumentForm, MilestoneForm
+from .forms import TaskForm, HabitForm, GoalForm, TransactionForm, TransactionImportForm, TimetableForm, DocumentForm, MilestoneForm
+from .importers import ImportFormatError, import_transactions
+from .rollups import finance_summary
+from .stats import get_user_stats
+from .tags import tag_counts
+from .streaks import habit_stats, habit_stats_for, record_completion
+from .timetables import DAYS, TimetableError, compile_schedule
+from kouekam_hub.exports import stream_csv
 
 
 def _set_single_active_timetable(user, keep_id=None):
@@ -17,61 +21,55 @@ def _set_single_active_timetable(user, keep_id=None):
         queryset = queryset.exclude(id=keep_id)
     queryset.update(active=False)
 
+
+def _check_schedule(request, schedule, form=None):
+    """Report an invalid schedule (on the form, or as a message) and warn about overlapping slots; True if it can be saved"""
+    try:
+        compiled = compile_schedule(schedule)
+    except TimetableError as exc:
+        if form is not None:
+            form.add_error(None, f'Invalid schedule: {exc}')
+        else:
+            messages.error(request, f'Invalid schedule: {exc}')
+        return False
+    for first, second in compiled.conflicts():
+        messages.warning(
+            request,
+            f"{first['day'].title()}: {first['activity']} ({first['start']}-{first['end']}) overlaps "
+            f"{second['activity']} ({second['start']}-{second['end']})",
+        )
+    return True
+
 @login_required
 def productivity_dashboard(request):
     tasks = Task.objects.filter(user=request.user).order_by('due_date', '-priority')[:10]
     habits = Habit.objects.filter(user=request.user)
     goals = Goal.objects.filter(user=request.user)
-    transactions = Transaction.objects.filter(user=request.user)
-    
-    # Analytics data
-    all_tasks = Task.objects.filter(user=request.user)
-    total_tasks = all_tasks.count()
-    completed_tasks = all_tasks.filter(status='done').count()
-    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
     
-    # Task status breakdown
-    task_status_data = {
-        'todo': all_tasks.filter(status='todo').count(),
-        'in_progress': all_tasks.filter(status='in_progress').count(),
-        'done': completed_tasks,
-    }
-    
-    # Habit streak data
-    habit_streaks = [h.current_streak for h in habits]
-    avg_streak = sum(habit_streaks) / len(habit_streaks) if habit_streaks else 0
-    
-    # Goal progress data
-    goal_progress = [g.progress for g in goals]
-    avg_goal_progress = sum(goal_progress) / len(goal_progress) if goal_progress else 0
-
     today = timezone.now().date()
-    next_week = today + timedelta(days=7)
-    due_this_week = all_tasks.filter(due_date__gte=today, due_date__lte=next_week, status__in=['todo', 'in_progress']).count()
-    in_progress_tasks = all_tasks.filter(status='in_progress').count()
-    completed_goals = goals.filter(progress=100).count()
-    active_habits = habits.filter(current_streak__gt=0).count()
-
-    current_month_transactions = transactions.filter(date__year=today.year, date__month=today.month)
-    monthly_income = sum((t.amount for t in current_month_transactions.filter(type='income')), Decimal('0.00'))
-    monthly_expenses = sum((t.amount for t in current_month_transactions.filter(type='expense')), Decimal('0.00'))
-    
+    stats = get_user_stats(request.user, today)
+    task_stats, finance = stats['tasks'], stats['finance']
+
     context = {
         'tasks': tasks,
         'habits': habits,
         'goals': goals,
         'today': today,
-        'completion_rate': round(completion_rate, 1),
-        'task_status_data': task_status_data,
-        'avg_streak': round(avg_streak, 1),
-        'avg_goal_progress': round(avg_goal_progress, 1),
-        'due_this_week': due_this_week,
-        'in_progress_tasks': in_progress_tasks,
-        'completed_goals': completed_goals,
-        'active_habits': active_habits,
-        'monthly_income': monthly_income,
-        'monthly_expenses': monthly_expenses,
-        'monthly_balance': monthly_income - monthly_expenses,
+        'completion_rate': task_stats['completion_rate'],
+        'task_status_data': {
+            'todo': task_stats['todo'],
+            'in_progress': task_stats['in_progress'],
+            'done': task_stats['done'],
+        },
+        'avg_streak': stats['habits']['avg_streak'],
+        'avg_goal_progress': stats['goals']['avg_progress'],
+        'due_this_week': task_stats['due_this_week'],
+        'in_progress_tasks': task_stats['in_progress'],
+        'completed_goals': stats['goals']['completed'],
+        'active_habits': stats['habits']['active'],
+        'monthly_income': finance['monthly_income'],
+        'monthly_expenses': finance['monthly_expenses'],
+        'monthly_balance': finance['monthly_balance'],
     }
     return render(request, 'productivity/dashboard.html', context)
 
@@ -123,7 +121,10 @@ def task_delete(request, task_id):
 # Habit Views
 @login_required
 def habit_list(request):
-    habits = Habit.objects.filter(user=request.user)
+    habits = list(Habit.objects.filter(user=request.user))
+    stats = habit_stats_for(habits)
+    for habit in habits:
+        habit.stats = stats[habit.id]
     return render(request, 'productivity/habit_list.html', {'habits': habits})
 
 @login_required
@@ -143,43 +144,16 @@ def habit_create(request):
 @login_required
 def habit_track(request, habit_id):
     habit = get_object_or_404(Habit, id=habit_id, user=request.user)
-    today = timezone.now().date()
     
     if request.method == 'POST':
-        if habit.frequency == 'weekly':
-            current_week = today.isocalendar()[:2]
-            last_week = habit.last_completed_date.isocalendar()[:2] if habit.last_completed_date else None
-            previous_week = (today - timedelta(days=7)).isocalendar()[:2]
-
-            if last_week == current_week:
-                messages.info(request, 'Habit already completed this week!')
-                return redirect('habit_list')
-
-            if last_week == previous_week:
-                habit.current_streak += 1
-            else:
-                habit.current_streak = 1
-        elif habit.last_completed_date and habit.last_completed_date == today:
-            messages.info(request, 'Habit already completed today!')
+        if not record_completion(habit):
+            period = 'this week' if habit.frequency == 'weekly' else 'today'
+            messages.info(request, f'Habit already completed {period}!')
             return redirect('habit_list')
-        else:
-            if habit.last_completed_date:
-                days_diff = (today - habit.last_completed_date).days
-                if days_diff == 1:
-                    habit.current_streak += 1
-                elif days_diff > 1:
-                    habit.current_streak = 1
-                else:
-                    habit.current_streak = max(habit.current_streak, 1)
-            else:
-                habit.current_streak = 1
-
-        habit.last_completed_date = today
-        habit.save()
         messages.success(request, f'Habit tracked! Current streak: {habit.current_streak}')
         return redirect('habit_list')
     
-    return render(request, 'productivity/habit_track.html', {'habit': habit})
+    return render(request, 'productivity/habit_track.html', {'habit': habit, 'stats': habit_stats(habit)})
 
 @login_required
 def habit_update(request, habit_id):
@@ -230,7 +204,7 @@ def goal_update(request, goal_id):
         form = GoalForm(request.POST, instance=goal)
         if form.is_valid():
             goal = form.save()
-            if goal.milestones.exists():
+            if goal.milestone_total:
                 goal.recalculate_progress_from_milestones()
                 messages.success(request, 'Goal updated. Progress stays synced with milestones.')
             else:
@@ -297,11 +271,12 @@ def timetable_create(request):
                 timetable.schedule_json = json.loads(schedule_json) if schedule_json else {}
             except json.JSONDecodeError:
                 timetable.schedule_json = {}
-            timetable.save()
-            if timetable.active:
-                _set_single_active_timetable(request.user, keep_id=timetable.id)
-            messages.success(request, 'Timetable created successfully!')
-            return redirect('timetable_list')
+            if _check_schedule(request, timetable.schedule_json, form):
+                timetable.save()
+                if timetable.active:
+                    _set_single_active_timetable(request.user, keep_id=timetable.id)
+                messages.success(request, 'Timetable created successfully!')
+                return redirect('timetable_list')
     else:
         form = TimetableForm()
     return render(request, 'productivity/timetable_form.html', {'form': form, 'form_type': 'Create'})
@@ -318,11 +293,12 @@ def timetable_update(request, timetable_id):
                 timetable.schedule_json = json.loads(schedule_json) if schedule_json else timetable.schedule_json
             except json.JSONDecodeError:
                 pass  # Keep existing schedule_json if invalid
-            timetable = form.save()
-            if timetable.active:
-                _set_single_active_timetable(request.user, keep_id=timetable.id)
-            messages.success(request, 'Timetable updated successfully!')
-            return redirect('timetable_list')
+            if _check_schedule(request, timetable.schedule_json, form):
+                timetable = form.save()
+                if timetable.active:
+                    _set_single_active_timetable(request.user, keep_id=timetable.id)
+                messages.success(request, 'Timetable updated successfully!')
+                return redirect('timetable_list')
     else:
         form = TimetableForm(instance=timetable)
     return render(request, 'productivity/timetable_form.html', {'form': form, 'timetable': timetable, 'form_type': 'Update'})
@@ -340,9 +316,8 @@ def timetable_delete(request, timetable_id):
 def timetable_generator(request):
     if request.method == 'POST':
         schedule_data = {}
-        days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
         
-        for day in days:
+        for day in DAYS:
             schedule_data[day] = []
             time_slots = request.POST.getlist(f'{day}_time')
             activities = request.POST.getlist(f'{day}_activity')
@@ -351,6 +326,8 @@ def timetable_generator(request):
                 if time and activity:
                     schedule_data[day].append({'time': time, 'activity': activity})
         
+        if not _check_schedule(request, schedule_data):
+            return render(request, 'productivity/timetable_generator.html', {'days': DAYS})
         timetable = Timetable.objects.create(
             user=request.user,
             name=request.POST.get('name', 'My Timetable'),
@@ -361,7 +338,29 @@ def timetable_generator(request):
         messages.success(request, 'Timetable generated successfully!')
         return redirect('timetable_list')
     
-    return render(request, 'productivity/timetable_generator.html')
+    return render(request, 'productivity/timetable_generator.html', {'days': DAYS})
+
+@login_required
+def timetable_now(request):
+    """What is on now and next in the active timetable, for the dashboard to poll"""
+    # schedule_json is only loaded when the compiled copy is missing or stale
+    timetable = Timetable.objects.filter(user=request.user, active=True).only('id', 'name', 'updated_at').first()
+    if timetable is None:
+        return JsonResponse({'timetable': None, 'now': None, 'next': None, 'conflicts': []})
+
+    current = timezone.localtime()
+    day = DAYS[current.weekday()]
+    minute = current.hour * 60 + current.minute
+    data = {'timetable': {'id': timetable.id, 'name': timetable.name}, 'now': None, 'next': None, 'conflicts': []}
+    try:
+        compiled = timetable.compiled()
+    except TimetableError as exc:
+        data['errors'] = exc.problems
+        return JsonResponse(data)
+    data['now'] = compiled.now(day, minute)
+    data['next'] = compiled.next(day, minute)
+    data['conflicts'] = [list(pair) for pair in compiled.conflicts()]
+    return JsonResponse(data)
 
 # Transaction/Finance Views
 @login_required
@@ -410,50 +409,31 @@ def transaction_delete(request, transaction_id):
         return redirect('transaction_list')
     return render(request, 'productivity/transaction_confirm_delete.html', {'transaction': transaction})
 
+@login_required
+def transaction_import(request):
+    report = None
+    if request.method == 'POST':
+        form = TransactionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report = import_transactions(request.user, form.cleaned_data['file'], form.cleaned_data['format'])
+            except ImportFormatError as e:
+                form.add_error('file', str(e))
+            else:
+                messages.success(
+                    request,
+                    f"Imported {report['created']} transaction(s); skipped {len(report['duplicates'])} duplicate(s) "
+                    f"and {len(report['errors'])} invalid row(s)."
+                )
+    else:
+        form = TransactionImportForm()
+    return render(request, 'productivity/transaction_import.html', {'form': form, 'report': report})
+
 @login_required
 def finance_dashboard(request):
     transactions = Transaction.objects.filter(user=request.user)
-    
-    # Calculate totals - handle empty querysets
-    income_transactions = transactions.filter(type='income')
-    expense_transactions = transactions.filter(type='expense')
-    
-    total_income = sum((t.amount for t in income_transactions), Decimal('0.00'))
-    total_expenses = sum((t.amount for t in expense_transactions), Decimal('0.00'))
-    balance = total_income - total_expenses
-    
-    # Category breakdown
-    income_by_category = {}
-    expense_by_category = {}
-    
-    for transaction in transactions:
-        if transaction.type == 'income':
-            income_by_category[transaction.category] = income_by_category.get(transaction.category, 0) + float(transaction.amount)
-        else:
-            expense_by_category[transaction.category] = expense_by_category.get(transaction.category, 0) + float(transaction.amount)
-    
-    # Monthly data for charts
-    monthly_data = {}
-    for transaction in transactions:
-        month_key = transaction.date.strftime('%Y-%m')
-        if month_key not in monthly_data:
-            monthly_data[month_key] = {'income': 0, 'expense': 0}
-        if transaction.type == 'income':
-            monthly_data[month_key]['income'] += float(transaction.amount)
-        else:
-            monthly_data[month_key]['expense'] += float(transaction.amount)
-
-    monthly_data = dict(sorted(monthly_data.items()))
-    
-    context = {
-        'total_income': total_income,
-        'total_expenses': total_expenses,
-        'balance': balance,
-        'income_by_category': income_by_category,
-        'expense_by_category': expense_by_category,
-        'monthly_data': monthly_data,
-        'recent_transactions': transactions.order_by('-date', '-created_at')[:10],
-    }
+    context = finance_summary(request.user)
+    context['recent_transactions'] = transactions.order_by('-date', '-created_at')[:10]
     return render(request, 'productivity/finance_dashboard.html', context)
 
 # Document Views
@@ -463,7 +443,15 @@ def document_list(request):
     category_filter = request.GET.get('category')
     if category_filter:
         documents = documents.filter(category=category_filter)
-    return render(request, 'productivity/document_list.html', {'documents': documents, 'category_filter': category_filter})
+    tag_filter = request.GET.get('tag')
+    if tag_filter:
+        documents = documents.filter(tag_objects__user=request.user, tag_objects__name=tag_filter.strip().lower())
+    return render(request, 'productivity/document_list.html', {
+        'documents': documents.prefetch_related('tag_objects'),
+        'category_filter': category_filter,
+        'tag_filter': tag_filter,
+        'tag_cloud': tag_counts(request.user, 'documents'),
+    })
 
 @login_required
 def document_upload(request):
@@ -493,20 +481,37 @@ def document_delete(request, document_id):
 def export_finance_csv(request):
     """Export financial transactions as CSV"""
     transactions = Transaction.objects.filter(user=request.user).order_by('-date')
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="finance_export_{timezone.now().date()}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Type', 'Category', 'Amount', 'Description'])
-    
-    for transaction in transactions:
-        writer.writerow([
-            transaction.date.strftime('%Y-%m-%d'),
-            transaction.get_type_display(),
-            transaction.get_category_display(),
-            str(transaction.amount),
-            transaction.description
-        ])
-    
-    return response
+    return stream_csv(transactions, [
+        ('Date', 'date'),
+        ('Type', 'type'),
+        ('Category', 'category'),
+        ('Amount', 'amount'),
+        ('Description', 'description'),
+    ], 'finance_export')
+
+
+@login_required
+def export_tasks_csv(request):
+    """Export tasks as CSV"""
+    tasks = Task.objects.filter(user=request.user).order_by('due_date', 'id')
+    return stream_csv(tasks, [
+        ('Title', 'title'),
+        ('Status', 'status'),
+        ('Priority', 'priority'),
+        ('Due Date', 'due_date'),
+        ('Description', 'description'),
+        ('Created', 'created_at'),
+    ], 'tasks_export')
+
+
+@login_required
+def export_habits_csv(request):
+    """Export habits as CSV"""
+    habits = Habit.objects.filter(user=request.user).order_by('name', 'id')
+    return stream_csv(habits, [
+        ('Name', 'name'),
+        ('Frequency', 'frequency'),
+        ('Current Streak', 'current_streak'),
+        ('Last Completed', 'last_completed_date'),
+        ('Created', 'created_at'),
+    ], 'habits_export')